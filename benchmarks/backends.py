@@ -0,0 +1,43 @@
+"""Compares write latency of the save backends as the guild count grows.
+
+Each iteration changes one guild's customCommands, marks that guild dirty and flushes, as a command handler would."""
+import os, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synthetic
+
+GUILD_COUNTS = (100, 1000, 5000)
+BACKENDS = ("json", "sqlite")
+ITERATIONS = 20
+
+def main():
+    root = synthetic.enter_sandbox()
+    import save
+
+    print(f"{'guilds':>7} | " + " | ".join(f"{name:>16}" for name in BACKENDS))
+    for count in GUILD_COUNTS:
+        guilds = synthetic.make_guilds(count)
+        results = []
+        for name in BACKENDS:
+            os.chdir(root)
+            os.mkdir(f"{name}-{count}")
+            os.chdir(f"{name}-{count}")
+            save._backend = save.make_backend(name)
+            save.data["guilds"] = guilds
+            save.save()
+            save.flush()
+
+            guild_ids = list(guilds)
+            start = time.perf_counter()
+            for i in range(ITERATIONS):
+                guild_id = guild_ids[i * 7 % count]
+                guilds[guild_id]["modules"]["customCommands"][f"bench{i}"] = "response"
+                save.save(guild_id)
+                save.flush()
+            results.append((time.perf_counter() - start) / ITERATIONS * 1000)
+            save._backend.close()
+        print(f"{count:>7} | " + " | ".join(f"{r:>13.2f} ms" for r in results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+"""A local stand-in for the Discord REST API & gateway, for load testing Hornet without a network.
+
+Covers what Hornet's modules use: messages & history pagination, reactions, channels, roles, members and member chunking.
+REST calls that change state dispatch the matching gateway events to connected shards, like Discord does.
+Every response carries rate limit headers; `latency`, per-route `bucket_limit` and `inject_429` make it slow or throttle it.
+
+    server = FakeDiscord(latency=0.02, inject_429=0.01)
+    guild = server.add_guild(); channel = server.add_channel(guild)
+    url = await server.start()
+    connect_to(url)  # Point discord.py at the server, before the bot connects
+"""
+import asyncio, itertools, json, random, time
+
+import yarl
+from aiohttp import WSMsgType, web
+
+DISCORD_EPOCH = 1420070400000
+API_PATH = "/api/v10"
+HEARTBEAT_INTERVAL = 41250
+
+def connect_to(url: str):
+    """Make discord.py use the fake server at `url` for REST & the gateway"""
+    from discord.gateway import DiscordWebSocket
+    from discord.http import Route
+    Route.BASE = url + API_PATH
+    DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(url.replace("http", "ws", 1) + "/gateway")
+
+def _json(data, status: int = 200, headers: dict | None = None) -> web.Response:
+    # As bytes, so no charset is appended: discord.py only decodes an exact "application/json" content type
+    return web.Response(body=json.dumps(data).encode(), status=status, content_type="application/json", headers=headers)
+
+def _handler(fn):
+    """aiohttp handler returning `fn(request)` as JSON"""
+    async def handler(request: web.Request) -> web.Response:
+        return _json(fn(request))
+    return handler
+
+def _emoji(key: str) -> dict:
+    """Reaction emoji payload from its URL form: a unicode emoji, or name:id for custom emoji"""
+    name, _, emoji_id = key.partition(":")
+    return {"id": emoji_id or None, "name": name}
+
+class FakeDiscord():
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, bucket_limit: int = 50, bucket_window: float = 1.0, inject_429: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.bucket_limit = bucket_limit  # Requests allowed per route (method & major parameter) per `bucket_window` seconds
+        self.bucket_window = bucket_window
+        self.inject_429 = inject_429  # Chance of rate limiting any request regardless of its bucket
+        self.rng = random.Random(seed)
+        self._counter = itertools.count()
+
+        self.bot_user = {"id": str(self.snowflake()), "username": "Hornet", "discriminator": "0", "global_name": None, "avatar": None, "bot": True, "flags": 0}
+        self.guilds: dict[str, dict] = {}
+        self.channels: dict[str, dict] = {}  # channel id : payload, with private "_messages"
+        self.requests: dict[str, int] = {}  # "METHOD /route" : count
+        self.rate_limited = 0
+        self._buckets: dict[str, tuple[float, int]] = {}  # bucket : (window start, requests in window)
+        self._sessions: set["_Session"] = set()
+        self._runner: web.AppRunner | None = None
+
+    # State
+    def snowflake(self) -> int:
+        return ((int(time.time() * 1000) - DISCORD_EPOCH) << 22) | (next(self._counter) & 0x3FFFFF)
+
+    def add_guild(self, guild_id: int | None = None, name: str = "Guild") -> str:
+        guild_id = str(guild_id or self.snowflake())
+        self.guilds[guild_id] = {"id": guild_id, "name": name, "owner_id": self.bot_user["id"], "features": [], "emojis": [], "stickers": [],
+                                 "roles": [self._role(guild_id, guild_id, "@everyone", 0)], "channels": [], "members": {}, "voice_states": [],
+                                 "threads": [], "presences": [], "unavailable": False, "large": False, "premium_tier": 0}
+        self.add_member(guild_id, self.bot_user)
+        return guild_id
+
+    @staticmethod
+    def _role(role_id, guild_id: str, name: str, position: int) -> dict:
+        return {"id": str(role_id), "name": name, "permissions": "8" if str(role_id) == guild_id else "0", "position": position, "color": 0,
+                "hoist": False, "managed": False, "mentionable": False, "flags": 0}
+
+    def add_role(self, guild_id: str, role_id: int | None = None, name: str = "role") -> str:
+        roles = self.guilds[guild_id]["roles"]
+        role = self._role(role_id or self.snowflake(), guild_id, name, len(roles))
+        roles.append(role)
+        return role["id"]
+
+    def add_channel(self, guild_id: str, channel_id: int | None = None, name: str = "channel", type: int = 0) -> str:
+        channel = {"id": str(channel_id or self.snowflake()), "guild_id": guild_id, "type": type, "name": name, "position": len(self.guilds[guild_id]["channels"]),
+                   "permission_overwrites": [], "nsfw": False, "rate_limit_per_user": 0, "parent_id": None, "last_message_id": None}
+        self.guilds[guild_id]["channels"].append(channel)
+        self.channels[channel["id"]] = channel | {"_messages": {}}
+        return channel["id"]
+
+    def add_member(self, guild_id: str, user: dict | int, roles: list = []) -> dict:
+        if not isinstance(user, dict):
+            user = {"id": str(user), "username": f"user{user}", "discriminator": "0", "global_name": None, "avatar": None}
+        member = {"user": user, "roles": [str(r) for r in roles], "joined_at": "2024-01-01T00:00:00+00:00", "deaf": False, "mute": False,
+                  "flags": 0, "nick": None, "avatar": None, "pending": False, "communication_disabled_until": None}
+        self.guilds[guild_id]["members"][user["id"]] = member
+        return member
+
+    def add_message(self, channel_id: str, content: str, author: dict | None = None, message_id: int | None = None, dispatch: bool = False) -> dict:
+        channel = self.channels[channel_id]
+        message = {"id": str(message_id or self.snowflake()), "channel_id": channel_id, "author": author or self.bot_user, "content": content, "type": 0, "flags": 0,
+                   "timestamp": "2024-01-01T00:00:00+00:00", "edited_timestamp": None, "tts": False, "pinned": False, "mention_everyone": False,
+                   "mentions": [], "mention_roles": [], "attachments": [], "embeds": [], "components": [], "_reactions": {}}
+        channel["_messages"][message["id"]] = message
+        channel["last_message_id"] = message["id"]
+        if dispatch: self.dispatch("MESSAGE_CREATE", self._message(message) | {"guild_id": channel["guild_id"]}, channel["guild_id"])
+        return message
+
+    def _message(self, message: dict) -> dict:
+        """Public payload of a stored message"""
+        reactions = [{"emoji": _emoji(key), "count": len(users), "me": self.bot_user["id"] in users, "me_burst": False,
+                      "count_details": {"normal": len(users), "burst": 0}, "burst_colors": []}
+                     for key, users in message["_reactions"].items() if users]
+        return {k: v for k, v in message.items() if not k.startswith("_")} | {"reactions": reactions}
+
+    def react(self, channel_id: str, message_id: str, emoji: str, user_id: str, add: bool = True):
+        """A user adding (or removing) a reaction: updates the message & dispatches the gateway event, unless it had (or lacked) that reaction already"""
+        channel = self.channels[channel_id]
+        users = channel["_messages"][message_id]["_reactions"].setdefault(emoji, [])
+        if add == (user_id in users): return  # Discord only dispatches changes
+        if add: users.append(user_id)
+        else: users.remove(user_id)
+        data = {"user_id": user_id, "channel_id": channel_id, "message_id": message_id, "guild_id": channel["guild_id"],
+                "emoji": _emoji(emoji), "burst": False, "type": 0}
+        member = self.guilds[channel["guild_id"]]["members"].get(user_id)
+        if add and member is not None: data["member"] = member
+        self.dispatch("MESSAGE_REACTION_ADD" if add else "MESSAGE_REACTION_REMOVE", data, channel["guild_id"])
+
+    # Gateway
+    def dispatch(self, event: str, data: dict, guild_id: str | None = None):
+        for session in self._sessions:
+            if session.handles(guild_id): session.send_dispatch(event, data)
+
+    def guild_create(self, guild_id: str) -> dict:
+        guild = self.guilds[guild_id]
+        me = guild["members"][self.bot_user["id"]]
+        return {k: v for k, v in guild.items() if k != "members"} | {"members": [me], "member_count": len(guild["members"])}
+
+    async def _gateway(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        session = _Session(self, ws)
+        self._sessions.add(session)
+        try:
+            await session.run()
+        finally:
+            self._sessions.discard(session)
+        return ws
+
+    # REST
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving; returns the base url"""
+        app = web.Application(middlewares=[self._middleware])
+        r = app.router
+        r.add_get("/gateway", self._gateway)
+        api = API_PATH
+        r.add_get(api + "/users/@me", _handler(lambda _: self.bot_user))
+        r.add_get(api + "/oauth2/applications/@me", self._application)
+        r.add_get(api + "/gateway", _handler(lambda _: {"url": self._gateway_url}))
+        r.add_get(api + "/gateway/bot", _handler(lambda _: {"url": self._gateway_url, "shards": 1,
+                                                             "session_start_limit": {"total": 1000, "remaining": 1000, "reset_after": 0, "max_concurrency": 16}}))
+        r.add_get(api + "/guilds/{guild_id}", _handler(lambda q: self.guild_create(q.match_info["guild_id"])))
+        r.add_get(api + "/guilds/{guild_id}/channels", _handler(lambda q: self.guilds[q.match_info["guild_id"]]["channels"]))
+        r.add_get(api + "/guilds/{guild_id}/roles", _handler(lambda q: self.guilds[q.match_info["guild_id"]]["roles"]))
+        r.add_get(api + "/guilds/{guild_id}/members", self._list_members)
+        r.add_get(api + "/guilds/{guild_id}/members/{user_id}", self._get_member)
+        r.add_put(api + "/guilds/{guild_id}/members/{user_id}/roles/{role_id}", self._member_role)
+        r.add_delete(api + "/guilds/{guild_id}/members/{user_id}/roles/{role_id}", self._member_role)
+        r.add_get(api + "/channels/{channel_id}", _handler(lambda q: {k: v for k, v in self.channels[q.match_info["channel_id"]].items() if k != "_messages"}))
+        r.add_get(api + "/channels/{channel_id}/messages", self._history)
+        r.add_post(api + "/channels/{channel_id}/messages", self._send)
+        r.add_post(api + "/channels/{channel_id}/messages/bulk-delete", self._bulk_delete)
+        r.add_get(api + "/channels/{channel_id}/messages/{message_id}", _handler(lambda q: self._message(self._find(q))))
+        r.add_patch(api + "/channels/{channel_id}/messages/{message_id}", self._edit)
+        r.add_delete(api + "/channels/{channel_id}/messages/{message_id}", self._delete)
+        r.add_delete(api + "/channels/{channel_id}/messages/{message_id}/reactions", self._clear_reactions)
+        r.add_get(api + "/channels/{channel_id}/messages/{message_id}/reactions/{emoji}", self._reaction_users)
+        r.add_delete(api + "/channels/{channel_id}/messages/{message_id}/reactions/{emoji}", self._clear_reactions)
+        r.add_put(api + "/channels/{channel_id}/messages/{message_id}/reactions/{emoji}/@me", self._own_reaction)
+        r.add_delete(api + "/channels/{channel_id}/messages/{message_id}/reactions/{emoji}/{user_id}", self._own_reaction)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]  # type: ignore  # Resolves port 0
+        self.url = f"http://{host}:{port}"
+        self._gateway_url = f"ws://{host}:{port}/gateway"
+        return self.url
+
+    async def stop(self):
+        for session in list(self._sessions):
+            await session.ws.close()
+        if self._runner is not None: await self._runner.cleanup()
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        resource = request.match_info.route.resource
+        route = f"{request.method} {resource.canonical if resource is not None else request.path}"
+        self.requests[route] = self.requests.get(route, 0) + 1
+        if request.path == "/gateway": return await handler(request)
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + self.rng.random() * self.jitter)
+
+        # Buckets are per route & major parameter, as on Discord
+        major = request.match_info.get("channel_id") or request.match_info.get("guild_id") or ""
+        bucket = f"{route}:{major}"
+        now = time.monotonic()
+        window_start, count = self._buckets.get(bucket, (now, 0))
+        if now - window_start >= self.bucket_window: window_start, count = now, 0
+        reset_after = max(self.bucket_window - (now - window_start), 0.001)
+        if count >= self.bucket_limit or self.rng.random() < self.inject_429:
+            self.rate_limited += 1
+            retry_after = reset_after if count >= self.bucket_limit else 0.05
+            return _json({"message": "You are being rate limited.", "retry_after": retry_after, "global": False}, 429,
+                         {"Retry-After": str(retry_after), "X-RateLimit-Scope": "user", "Via": "1.1 google",  # discord.py treats a 429 without Via as a Cloudflare ban
+                          "X-RateLimit-Limit": str(self.bucket_limit), "X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": f"{retry_after:.3f}",
+                          "X-RateLimit-Bucket": bucket})
+        self._buckets[bucket] = (window_start, count + 1)
+        response = await handler(request)
+        response.headers.update({"X-RateLimit-Limit": str(self.bucket_limit), "X-RateLimit-Remaining": str(self.bucket_limit - count - 1),
+                                 "X-RateLimit-Reset-After": f"{reset_after:.3f}", "X-RateLimit-Reset": f"{time.time() + reset_after:.3f}",
+                                 "X-RateLimit-Bucket": bucket})
+        return response
+
+    async def _application(self, request: web.Request) -> web.Response:
+        return _json({"id": self.bot_user["id"], "name": "Hornet", "icon": None, "description": "", "rpc_origins": [], "bot_public": True,
+                      "bot_require_code_grant": False, "owner": self.bot_user, "verify_key": "", "flags": 0, "team": None})
+
+    def _find(self, request: web.Request) -> dict:
+        messages = self.channels[request.match_info["channel_id"]]["_messages"]
+        if (message := messages.get(request.match_info["message_id"])) is None:
+            raise web.HTTPNotFound(body=json.dumps({"message": "Unknown Message", "code": 10008}).encode(), content_type="application/json")
+        return message
+
+    async def _history(self, request: web.Request) -> web.Response:
+        """Newest first, like Discord: the newest `limit` before `before`, or the oldest `limit` after `after`"""
+        messages = self.channels[request.match_info["channel_id"]]["_messages"]
+        limit = min(int(request.query.get("limit", 50)), 100)
+        ids = sorted(messages, key=int)
+        if "after" in request.query:
+            after = int(request.query["after"])
+            page = [i for i in ids if int(i) > after][:limit]
+        else:
+            before = int(request.query.get("before", 1 << 63))
+            page = [i for i in ids if int(i) < before][-limit:]
+        return _json([self._message(messages[i]) for i in reversed(page)])
+
+    async def _send(self, request: web.Request) -> web.Response:
+        payload = await request.json() if request.content_type == "application/json" else {}
+        message = self.add_message(request.match_info["channel_id"], payload.get("content") or "", dispatch=True)
+        message["embeds"] = payload.get("embeds") or []
+        return _json(self._message(message))
+
+    async def _edit(self, request: web.Request) -> web.Response:
+        message = self._find(request)
+        payload = await request.json()
+        for key in ("content", "embeds"):
+            if key in payload: message[key] = payload[key]
+        message["edited_timestamp"] = "2024-01-01T00:00:01+00:00"
+        channel = self.channels[message["channel_id"]]
+        self.dispatch("MESSAGE_UPDATE", self._message(message) | {"guild_id": channel["guild_id"]}, channel["guild_id"])
+        return _json(self._message(message))
+
+    async def _delete(self, request: web.Request) -> web.Response:
+        message = self._find(request)
+        channel = self.channels[message["channel_id"]]
+        del channel["_messages"][message["id"]]
+        self.dispatch("MESSAGE_DELETE", {"id": message["id"], "channel_id": channel["id"], "guild_id": channel["guild_id"]}, channel["guild_id"])
+        return web.Response(status=204)
+
+    async def _bulk_delete(self, request: web.Request) -> web.Response:
+        channel = self.channels[request.match_info["channel_id"]]
+        ids = [i for i in (await request.json())["messages"] if channel["_messages"].pop(i, None) is not None]
+        self.dispatch("MESSAGE_DELETE_BULK", {"ids": ids, "channel_id": channel["id"], "guild_id": channel["guild_id"]}, channel["guild_id"])
+        return web.Response(status=204)
+
+    async def _own_reaction(self, request: web.Request) -> web.Response:
+        message = self._find(request)
+        user_id = request.match_info.get("user_id", "@me")
+        if user_id == "@me": user_id = self.bot_user["id"]
+        self.react(message["channel_id"], message["id"], request.match_info["emoji"], user_id, add=request.method == "PUT")
+        return web.Response(status=204)
+
+    async def _clear_reactions(self, request: web.Request) -> web.Response:
+        message = self._find(request)
+        channel = self.channels[message["channel_id"]]
+        data = {"channel_id": channel["id"], "message_id": message["id"], "guild_id": channel["guild_id"]}
+        if (emoji := request.match_info.get("emoji")) is None:
+            message["_reactions"].clear()
+            self.dispatch("MESSAGE_REACTION_REMOVE_ALL", data, channel["guild_id"])
+        else:
+            message["_reactions"].pop(emoji, None)
+            self.dispatch("MESSAGE_REACTION_REMOVE_EMOJI", data | {"emoji": _emoji(emoji)}, channel["guild_id"])
+        return web.Response(status=204)
+
+    async def _reaction_users(self, request: web.Request) -> web.Response:
+        message = self._find(request)
+        users = message["_reactions"].get(request.match_info["emoji"], [])
+        after = int(request.query.get("after", 0))
+        limit = min(int(request.query.get("limit", 25)), 100)
+        members = self.guilds[self.channels[message["channel_id"]]["guild_id"]]["members"]
+        page = sorted((u for u in users if int(u) > after), key=int)[:limit]
+        return _json([members[u]["user"] if u in members else {"id": u, "username": f"user{u}", "discriminator": "0", "avatar": None} for u in page])
+
+    async def _list_members(self, request: web.Request) -> web.Response:
+        members = self.guilds[request.match_info["guild_id"]]["members"]
+        after = int(request.query.get("after", 0))
+        limit = min(int(request.query.get("limit", 1)), 1000)
+        return _json([members[u] for u in sorted((u for u in members if int(u) > after), key=int)[:limit]])
+
+    async def _get_member(self, request: web.Request) -> web.Response:
+        if (member := self.guilds[request.match_info["guild_id"]]["members"].get(request.match_info["user_id"])) is None:
+            return _json({"message": "Unknown Member", "code": 10007}, 404)
+        return _json(member)
+
+    async def _member_role(self, request: web.Request) -> web.Response:
+        guild_id = request.match_info["guild_id"]
+        if (member := self.guilds[guild_id]["members"].get(request.match_info["user_id"])) is None:
+            return _json({"message": "Unknown Member", "code": 10007}, 404)
+        role_id = request.match_info["role_id"]
+        if request.method == "PUT" and role_id not in member["roles"]: member["roles"].append(role_id)
+        elif request.method == "DELETE" and role_id in member["roles"]: member["roles"].remove(role_id)
+        else: return web.Response(status=204)
+        self.dispatch("GUILD_MEMBER_UPDATE", member | {"guild_id": guild_id}, guild_id)
+        return web.Response(status=204)
+
+class _Session():
+    """One gateway connection (shard)"""
+    def __init__(self, server: FakeDiscord, ws: web.WebSocketResponse):
+        self.server = server
+        self.ws = ws
+        self.seq = 0
+        self.shard = (0, 1)
+        self.ready = False
+
+    def handles(self, guild_id: str | None) -> bool:
+        if not self.ready: return False
+        shard_id, shard_count = self.shard
+        return (int(guild_id) >> 22) % shard_count == shard_id if guild_id is not None else shard_id == 0
+
+    def send_dispatch(self, event: str, data: dict):
+        self.seq += 1
+        asyncio.ensure_future(self.ws.send_str(json.dumps({"op": 0, "t": event, "s": self.seq, "d": data})))
+
+    async def run(self):
+        await self.ws.send_json({"op": 10, "d": {"heartbeat_interval": HEARTBEAT_INTERVAL}})
+        async for msg in self.ws:
+            if msg.type != WSMsgType.TEXT: continue
+            payload = json.loads(msg.data)
+            op = payload["op"]
+            if op == 1:  # Heartbeat
+                await self.ws.send_json({"op": 11})
+            elif op == 2:  # Identify
+                self.shard = tuple(payload["d"].get("shard", (0, 1)))
+                self.ready = True
+                guild_ids = [g for g in self.server.guilds if self.handles(g)]
+                self.send_dispatch("READY", {"v": 10, "user": self.server.bot_user, "guilds": [{"id": g, "unavailable": True} for g in guild_ids],
+                                             "session_id": str(id(self)), "resume_gateway_url": self.server._gateway_url, "shard": list(self.shard),
+                                             "application": {"id": self.server.bot_user["id"], "flags": 0}})
+                for guild_id in guild_ids:
+                    self.send_dispatch("GUILD_CREATE", self.server.guild_create(guild_id))
+            elif op == 6:  # Resume; sessions are not kept, so start over
+                await self.ws.send_json({"op": 9, "d": False})
+            elif op == 8:  # Request guild members
+                request = payload["d"]
+                members = list(self.server.guilds[str(request["guild_id"])]["members"].values())
+                chunks = [members[i:i + 1000] for i in range(0, len(members), 1000)] or [[]]
+                for index, chunk in enumerate(chunks):
+                    self.send_dispatch("GUILD_MEMBERS_CHUNK", {"guild_id": str(request["guild_id"]), "members": chunk, "chunk_index": index,
+                                                               "chunk_count": len(chunks), "nonce": request.get("nonce")})
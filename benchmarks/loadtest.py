@@ -0,0 +1,167 @@
+"""Runs a real HornetBot against a local fake Discord (see fakediscord.py) seeded from synthetic save data, and reports how it copes.
+
+Phases: mass unmutes (moderation's checkMutes over expired mutes), a flood of reactions on reaction role & tracked run messages
+(reactroles, gameTracking claims), and gameTracking's history scans & bulk posting. Run from the repository root, eg.
+    python benchmarks/loadtest.py --guilds 50 --mutes 40 --reactions 20000 --rate 5000 --latency-ms 20 --inject-429 0.01
+
+gameTracking's update_games loop itself needs speedrun.com, so its history scan & posting are driven directly instead.
+"""
+import argparse, asyncio, functools, logging, os, random, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synthetic
+from fakediscord import FakeDiscord, connect_to
+
+MODULES = ["moderation", "reactroles", "gameTracking"]
+GAME = {"name": "Hollow Knight"}
+QUIET_SECONDS = 0.5  # No new REST requests for this long (with the outbound queue empty) ends a phase
+
+def run_content(index: int) -> str:
+    return f"`{GAME['name']}: Any%` in 1m {index % 60}s by player{index}\n<https://www.speedrun.com/hollowknight/run/run{index:06d}>"
+
+def populate(server: FakeDiscord, guilds: dict[str, dict], members: int, history: int) -> tuple[list, list]:
+    """Mirror the save's guilds on the server. Returns reaction targets: (channel id, message id, emoji), and tracked channel ids."""
+    targets, tracked = [], []
+    for guild_id, guild in guilds.items():
+        server.add_guild(guild_id, guild["nick"])
+        modules = guild["modules"]
+        mod = modules["moderation"]
+        reactroles = modules["reactroles"]
+        for role in guild["adminRoles"] + list(mod["muteRoles"].values()):
+            server.add_role(guild_id, role)
+        for user, (level, _) in mod["mutes"].items():
+            server.add_member(guild_id, int(user), [mod["muteRoles"][level]])
+        for i in range(members):
+            server.add_member(guild_id, int(guild_id) * 1000 + i)
+
+        for channel in (guild["logChannel"], modules["changelog"]["logChannel"]):
+            server.add_channel(guild_id, channel)
+        for channel_id, messages in reactroles.items():
+            server.add_channel(guild_id, channel_id)
+            for message_id, emojis in messages.items():
+                server.add_message(channel_id, "React for roles", message_id=int(message_id))
+                for emoji, role in emojis.items():
+                    server.add_role(guild_id, role)
+                    targets.append((channel_id, message_id, emoji))
+        claim = modules["gameTracking"]["claimEmoji"]
+        for channel_id in modules["gameTracking"]["trackedChannels"]:
+            server.add_channel(guild_id, channel_id)
+            tracked.append(channel_id)
+            for i in range(history):
+                message = server.add_message(channel_id, run_content(i))
+                message["_reactions"][claim] = [server.bot_user["id"]]
+                targets.append((channel_id, message["id"], claim))
+    return targets, tracked
+
+async def quiesce(server: FakeDiscord, bot, timeout: float = 600):
+    """Wait until the bot stops making requests"""
+    deadline = time.monotonic() + timeout
+    last, quiet_since = -1, time.monotonic()
+    while time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+        total = sum(server.requests.values())
+        if total != last or sum(bot.outbound.depth().values()):
+            last, quiet_since = total, time.monotonic()
+        elif time.monotonic() - quiet_since >= QUIET_SECONDS:
+            return
+    raise TimeoutError("Bot still busy")
+
+def report(phase: str, server: FakeDiscord, before: dict[str, int], limited: int, elapsed: float, events: int | None = None):
+    calls = {route: count - before.get(route, 0) for route, count in server.requests.items() if count > before.get(route, 0)}
+    rate = f", {events / elapsed:.0f} events/s" if events else ""
+    print(f"\n{phase}: {elapsed:.2f}s{rate}, {sum(calls.values())} requests, {server.rate_limited - limited} rate limited")
+    for route, count in sorted(calls.items(), key=lambda item: -item[1]):
+        print(f"    {route:<72} {count:>8}")
+
+async def load_test(args):
+    import save
+    from components import metrics
+    from Hornet import HornetBot
+
+    server = FakeDiscord(args.latency_ms / 1000, args.jitter_ms / 1000, args.bucket_limit, inject_429=args.inject_429, seed=args.seed)
+    targets, tracked = populate(server, save.data["guilds"], args.members, args.history)
+    connect_to(await server.start())
+
+    bot = HornetBot(command_prefix=";")
+    ready = asyncio.Event()
+    async def on_ready(): ready.set()
+    bot.add_listener(on_ready)
+    runner = asyncio.create_task(bot.start("fake-token"))
+    start = time.perf_counter()
+    await asyncio.wait_for(ready.wait(), 120)
+    print(f"Connected & cached {len(bot.guilds)} guilds in {time.perf_counter() - start:.2f}s")
+    bot.get_cog("GameTracking").update_games.cancel()  # type: ignore  # Polls speedrun.com
+
+    # Mass unmutes: every synthetic mute has expired
+    before, limited, start = dict(server.requests), server.rate_limited, time.perf_counter()
+    await bot.get_cog("Moderation").checkMutes()  # type: ignore
+    await quiesce(server, bot)
+    report("Unmutes", server, before, limited, time.perf_counter() - start)
+    still_muted = sum(1 for g in save.data["guilds"].values() for _ in g["modules"]["moderation"]["mutes"])
+    if still_muted: print(f"    {still_muted} mutes left in the save")
+
+    # Reaction flood, paced at --rate
+    rng = random.Random(args.seed)
+    users = {g: [str(int(g) * 1000 + i) for i in range(args.members)] for g in server.guilds}
+    before, limited, start = dict(server.requests), server.rate_limited, time.perf_counter()
+    for i in range(args.reactions):
+        channel_id, message_id, emoji = rng.choice(targets)
+        server.react(channel_id, message_id, emoji, rng.choice(users[server.channels[channel_id]["guild_id"]]), add=rng.random() < 0.7)
+        if i % 100 == 99:
+            await asyncio.sleep(max(start + (i + 1) / args.rate - time.perf_counter(), 0))
+    await quiesce(server, bot)
+    report("Reactions", server, before, limited, time.perf_counter() - start, args.reactions)
+
+    # History scans & bulk posting, as update_games does them, for every tracked channel at once
+    cog = bot.get_cog("GameTracking")
+    channels = [bot.get_channel(int(c)) for c in tracked]
+    before, limited, start = dict(server.requests), server.rate_limited, time.perf_counter()
+    found = await asyncio.gather(*(cog.get_message_run_dict(c.history(limit=200, oldest_first=True), GAME) for c in channels))  # type: ignore
+    report(f"History scans ({sum(len(f) for f in found)} runs found)", server, before, limited, time.perf_counter() - start)
+
+    from components import outbound
+    before, limited, start = dict(server.requests), server.rate_limited, time.perf_counter()
+    await asyncio.gather(*(bot.outbound.submit(functools.partial(c.send, run_content(args.history + i)), ("channel", c.id), outbound.NORMAL, name="post run")  # type: ignore
+                           for c in channels for i in range(args.posts)))
+    report("Bulk posting", server, before, limited, time.perf_counter() - start, len(channels) * args.posts)
+
+    print("\nListener latency (ms)")
+    print(metrics.listeners.table(args.top))
+    print("\nOutbound calls (ms)")
+    print(metrics.outbound.table(args.top))
+    errors = {name: stat.outcomes["error"] for name, stat in metrics.listeners.stats.items() if stat.outcomes.get("error")}
+    if errors: print(f"\nListener errors: {', '.join(f'{name} {count}' for name, count in errors.items())}")
+
+    await bot.close()
+    await server.stop()
+    await asyncio.gather(runner, return_exceptions=True)
+    return sum(errors.values())
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test Hornet against a local fake Discord")
+    parser.add_argument("--guilds", type=int, default=20)
+    parser.add_argument("--mutes", type=int, default=25, help="Expired mutes per guild")
+    parser.add_argument("--members", type=int, default=200, help="Reacting members per guild")
+    parser.add_argument("--history", type=int, default=150, help="Run messages per tracked channel")
+    parser.add_argument("--posts", type=int, default=50, help="Runs to post per tracked channel")
+    parser.add_argument("--reactions", type=int, default=10000)
+    parser.add_argument("--rate", type=float, default=2000, help="Reaction events per second")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Latency of each REST request")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Extra random latency, up to this much")
+    parser.add_argument("--bucket-limit", type=int, default=50, help="Requests per route & major parameter per second before a 429")
+    parser.add_argument("--inject-429", type=float, default=0, help="Chance of rate limiting any request")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    disabled = [m.removesuffix(".py") for m in os.listdir(os.path.join(synthetic.SRC_DIR, "modules")) if m.endswith(".py") and m.removesuffix(".py") not in MODULES]
+    synthetic.enter_sandbox(disabled_modules=disabled, stall_threshold=0, snapshot_interval=0, metrics_interval=0)
+    logging.basicConfig(level=logging.WARNING)
+    import save
+    save.data["guilds"] = synthetic.make_guilds(args.guilds, args.seed, mutes=args.mutes)
+    save.save()
+    if asyncio.run(load_test(args)): sys.exit(1)  # Listener errors are bugs, not load
+
+
+if __name__ == "__main__":
+    main()
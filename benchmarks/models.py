@@ -0,0 +1,68 @@
+"""Compares hot-path lookups against raw save dicts with the typed guild & module models, across many guilds."""
+import os, random, sys, time, tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synthetic
+
+GUILDS = 10000
+LOOKUPS = 200000
+
+def bench(label: str, fn, args: list):
+    start = time.perf_counter()
+    for a in args: fn(*a)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {elapsed / len(args) * 1e9:8.0f} ns/lookup")
+
+def main():
+    synthetic.enter_sandbox()
+    import save
+    from modules.customCommands import CustomCommandsData
+    from modules.reactroles import ReactRolesData
+    save.add_module_template("customCommands", {})
+    save.add_module_template("reactroles", {})
+    tracemalloc.start()
+    save.data["guilds"] = synthetic.make_guilds(GUILDS)
+    print(f"{GUILDS} guilds: save dicts hold {tracemalloc.get_traced_memory()[0] / 1024 / 1024:.2f} MiB")
+    tracemalloc.stop()
+
+    rng = random.Random(1)
+    guild_ids = [int(g) for g in save.get_guild_ids()]
+    queries = []
+    for _ in range(LOOKUPS):
+        guild_id = rng.choice(guild_ids)
+        channel_id, messages = next(iter(save.get_module_data(guild_id, "reactroles").items()))
+        message_id = next(iter(messages))
+        queries.append((guild_id, int(channel_id), int(message_id), "✅", rng.randrange(10**17, 10**18), "CMD3"))
+
+    tracemalloc.start()
+    for guild_id in guild_ids:
+        save.get_guild_model(guild_id)
+        save.get_module_model(guild_id, "customCommands", CustomCommandsData)
+        save.get_module_model(guild_id, "reactroles", ReactRolesData)
+    print(f"{GUILDS} guilds: models hold {tracemalloc.get_traced_memory()[0] / 1024 / 1024:.2f} MiB on top")
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    for guild_id in range(1, GUILDS + 1):  # Guilds with no save data share the default model
+        save.get_guild_model(guild_id)
+        save.get_module_model(guild_id, "reactroles", ReactRolesData)
+    print(f"{GUILDS} guilds without data: models hold {tracemalloc.get_traced_memory()[0] / 1024 / 1024:.2f} MiB")
+    tracemalloc.stop()
+
+    def dict_admin(g, c, m, e, role, cmd): return role in save.get_guild_data(g)["adminRoles"]
+    def model_admin(g, c, m, e, role, cmd): return role in save.get_guild_model(g).admin_roles
+    def dict_reactrole(g, c, m, e, role, cmd): return save.get_module_data(g, "reactroles").get(str(c), {}).get(str(m), {}).get(e)
+    def model_reactrole(g, c, m, e, role, cmd): return save.get_module_model(g, "reactroles", ReactRolesData).roles.get((c, m, e))
+    def dict_command(g, c, m, e, role, cmd): return {k.lower(): v for k, v in save.get_module_data(g, "customCommands").items()}.get(cmd.lower())
+    def model_command(g, c, m, e, role, cmd): return save.get_module_model(g, "customCommands", CustomCommandsData).by_lower.get(cmd.lower())
+
+    bench("admin role (dict)", dict_admin, queries)
+    bench("admin role (model)", model_admin, queries)
+    bench("reaction role (dict)", dict_reactrole, queries)
+    bench("reaction role (model)", model_reactrole, queries)
+    bench("custom command (dict)", dict_command, queries)
+    bench("custom command (model)", model_command, queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Replays gateway dispatches through HornetBot's cogs offline, with REST calls stubbed, and reports per-listener latency & throughput.
+
+Record dispatches with `gateway_record` in config.json, then run from the repository root:
+    python benchmarks/replay.py gateway.jsonl.gz --save save.json
+    python benchmarks/replay.py --synthetic 20000 --guilds 100 --modules reactroles,gameTracking
+"""
+import argparse, asyncio, logging, os, re, shutil, sys, time
+from urllib.parse import unquote
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synthetic
+
+MESSAGE_ID = re.compile(r"/messages/(\d+)")
+YIELD_EVERY = 100  # Dispatches between yields to the loop, so handlers run while the stream is fed
+
+def emoji_key(emoji: dict) -> str:
+    """An emoji payload as discord.py puts it in reaction routes"""
+    return emoji["name"] if emoji.get("id") is None else f"{emoji['name']}:{emoji['id']}"
+
+class StubRest():
+    """Stands in for discord.py's `HTTPClient.request`: waits `latency` seconds & returns a minimal payload for the route, counting calls.
+    Fetched messages & reacter lists reflect the reaction events `observe`d so far."""
+    def __init__(self, user: dict, latency: float):
+        self.user = user
+        self.latency = latency
+        self.calls: dict[str, int] = {}
+        self.reactions: dict[str, dict[str, tuple[dict, dict[str, dict]]]] = {}  # Message id : emoji key : (emoji, {user id: user})
+        self._next_id = 10**18
+
+    def observe(self, event: str, data: dict):
+        if event not in ("MESSAGE_REACTION_ADD", "MESSAGE_REACTION_REMOVE"): return
+        emojis = self.reactions.setdefault(data["message_id"], {})
+        users = emojis.setdefault(emoji_key(data["emoji"]), (data["emoji"], {}))[1]
+        if event == "MESSAGE_REACTION_ADD":
+            users[data["user_id"]] = data.get("member", {}).get("user") or {"id": data["user_id"], "username": "user", "discriminator": "0", "avatar": None}
+        else:
+            users.pop(data["user_id"], None)
+
+    def reacters(self, url: str, params: dict) -> list[dict]:
+        message_id, emoji = MESSAGE_ID.search(url).group(1), unquote(url.rsplit("/", 1)[1])  # type: ignore
+        users = sorted(self.reactions.get(message_id, {}).get(emoji, ({}, {}))[1].values(), key=lambda user: int(user["id"]))
+        after = int(params.get("after", 0))
+        return [user for user in users if int(user["id"]) > after][:params.get("limit", 100)]
+
+    def message(self, channel_id, message_id, content: str) -> dict:
+        return {"id": str(message_id), "channel_id": str(channel_id), "author": self.user, "content": content, "type": 0, "flags": 0,
+                "timestamp": "2024-01-01T00:00:00+00:00", "edited_timestamp": None, "tts": False, "pinned": False, "mention_everyone": False,
+                "mentions": [], "mention_roles": [], "attachments": [], "embeds": [], "components": [],
+                "reactions": [{"emoji": emoji, "count": len(users), "count_details": {"burst": 0, "normal": len(users)}, "me": False, "me_burst": False,
+                               "burst_colors": []} for emoji, users in self.reactions.get(str(message_id), {}).values() if users]}
+
+    async def request(self, route, **kwargs):
+        key = f"{route.method} {route.path}"
+        self.calls[key] = self.calls.get(key, 0) + 1
+        if self.latency: await asyncio.sleep(self.latency)
+        if route.method == "GET" and route.path.endswith("/reactions/{emoji}"):
+            return self.reacters(route.url, kwargs.get("params") or {})
+        if route.method == "GET" and route.path == "/channels/{channel_id}/messages":
+            return []  # No history
+        if route.path.startswith("/channels/{channel_id}/messages") and route.method != "DELETE":
+            if (match := MESSAGE_ID.search(route.url)) is None:
+                self._next_id += 1
+                message_id = self._next_id
+            else:
+                message_id = match.group(1)
+            return self.message(route.channel_id, message_id, (kwargs.get("json") or {}).get("content") or "")
+        return None  # Role edits, reactions, deletes
+
+async def settle():
+    """Wait until every other task (listeners, queued REST calls, log flushes) has finished"""
+    while pending := [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]:
+        await asyncio.gather(*pending, return_exceptions=True)
+
+async def replay(events: list[tuple[float, str, dict]], modules: list[str] | None, rest_latency: float, top: int):
+    from discord import ClientUser
+    from discord.ext import tasks
+    from discord.ext.commands import ExtensionFailed
+    tasks.Loop.start = lambda self, *args, **kwargs: None  # Background loops poll live APIs; only listeners are replayed
+    import save
+    from components import metrics
+    from Hornet import HornetBot
+
+    user = next(data["user"] for _, event, data in events if event == "READY")
+    bot = HornetBot(command_prefix=";")
+    await bot._async_setup_hook()  # Binds the loop, as logging in would; dispatching needs it
+    rest = StubRest(user, rest_latency)
+    bot.http.request = rest.request  # type: ignore
+    state = bot._connection
+    state.user = ClientUser(state=state, data=user)
+    bot.user_id = state.user.id
+    for _, event, data in events:
+        if event == "GUILD_CREATE": state._add_guild_from_data(data)  # type: ignore
+
+    loaded = []
+    for module in modules or bot.module_names:
+        try:
+            await bot.load_extension(f"modules.{module}")
+            loaded.append(module)
+        except ExtensionFailed as e:  # eg. modules needing credentials the sandbox doesn't have
+            print(f"Skipping {module}: {e.original}")
+    modules = loaded
+    save.init_modules(modules)
+
+    dispatches = [(event, state.parsers[event], data) for _, event, data in events if event not in ("READY", "GUILD_CREATE") and event in state.parsers]
+    metrics.listeners.stats.clear()
+    start = time.perf_counter()
+    for i, (event, parse, data) in enumerate(dispatches):
+        rest.observe(event, data)
+        parse(data)
+        if i % YIELD_EVERY == 0: await asyncio.sleep(0)
+    await settle()
+    elapsed = time.perf_counter() - start
+
+    print(f"Replayed {len(dispatches)} dispatches into {', '.join(modules)} in {elapsed:.2f}s ({len(dispatches) / elapsed:.0f}/s), "
+          f"REST stubbed at {rest_latency * 1000:.0f}ms")
+    print("\nListener latency (ms)")
+    print(metrics.listeners.table(top))
+    print("\nListener throughput (calls per second of handler time)")
+    for name, stat in sorted(metrics.listeners.stats.items(), key=lambda item: -item[1].latency.total):
+        h = stat.latency
+        print(f"{name:<48} {h.total:>8} {h.total / (h.sum / 1000) if h.sum else float('inf'):>12.0f}/s")
+    print("\nStubbed REST calls")
+    for route, count in sorted(rest.calls.items(), key=lambda item: -item[1]):
+        print(f"{route:<64} {count:>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay gateway dispatches through Hornet's cogs offline")
+    parser.add_argument("recording", nargs="?", help="Recording written with gateway_record")
+    parser.add_argument("--save", help="Save file to replay against (copied; never modified)")
+    parser.add_argument("--synthetic", type=int, metavar="REACTIONS", help="Replay this many synthetic reaction events instead of a recording")
+    parser.add_argument("--guilds", type=int, default=100, help="Synthetic guilds (default 100)")
+    parser.add_argument("--modules", help="Comma separated modules to load (default: all enabled)")
+    parser.add_argument("--rest-latency-ms", type=float, default=0, help="Simulated latency of each REST call")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+    if (args.recording is None) == (args.synthetic is None):
+        parser.error("Give either a recording or --synthetic")
+
+    save_path = os.path.abspath(args.save) if args.save else None
+    recording = os.path.abspath(args.recording) if args.recording else None
+    synthetic.enter_sandbox()
+    if save_path is not None: shutil.copy(save_path, "save.json")
+    logging.basicConfig(level=logging.WARNING)
+    sys.path.insert(0, synthetic.SRC_DIR)
+
+    if recording is not None:
+        from components import recorder
+        events = list(recorder.read(recording))
+    else:
+        import save
+        guilds = synthetic.make_guilds(args.guilds)
+        save.data["guilds"] = guilds
+        save.save()
+        events = synthetic.make_gateway_events(guilds, args.synthetic)
+    asyncio.run(replay(events, args.modules.split(",") if args.modules else None, args.rest_latency_ms / 1000, args.top))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Measures how long `save.flush()` and `save.flush_async()` block the event loop for a synthetic 1,000 guild save.
+
+A ticker task records the largest gap between its wakeups while a flush runs; that gap is the time the loop was blocked."""
+import asyncio, os, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synthetic
+
+GUILDS = 1000
+TICK = 0.001
+RUNS = 5
+
+async def max_block(action) -> tuple[float, float]:
+    """Run `action` while ticking the loop; returns (longest loop stall, total time taken) in seconds."""
+    worst = 0.0
+    running = True
+
+    async def ticker():
+        nonlocal worst
+        last = time.perf_counter()
+        while running:
+            await asyncio.sleep(TICK)
+            now = time.perf_counter()
+            worst = max(worst, now - last - TICK)
+            last = now
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(TICK * 5)  # let the ticker settle
+    start = time.perf_counter()
+    await action()
+    elapsed = time.perf_counter() - start
+    running = False
+    await task
+    return worst, elapsed
+
+async def main():
+    synthetic.enter_sandbox()
+    import save
+    save.data["guilds"] = synthetic.make_guilds(GUILDS)
+    save.save()
+    save.flush()
+    print(f"save.json: {os.path.getsize(save.JSON_PATH) / 1024 / 1024:.2f} MiB, {GUILDS} guilds")
+
+    async def sync_flush():
+        save.save()
+        save.flush()
+
+    async def async_flush():
+        save.save()
+        await save.flush_async()
+
+    async def collapsed_flushes():
+        save.save()
+        await asyncio.gather(*(save.flush_async() for _ in range(10)))
+
+    for name, action in (("flush()", sync_flush), ("flush_async()", async_flush), ("10x concurrent flush_async()", collapsed_flushes)):
+        results = [await max_block(action) for _ in range(RUNS)]
+        block = max(r[0] for r in results) * 1000
+        took = sum(r[1] for r in results) / RUNS * 1000
+        print(f"{name:<30} max loop block {block:8.2f} ms | mean wall time {took:8.2f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,34 @@
+"""Compares dump & load time and file size of each save codec on a large, realistic save."""
+import os, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synthetic
+
+GUILDS = 500
+REPEATS = 3
+
+def main():
+    synthetic.enter_sandbox()
+    from storage.codecs import get_codec
+    obj = {"version": 0.2, "modules": {}, "guilds": synthetic.make_guilds(GUILDS, commands=100, reactroles=50, mutes=40)}
+    print(f"{GUILDS} guilds, 100 custom commands, 50 react roles & 40 mutes each")
+
+    for name in ("json", "json-compact", "orjson", "msgpack"):
+        try:
+            codec = get_codec(name)
+        except ImportError:
+            print(f"{name:<13} not installed, skipping")
+            continue
+        dump = min(timed(codec.dumps, obj) for _ in range(REPEATS))
+        raw = codec.dumps(obj)
+        load = min(timed(codec.loads, raw) for _ in range(REPEATS))
+        print(f"{name:<13} dump {dump * 1000:8.1f} ms | load {load * 1000:8.1f} ms | {len(raw) / 1024 / 1024:7.2f} MiB")
+
+def timed(fn, arg) -> float:
+    start = time.perf_counter()
+    fn(arg)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    main()
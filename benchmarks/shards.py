@@ -0,0 +1,44 @@
+"""Compares startup time & memory of the single-file JSON save against per-guild shards, when only a few guilds are active."""
+import gc, os, sys, time, tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synthetic
+
+GUILDS = 5000
+ACTIVE = 50
+
+def measure(save, backend_name: str) -> tuple[float, float, float]:
+    """Returns (load seconds, MiB held after load, MiB held after touching `ACTIVE` guilds)"""
+    save._backend = save.make_backend(backend_name)
+    save.data = {}
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    save.load()
+    elapsed = time.perf_counter() - start
+    loaded = tracemalloc.get_traced_memory()[0]
+    for guild_id in list(save.get_guild_ids())[:ACTIVE]:
+        save.get_module_data(guild_id, "moderation")
+    active = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    save._dirty_all = False  # load() marks data dirty; don't count a rewrite
+    return elapsed, loaded / 1024 / 1024, active / 1024 / 1024
+
+def main():
+    synthetic.enter_sandbox()
+    import save
+    save.data["guilds"] = synthetic.make_guilds(GUILDS)
+    save.save()
+    save.flush()
+    save._backend = save.make_backend("shards")
+    save.load()  # imports save.json into shards
+    save.flush()
+
+    print(f"{GUILDS} guilds, {ACTIVE} active")
+    for name in ("json", "shards"):
+        elapsed, loaded, active = measure(save, name)
+        print(f"{name:<7} load {elapsed * 1000:8.1f} ms | {loaded:7.2f} MiB after load | {active:7.2f} MiB with active guilds")
+
+
+if __name__ == "__main__":
+    main()
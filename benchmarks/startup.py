@@ -0,0 +1,57 @@
+"""Import-time profile of startup: `python -X importtime` of Hornet and every module, as imported before connecting to the gateway.
+
+Pass `--budget-ms N` to exit with status 1 if the total import time exceeds N ms, eg. to catch regressions in CI."""
+import argparse, os, subprocess, sys
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synthetic
+
+STARTUP_CODE = """
+import importlib, os
+import Hornet
+for file in sorted(os.listdir(os.path.join(os.path.dirname(Hornet.__file__), "modules"))):
+    if file.endswith(".py"): importlib.import_module(f"modules.{file[:-3]}")
+"""
+
+def profile() -> list[tuple[int, int, int, str]]:
+    """Runs startup imports in a fresh interpreter. Returns (self us, cumulative us, depth, module) for each import."""
+    env = os.environ | {"PYTHONPATH": os.pathsep.join(filter(None, [synthetic.SRC_DIR, os.environ.get("PYTHONPATH")]))}
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", STARTUP_CODE], env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        sys.exit(f"Startup imports failed:\n{result.stderr[-2000:]}")
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line: continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        imports.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    return imports
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=None)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    synthetic.enter_sandbox()
+    imports = profile()
+    total = sum(cumulative for _, cumulative, depth, _ in imports if depth == 0) / 1000
+
+    by_package: dict[str, int] = defaultdict(int)
+    for self_us, _, _, name in imports:
+        by_package[name.split(".")[0]] += self_us
+    print(f"Total import time: {total:.1f} ms ({len(imports)} modules)\n")
+    print(f"{'package':<30} {'self ms':>9}")
+    for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{package:<30} {self_us / 1000:9.1f}")
+    print(f"\n{'slowest imports':<50} {'cumulative ms':>14}")
+    for _, cumulative, _, name in sorted(imports, key=lambda item: -item[1])[:args.top]:
+        print(f"{name:<50} {cumulative / 1000:14.1f}")
+
+    if args.budget_ms is not None and total > args.budget_ms:
+        sys.exit(f"\nImport time {total:.1f} ms exceeds budget of {args.budget_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Synthetic save data for benchmarks. Run benchmarks from the repository root, eg. `python benchmarks/save_blocking.py`."""
+import json, os, random, sys, tempfile
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+def enter_sandbox(**config) -> str:
+    """Make `src` importable and move into a fresh temporary working directory with a minimal config.json, so `save` never touches a real save.json.
+
+    Must be called before importing `config` or `save`; `config` keys override the defaults."""
+    if SRC_DIR not in sys.path: sys.path.insert(0, SRC_DIR)
+    path = tempfile.mkdtemp(prefix="hornet-bench-")
+    os.chdir(path)
+    with open("config.json", "w") as f:
+        json.dump({"token": "", "admins": []} | config, f)
+    return path
+
+def make_guild(rng: random.Random, guild_id: int, commands: int = 20, reactroles: int = 10, mutes: int = 5) -> dict:
+    def snowflake(): return rng.randrange(10**17, 10**18)
+
+    return {
+        "nick": f"Guild {guild_id}",
+        "version": 0.2,
+        "adminRoles": [snowflake() for _ in range(3)],
+        "spoileredPlayers": [f"player{rng.randrange(1000)}" for _ in range(5)],
+        "logChannel": snowflake(),
+        "modules": {
+            "changelog": {"logChannel": snowflake(), "excludeChannels": [snowflake() for _ in range(4)]},
+            "customCommands": {f"cmd{i}": "Some reasonably long custom command response " * 3 for i in range(commands)},
+            "gameTracking": {"trackedChannels": {str(snowflake()): {"games": ["o1y9wo6q", "j1npme6p"]}}, "claimEmoji": "✅", "unclaimEmoji": "❌"},
+            "moderation": {"mutes": {str(snowflake()): ["1", 1700000000 + i] for i in range(mutes)},
+                           "muteRoles": {"1": snowflake(), "2": snowflake()}, "defaultMute": "1"},
+            "raceutil": {"raceVCs": [snowflake(), snowflake()], "readyEmote": "\U0001F1F7"},
+            "reactroles": {str(snowflake()): {str(snowflake()): {"✅": snowflake()}} for _ in range(reactroles)},
+            "srroles": {"roles": {str(snowflake()): ["o1y9wo6q"]}}
+        }
+    }
+
+def make_guilds(count: int, seed: int = 0, **kwargs) -> dict[str, dict]:
+    rng = random.Random(seed)
+    return {str(10**17 + i): make_guild(rng, i, **kwargs) for i in range(count)}
+
+def _channel(channel_id, guild_id: int) -> dict:
+    return {"id": str(channel_id), "guild_id": str(guild_id), "type": 0, "name": f"channel-{channel_id}", "position": 0,
+            "permission_overwrites": [], "nsfw": False, "rate_limit_per_user": 0}
+
+def _role(role_id, position: int) -> dict:
+    return {"id": str(role_id), "name": f"role-{role_id}", "permissions": "0", "position": position, "color": 0,
+            "hoist": False, "managed": False, "mentionable": False, "flags": 0}
+
+def _user(user_id: int) -> dict:
+    return {"id": str(user_id), "username": f"user{user_id}", "discriminator": "0", "global_name": None, "avatar": None}
+
+def make_gateway_events(guilds: dict[str, dict], reactions: int, seed: int = 0) -> list[tuple[float, str, dict]]:
+    """A recording-shaped event stream for `guilds` (see `make_guilds`): READY, a GUILD_CREATE per guild, then `reactions`
+    reaction adds & removes on reaction role messages & tracked game channels, alternating."""
+    rng = random.Random(seed)
+    bot_id = 10**17 - 1
+    events: list[tuple[float, str, dict]] = [(0.0, "READY", {"user": _user(bot_id) | {"bot": True}})]
+    targets = []  # (guild id, channel id, message id, emoji)
+    for guild_id, guild in guilds.items():
+        modules = guild["modules"]
+        channels = {int(c) for c in modules["reactroles"]} | {int(c) for c in modules["gameTracking"]["trackedChannels"]}
+        roles = [int(r) for messages in modules["reactroles"].values() for emojis in messages.values() for r in emojis.values()]
+        events.append((0.0, "GUILD_CREATE", {
+            "id": guild_id, "name": guild["nick"], "owner_id": str(bot_id), "member_count": 1, "unavailable": False, "features": [], "emojis": [], "stickers": [],
+            "roles": [_role(guild_id, 0)] + [_role(r, i + 1) for i, r in enumerate(roles)],
+            "channels": [_channel(c, int(guild_id)) for c in channels]}))
+        for channel_id, messages in modules["reactroles"].items():
+            for message_id, emojis in messages.items():
+                targets += [(guild_id, channel_id, message_id, emoji) for emoji in emojis]
+        for channel_id in modules["gameTracking"]["trackedChannels"]:
+            targets.append((guild_id, channel_id, str(rng.randrange(10**17, 10**18)), modules["gameTracking"]["claimEmoji"]))
+
+    for i in range(reactions):
+        guild_id, channel_id, message_id, emoji = rng.choice(targets)
+        user_id = rng.randrange(10**17, 10**18)
+        data = {"user_id": str(user_id), "guild_id": guild_id, "channel_id": channel_id, "message_id": message_id,
+                "emoji": {"id": None, "name": emoji}, "burst": False, "type": 0}
+        if i % 2 == 0:
+            data["member"] = {"user": _user(user_id), "roles": [], "joined_at": "2024-01-01T00:00:00+00:00", "deaf": False, "mute": False, "flags": 0}
+        events.append((i / 1000, "MESSAGE_REACTION_ADD" if i % 2 == 0 else "MESSAGE_REACTION_REMOVE", data))
+    return events
@@ -1,12 +1,16 @@
-from typing import TypeVar
-from discord import Game, Guild, Intents, Role, User, TextChannel
+from typing import TypeVar, cast
+from discord import Game, Guild, Member, Role, User, TextChannel
+from discord.abc import GuildChannel
 from discord.ext import commands
-from discord.ext.commands import Bot, Command, Context, Cog, command
+from discord.ext.commands import AutoShardedBot, Bot, Command, Context, Cog, command
+from discord.ext.tasks import loop
 
+from contextvars import ContextVar
+from importlib.abc import Loader
 from datetime import timedelta
-import logging, os, time
+import argparse, asyncio, importlib, logging, os, sys, time
 
-from components import auth, helpcmd, embeds
+from components import auth, helpcmd, embeds, guildlog, intents, locks, metrics, outbound, prometheus, reactions, recorder, reloader, watchdog
 from modules.customCommands import CustomCommandsCog
 import config, save
 
@@ -22,66 +26,304 @@ def get_params(cmd: Command):
 class HornetContext(embeds.EmbedContext, Context):
     """A mixin of context extensions for useful functionality."""
     bot: 'HornetBot'
+    invoke_start: float  # perf_counter() when invocation began, for command metrics
 
 
 T = TypeVar("T")
 
+GLOBAL_LOCK = "global"  # Held by the process running global loops & writing global save data, when there are several
+
+_load_timings: ContextVar[dict[str, float] | None] = ContextVar("_load_timings", default=None)  # Timings of the extension loading in this task
+
+class _TimedLoader(Loader):
+    """Wraps an extension's loader to record how long executing the module body takes, without importing it a second time"""
+    def __init__(self, loader: Loader, timings: dict[str, float]):
+        self._loader = loader
+        self._timings = timings
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        module.__loader__ = self._loader  # Only wrapped for this load
+        if module.__spec__ is not None:
+            module.__spec__.loader = self._loader
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._timings["import"] = time.perf_counter() - start
+
 class HornetBot(Bot):
-    def __init__(self, **kwargs):
+    def __init__(self, process_index: int | None = None, **kwargs):
         self._log = logging.getLogger("Hornet")
+        self.process_index = process_index  # Set when one of several processes started by launcher.py
+        self._global_lock = locks.FileLock(GLOBAL_LOCK)
+        if process_index is not None: save.writes_global = False  # Until this process takes the global lock
+        self.metrics_path = metrics.METRICS_PATH if process_index is None else f"metrics-{process_index}.json"
         self.case_insensitive = True
-        super().__init__(intents=Intents.all(), help_command=helpcmd.HornetHelpCommand(), case_insensitive=True, max_messages=config.cache_size, **kwargs)
+        self.guild_logger = guildlog.GuildLogger(self)
+        self.outbound = outbound.Outbound(self)
+        self.reactions = reactions.ReactionRouter(self)
+        self._source_digests: dict[str, str] = {}  # Module : digest of its source & imports when last (re)loaded
+        self._reload_state: dict[str, object] = {}  # Cog name : state saved by its `save_reload_state`, restored when re-added
+        # Only subscribe to & cache what the enabled modules declare they need
+        self.module_names = intents.module_names(config.disabled_modules)
+        gateway_intents, member_cache, message_cache = intents.compute(self.module_names)
+        max_messages: int | None = config.cache_size if message_cache else None  # None disables the message cache
+        self._log.info(f"Intents: {', '.join(name for name, enabled in gateway_intents if enabled)}; "
+                       f"member cache: {', '.join(name for name, enabled in member_cache if enabled) or 'none'}; "
+                       f"message cache: {max_messages or 'off'}")
+        self.recorder: recorder.Recorder | None = None
+        if config.gateway_record:
+            root, ext = os.path.splitext(config.gateway_record)
+            self.recorder = recorder.Recorder(config.gateway_record if process_index is None else f"{root}-{process_index}{ext}")
+        super().__init__(intents=gateway_intents, member_cache_flags=member_cache, help_command=helpcmd.HornetHelpCommand(), case_insensitive=True,
+                         max_messages=max_messages, enable_debug_events=self.recorder is not None, **kwargs)
     
+    async def add_cog(self, cog: Cog, /, **kwargs):
+        state = self._reload_state.pop(cog.qualified_name, None)
+        if state is not None and hasattr(cog, "restore_reload_state"):
+            cog.restore_reload_state(state)  # type: ignore  # Before cog_load, so restarted loops see the restored state
+        start = time.perf_counter()
+        await super().add_cog(cog, **kwargs)
+        if (timings := _load_timings.get()) is not None:
+            timings["cog_load"] += time.perf_counter() - start
+
+    async def _load_from_module_spec(self, spec, key: str):
+        if (timings := _load_timings.get()) is not None and spec.loader is not None:
+            spec.loader = _TimedLoader(spec.loader, timings)
+        await super()._load_from_module_spec(spec, key)
+
+    async def invoke(self, ctx: Context, /):
+        ctx = cast(HornetContext, ctx)  # get_context always builds a HornetContext
+        ctx.invoke_start = time.perf_counter()
+        await super().invoke(ctx)
+
+    async def on_command_completion(self, ctx: HornetContext):
+        metrics.commands.record(ctx.command.qualified_name, time.perf_counter() - ctx.invoke_start)  # type: ignore
+
+    async def on_socket_raw_receive(self, msg: str):
+        # Only dispatched with enable_debug_events, ie. when recording
+        if self.recorder is not None: self.recorder.record(msg)
+
+    def dispatch(self, event_name: str, /, *args, **kwargs):
+        metrics.events[event_name] = metrics.events.get(event_name, 0) + 1
+        if event_name in reactions.ROUTED_EVENTS:
+            self.reactions.route(event_name, args[0])  # Only to the cogs watching the message or channel
+            if event_name not in self._listeners: return  # Unless something is waiting on it with wait_for
+        super().dispatch(event_name, *args, **kwargs)
+
+    async def _run_event(self, coro, event_name: str, *args, **kwargs):
+        # Every event handler & cog listener is run through here; time each one
+        name = getattr(coro, "__qualname__", event_name)
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                await coro(*args, **kwargs)
+            except Exception:
+                metrics.listeners.record(name, time.perf_counter() - start, "error")
+                raise
+            metrics.listeners.record(name, time.perf_counter() - start)
+        await super()._run_event(timed, event_name, *args, **kwargs)
+
     async def get_context(self, message, *, cls: type[Context] = HornetContext):
         # Override command context for custom commands
         return await super().get_context(message, cls=cls)
     
+    def owns_guild(self, guild_id: int) -> bool:
+        """Whether this process handles `guild_id`'s events & loops; false only for guilds on another process' shards"""
+        shard_ids = getattr(self, "shard_ids", None)
+        if not self.shard_count or shard_ids is None: return True
+        return (guild_id >> 22) % self.shard_count in shard_ids
+
+    def owns_global(self) -> bool:
+        """Whether this process runs global loops & writes global save data. Call at the start of each global loop iteration.
+
+        With several processes the first to take the global lock owns both, until that process exits & another takes over;
+        the new owner re-reads global save data first, as the previous one may have changed it."""
+        if self.process_index is None or self._global_lock.held: return True
+        if not self._global_lock.acquire(): return False
+        save.take_global()
+        return True
+
     async def guild_log(self, guild: Guild, msg: str, source: str = ""):
-        """Log a message to this guild's channel. `source` is appended to the title, ideally for modules to self-identify in logs."""
+        """Log a message to this guild's channel. `source` is appended to the title, ideally for modules to self-identify in logs.
+
+        Messages are queued & sent in batches every few seconds; identical messages are collapsed with a counter."""
         guild_data = save.get_guild_data(guild.id)
         guild_channel_id: int = guild_data.get("logChannel", 0)
-        
-        guild_channel: TextChannel
-        if (guild_channel := guild.get_channel_or_thread(guild_channel_id)) is None:  # type: ignore  # TODO: add VC guard
-            await guild.fetch_channel(guild_channel_id)
-        
-        if guild_channel is None:
+        if not guild_channel_id:
             self._log.warning(f"Guild {guild} ({guild_data['nick']}) does not have logging channel! Skipping guild log...")
             self._log.warning(f"Ignored message: {msg}")
             return
-        await embeds.embed_message(guild_channel, msg, title=f"Log: {source}")
+        self.guild_logger.log(guild, guild_channel_id, msg, source)
+
+    async def on_guild_channel_delete(self, channel: GuildChannel):
+        self.guild_logger.invalidate(channel.id)
+
+    # Cached permission tiers (see auth.get_tier)
+    async def on_member_update(self, before: Member, after: Member):
+        if before._roles != after._roles: auth.invalidate(after.guild.id, after.id)
+
+    async def on_guild_role_delete(self, role: Role):
+        auth.invalidate(role.guild.id)
+
+    async def on_guild_update(self, before: Guild, after: Guild):
+        if before.owner_id != after.owner_id: auth.invalidate(after.id)
+
+    async def on_guild_remove(self, guild: Guild):
+        auth.invalidate(guild.id)
 
     async def setup_hook(self):
         """Load modules after load"""
+        self.watchdog: watchdog.Watchdog | None = None
+        if config.stall_threshold > 0:
+            self.watchdog = watchdog.Watchdog(self, config.stall_threshold)
+            self.watchdog.start()
+        self.metrics_server: prometheus.MetricsServer | None = None
+        if config.metrics_port is not None:
+            port = config.metrics_port + (self.process_index or 0)  # One port per process
+            self.metrics_server = prometheus.MetricsServer(self, port)
+            await self.metrics_server.start()
+            self._log.info(f"Serving metrics on http://{prometheus.HOST}:{port}/metrics")
+
         self.base = BaseCog(self)
         await self.add_cog(self.base)
         
         self.user_id: int = self.user.id  # type:ignore
         self.start_time = time.time()
+        self.owns_global()  # Take the global lock if it's free, so startup's template changes to global data are written
         
-        modules = []
-        for file in os.listdir(os.path.dirname(__file__) + "/modules/"):
-            if not file.endswith(".py"): continue
-            mod_name = file[:-3]   # strip .py at the end
-            modules.append(mod_name)
-
-        # Add extensions from /modules/
-        for ext in modules:
+        self._source_digests = reloader.digests(reloader.scan())
+        modules = self.module_names
+
+        # Add extensions from /modules/. Each module body runs synchronously as its load starts;
+        # setup() & cog_load() often wait on the network, so loads run concurrently
+        phase_start = time.perf_counter()
+        timings = {ext: {"import": 0.0, "setup": 0.0, "cog_load": 0.0, "template": 0.0} for ext in modules}
+        results = await asyncio.gather(*(self._load_module(ext, timings[ext]) for ext in modules))
+        loaded = [ext for ext, ok in zip(modules, results) if ok]
+        self._log.info(f"Startup: loaded {len(loaded)}/{len(modules)} modules in {(time.perf_counter() - phase_start) * 1000:.0f}ms")
+
+        # Enforce all module templates in one pass over the save
+        phase_start = time.perf_counter()
+        template_timings: dict[str, float] = {}
+        failed = save.init_modules(loaded, template_timings)
+        for ext, elapsed in template_timings.items():
+            timings[ext]["template"] = elapsed
+        for ext, e in failed.items():
+            await self.unload_extension(f"modules.{ext}")
+            self._log.error(f"Module {ext} failed to enforce template in save.json, unloaded", exc_info=e)
+        self._log.info(f"Startup: enforced save templates in {(time.perf_counter() - phase_start) * 1000:.0f}ms")
+        self._log.info(self._format_timings(timings, loaded, failed))
+
+        phase_start = time.perf_counter()
+        save.flush()
+        self._log.info(f"Startup: flushed save in {(time.perf_counter() - phase_start) * 1000:.0f}ms")
+        self.base.flushSave.start()
+
+    async def _load_module(self, ext: str, timings: dict[str, float]) -> bool:
+        """Load one extension, recording its import, setup & cog_load times. Returns whether it loaded."""
+        _load_timings.set(timings)  # Each gathered load runs in its own task & context
+        start = time.perf_counter()
+        try:
+            await self.load_extension(f"modules.{ext}")
+            return True
+        except commands.ExtensionError as e:
+            self._log.error(f"Failed to load {ext}", exc_info=e)
+            return False
+        finally:
+            timings["setup"] = time.perf_counter() - start - timings["import"] - timings["cog_load"]
+
+    async def reload_modules(self, force: bool = False) -> tuple[dict[str, float], dict[str, str], list[str]]:
+        """Reload modules whose source, or that of a component they import, changed since they were loaded (all modules if `force`).
+        Changed components are reloaded first, then modules in dependency order; new module files are loaded & deleted ones unloaded.
+
+        Returns (reloaded module : seconds, failed module : error, changed components that need a restart)."""
+        sources = reloader.scan()
+        digests = reloader.digests(sources)
+        changed = {name for name, digest in digests.items() if self._source_digests.get(name) != digest}
+        timings: dict[str, float] = {}
+        failed: dict[str, str] = {}
+
+        restart = sorted(name for name in changed if name in reloader.PINNED)
+        for name in restart:
+            digests[name] = self._source_digests.get(name, "")  # Keep reporting until the bot restarts
+        for name in reloader.order({n for n in changed if n.startswith("components.") and n not in reloader.PINNED}, sources):
+            if name not in sys.modules: continue
+            start = time.perf_counter()
             try:
-                await self.load_extension(f"modules.{ext}")
-                self._log.info(f"Loaded {ext}")
-                save.init_module(ext)
-                self._log.info(f"Module {ext} save template enforced")
+                importlib.reload(sys.modules[name])
+            except Exception as e:
+                self._log.error(f"Failed to reload {name}", exc_info=e)
+                failed[name] = str(e)
+                digests[name] = self._source_digests.get(name, "")
+            timings[name] = time.perf_counter() - start
+
+        present = {name for name in sources if name.startswith("modules.") and name.split(".")[-1] not in config.disabled_modules}
+        for ext in [ext for ext in self.extensions if ext not in present]:
+            await self.unload_extension(ext)
+            self._log.info(f"Unloaded {ext}, its file was removed")
+        for ext in reloader.order(present if force else changed & present, sources):
+            start = time.perf_counter()
+            try:
+                if ext in self.extensions:
+                    for cog in list(self.cogs.values()):
+                        if type(cog).__module__ == ext and hasattr(cog, "save_reload_state"):
+                            self._reload_state[cog.qualified_name] = cog.save_reload_state()  # type: ignore
+                    await self.reload_extension(ext)
+                else:
+                    await self.load_extension(ext)
             except commands.ExtensionError as e:
-                self._log.error(f"Failed to load {ext}", exc_info=e)
-                self._log.error(e)
-            except save.TemplateEnforcementError as e:
-                await self.unload_extension(ext)
-                self._log.error(f"Module {ext} failed to enforce template in save.json, unloaded", exc_info=e)
+                self._log.error(f"Failed to reload {ext}", exc_info=e)
+                failed[ext] = str(e.__cause__ or e)
+                digests[ext] = self._source_digests.get(ext, "")  # Retry on the next reload
+            timings[ext] = time.perf_counter() - start
+        self._reload_state.clear()  # Of cogs that were not re-added
+
+        reloaded = [ext.split(".")[-1] for ext in timings if ext.startswith("modules.") and ext not in failed]
+        for name, e in save.init_modules(reloaded, {}).items():
+            await self.unload_extension(f"modules.{name}")
+            self._log.error(f"Module {name} failed to enforce template in save.json, unloaded", exc_info=e)
+            failed[f"modules.{name}"] = str(e)
+        await save.flush_async()
+        self._source_digests = digests
+        return timings, failed, restart
+
+    @staticmethod
+    def _format_timings(timings: dict[str, dict[str, float]], loaded: list[str], failed: dict) -> str:
+        columns = ["import", "setup", "cog_load", "template"]
+        width = max([len("module")] + [len(ext) for ext in timings])
+        lines = [f"Startup: module timings (ms; setup & cog_load are wall-clock, overlapping other modules' loads)\n{'module':<{width}} " + " ".join(f"{c:>8}" for c in columns + ["total"])]
+        for ext, t in sorted(timings.items(), key=lambda item: -sum(item[1].values())):
+            status = "" if ext in loaded and ext not in failed else "  (failed)"
+            lines.append(f"{ext:<{width}} " + " ".join(f"{t[c] * 1000:8.1f}" for c in columns) + f" {sum(t.values()) * 1000:8.1f}{status}")
+        return "\n".join(lines)
 
-    async def on_command_error(self, ctx: HornetContext, error: commands.CommandError):  # type: ignore
+    async def close(self):
+        if getattr(self, "watchdog", None) is not None: self.watchdog.stop()  # type: ignore
+        if getattr(self, "metrics_server", None) is not None: await self.metrics_server.stop()  # type: ignore
+        await self.guild_logger.flush(final=True)
+        await self.outbound.drain(10)
+        await super().close()
+        save.flush()
+        metrics.dump(self.metrics_path)
+        self._global_lock.release()
+        if self.recorder is not None: self.recorder.close()
+
+    async def on_command_error(self, ctx: Context, error: commands.CommandError, /):
+        ctx = cast(HornetContext, ctx)
         command = ctx.command
         cog = ctx.cog
+        if command is not None:
+            if isinstance(error, commands.CommandOnCooldown):
+                metrics.commands.count(command.qualified_name, "cooldown")
+            elif isinstance(error, commands.CheckFailure):
+                metrics.commands.count(command.qualified_name, "check_failure")
+            else:
+                outcome = "bad_input" if isinstance(error, commands.UserInputError) else "error"
+                metrics.commands.record(command.qualified_name, time.perf_counter() - ctx.invoke_start, outcome)
         if command and command.has_error_handler(): return
         if cog and cog.has_error_handler(): return
 
@@ -92,6 +334,10 @@ class HornetBot(Bot):
             await ctx.embed_reply(title=f"Command {ctx.prefix}{failed_cmd} not found")
             return
 
+        if isinstance(error, auth.GlobalDataElsewhere):
+            await ctx.embed_reply(title="Not available here", message="Global settings are managed by another Hornet process; run this in a server on its shards")
+            return
+
         if isinstance(error, commands.CheckFailure):
             await ctx.embed_reply(title="Not permitted", message="You are not allowed to run this command")
             return
@@ -133,6 +379,45 @@ class BaseCog(Cog):
     def __init__(self, bot: HornetBot) -> None:
         self.bot = bot
         super().__init__()
+
+    async def cog_load(self):
+        # flushSave is started by setup_hook once startup's own writes are done
+        if config.snapshot_interval > 0: self.snapshotSave.start()
+        if config.metrics_interval > 0: self.dumpMetrics.start()
+
+    async def cog_unload(self):
+        self.flushSave.cancel()
+        self.snapshotSave.cancel()
+        self.dumpMetrics.cancel()
+
+    @loop(seconds=save.FLUSH_INTERVAL)
+    @metrics.timed(metrics.tasks, "flushSave")
+    async def flushSave(self):
+        """Write-behind flush of save data changed since the last tick"""
+        try:
+            await save.flush_async()
+        except Exception as e:
+            self.bot._log.error("Failed to flush save data, retrying next tick", exc_info=e)
+        save.evict_idle()
+
+    @loop(minutes=config.snapshot_interval or 60)
+    @metrics.timed(metrics.tasks, "snapshotSave")
+    async def snapshotSave(self):
+        """Periodic compressed snapshot of save data, to restore from if the save is lost or corrupted"""
+        if not self.bot.owns_global(): return
+        try:
+            path = await (save.snapshot_async() if self.bot.process_index is None else save.snapshot_store_async())
+            self.bot._log.info(f"Wrote save snapshot {path}")
+        except Exception as e:
+            self.bot._log.error("Failed to snapshot save data", exc_info=e)
+
+    @loop(minutes=config.metrics_interval or 5)
+    async def dumpMetrics(self):
+        """Periodic dump of command & listener metrics to `metrics.METRICS_PATH`"""
+        try:
+            metrics.dump(self.bot.metrics_path)
+        except OSError as e:
+            self.bot._log.error("Failed to dump metrics", exc_info=e)
     
     # Base bot commands
     @command(help="pong!", hidden=True)
@@ -159,8 +444,10 @@ class BaseCog(Cog):
         if not channel.permissions_for(channel.guild.me).send_messages:
             await context.reply("Hornet does not have permissions to send messages to this channel")
             return
-        save.get_guild_data(context.guild.id)["logChannel"] = channel.id
-        save.save()
+        guild_data = save.get_guild_data(context.guild.id)
+        if guild_data["logChannel"]: self.bot.guild_logger.invalidate(guild_data["logChannel"])
+        guild_data["logChannel"] = channel.id
+        save.save(context.guild.id)
         await context.reply(f"Log channel set to <#{channel.id}>")
 
     @command(help="Add admin role (owner only)")
@@ -168,7 +455,8 @@ class BaseCog(Cog):
     async def addAdminRole(self, context: HornetContext, role: Role):
         if context.guild is None: return
         save.get_guild_data(context.guild.id)["adminRoles"].append(role.id)
-        save.save()
+        save.save(context.guild.id)
+        auth.invalidate(context.guild.id)
         await context.message.delete()
 
     @command(help="Remove admin role (owner only)")
@@ -176,7 +464,8 @@ class BaseCog(Cog):
     async def removeAdminRole(self, context: HornetContext, role: Role):
         if context.guild is None: return
         save.get_guild_data(context.guild.id)["adminRoles"].remove(role.id)
-        save.save()
+        save.save(context.guild.id)
+        auth.invalidate(context.guild.id)
         await context.message.delete()
 
     @command(help="Set server nickname in save.json (global admin only)")
@@ -184,29 +473,58 @@ class BaseCog(Cog):
     async def setNick(self, context: HornetContext, nickname: str):
         if context.guild is None: return
         save.get_guild_data(context.guild.id)["nick"] = nickname
-        save.save()
+        save.save(context.guild.id)
         await context.message.delete()
 
-    @command(help="Reload modules (global admin only)")
+    @command(help="Command & listener latencies in ms, slowest first (global admin only)", usage="<commands|listeners|tasks|requests|loop|outbound> <top>")
     @auth.check_global_admin
-    async def reloadModules(self, context: HornetContext):
-        extension_names = list(self.bot.extensions.keys())
-        failed = []
-        for extension in extension_names:
-            try:
-                await self.bot.reload_extension(extension, package="modules")
-                self.bot._log.info(f"Loaded {extension}")
-            except commands.ExtensionError as e:
-                self.bot._log.error(f"Failed to load {extension}; ignoring")
-                self.bot._log.error(e)
-                failed.append(extension)
-        if not failed:
-            await context.reply("Reloaded all modules!", mention_author=False)
+    async def stats(self, context: HornetContext, kind: str = "commands", top: int = 15):
+        registry = {"listeners": metrics.listeners, "tasks": metrics.tasks, "requests": metrics.requests, "loop": metrics.loop, "outbound": metrics.outbound}.get(kind, metrics.commands)
+        uptime = timedelta(seconds=int(time.time() - metrics.started))
+        table = registry.table(top)
+        if kind == "outbound":
+            table = "queued: " + ", ".join(f"{p} {n}" for p, n in self.bot.outbound.depth().items()) + "\n\n" + table
+        await context.embed_reply(title=f"{kind.capitalize()} since {uptime} ago", message=f"```\n{table[:4000]}\n```")
+
+    @command(help="Reload changed modules, or all of them (global admin only)", usage="<changed|all>")
+    @auth.check_global_admin
+    async def reloadModules(self, context: HornetContext, mode: str = "changed"):
+        await save.flush_async()  # Persist pending changes before module code is swapped out
+        timings, failed, restart = await self.bot.reload_modules(force=mode == "all")
+        lines = [f"`{name}` {elapsed * 1000:.0f}ms" + (" (failed)" if name in failed else "") for name, elapsed in timings.items()]
+        lines += [f"`{name}` changed, restart to apply" for name in restart]
+        self.bot._log.info(f"Reloaded {len(timings) - len(failed)}/{len(timings)} modules: " + ", ".join(f"{n} {t * 1000:.0f}ms" for n, t in timings.items()))
+        if not lines:
+            await context.reply("No modules changed", mention_author=False)
+        elif not failed:
+            await context.embed_reply(title="Reloaded modules", message="\n".join(lines))
         else:
-            await context.reply(f"Modules {', '.join(failed)} failed to reload")
+            errors = "\n".join(f"`{name}`: {error}" for name, error in failed.items())
+            await context.embed_reply(title=f"{len(failed)} modules failed to reload", message="\n".join(lines) + "\n\n" + errors)
+
+class ShardedHornetBot(HornetBot, AutoShardedBot):
+    """HornetBot over several gateway shards: all of them, or with `shard_ids` the subset run by this process (see launcher.py)"""
+
+def parse_shard_ids(value: str) -> list[int]:
+    """Shard ids from eg. "0-3" or "0,2,4" """
+    ids = []
+    for part in value.split(","):
+        start, _, end = part.partition("-")
+        ids += range(int(start), int(end or start) + 1)
+    return ids
 
 def main():
-    bot_instance = HornetBot(command_prefix=';', activity=Game(name="Hollow Knight: Silksong"))
+    parser = argparse.ArgumentParser(description="Run Hornet")
+    parser.add_argument("--shard-count", type=int, default=config.shard_count, help="Total shards; 0 for Discord's recommendation (default: unsharded, or the config's shard_count)")
+    parser.add_argument("--shard-ids", type=parse_shard_ids, help="Shards for this process to run, eg. 0-3 (default: all)")
+    parser.add_argument("--process", type=int, help="Index of this process, set by launcher.py")
+    args = parser.parse_args()
+
+    options = {"command_prefix": ';', "activity": Game(name="Hollow Knight: Silksong"), "process_index": args.process}
+    if args.shard_count is None:
+        bot_instance = HornetBot(**options)
+    else:
+        bot_instance = ShardedHornetBot(shard_count=args.shard_count or None, shard_ids=args.shard_ids, **options)
     bot_instance.run(config.token)
 
 
@@ -1,26 +1,65 @@
 from discord import Member
-from discord.ext.commands import Context, check
+from discord.ext.commands import CheckFailure, Context, check
 
 import config, save
 
+# Permission tiers, lowest first
+MEMBER = 0
+ADMIN = 1
+OWNER = 2
+
+MAX_CACHED_MEMBERS = 1000  # Tiers cached per guild; the oldest is dropped beyond this
+
+_tiers: dict[int, dict[int, tuple[tuple[int, ...], int]]] = {}  # guild id : member id : (the member's role ids when resolved, tier)
+
+def get_tier(member: Member) -> int:
+    """A member's permission tier, cached until `invalidate`d or the member's roles change"""
+    guild_tiers = _tiers.get(member.guild.id)
+    if guild_tiers is None: guild_tiers = _tiers[member.guild.id] = {}
+    entry = guild_tiers.get(member.id)
+    # Each message builds its author's Member afresh, so compare roles by value; this also catches role changes
+    # without the members intent (ie. without on_member_update)
+    roles = tuple(member._roles)
+    if entry is not None and entry[0] == roles: return entry[1]
+    if member.id == member.guild.owner_id:  # server owner is an admin; owner_id doesn't need the member cache
+        tier = OWNER
+    elif not save.get_guild_model(member.guild.id).admin_roles.isdisjoint(member._roles):
+        tier = ADMIN
+    else:
+        tier = MEMBER
+    if entry is None and len(guild_tiers) >= MAX_CACHED_MEMBERS:
+        del guild_tiers[next(iter(guild_tiers))]
+    guild_tiers[member.id] = (roles, tier)
+    return tier
+
+def invalidate(guild_id: int, member_id: int | None = None):
+    """Forget cached tiers of a member, or of a whole guild (eg. when its admin roles or owner change)"""
+    if member_id is None:
+        _tiers.pop(guild_id, None)
+    elif (guild_tiers := _tiers.get(guild_id)) is not None:
+        guild_tiers.pop(member_id, None)
+
 async def is_admin(context: Context) -> bool:
     if not isinstance(context.author, Member) or context.guild is None: return False
     if not await guild_exists(context): return False
-    if context.author.guild.owner == context.author: return True  # server owner is an admin
-    for role in context.author.roles:
-        if role.id in save.data["guilds"][str(context.guild.id)]["adminRoles"]:
-            return True
-    return False
+    return get_tier(context.author) >= ADMIN
 
 async def is_owner(context: Context) -> bool:
     if not isinstance(context.author, Member) or context.guild is None: return False
     if not await guild_exists(context): return False
-    if context.author.guild.owner == context.author: return True  # server owner is an admin
-    else: return False
+    return get_tier(context.author) == OWNER
 
 async def is_global_admin(context: Context) -> bool:
     return context.author.id in config.admins
 
+class GlobalDataElsewhere(CheckFailure):
+    """Raised by `check_writes_global` in a process that doesn't hold the global lock, where changes to global save data would be lost"""
+
+async def writes_global(context: Context) -> bool:
+    if not context.bot.owns_global():
+        raise GlobalDataElsewhere("Global save data is owned by another process")
+    return True
+
 async def guild_exists(context: Context) -> bool:
     if not isinstance(context.author, Member) or context.guild is None: return False
     if str(context.guild.id) not in save.data["guilds"]:
@@ -32,3 +71,5 @@ check_admin = check(is_admin)
 check_owner = check(is_owner)
 
 check_global_admin = check(is_global_admin)
+
+check_writes_global = check(writes_global)
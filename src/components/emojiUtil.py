@@ -1,7 +1,10 @@
 from typing import Union
 from discord import Emoji, PartialEmoji
 from discord.ext.commands import Context, EmojiConverter, EmojiNotFound
-import emoji
+
+from components.lazy import lazy_import
+
+emoji_lib = lazy_import("emoji")  # Large unicode tables; only needed to validate unicode emoji
 
 async def to_emoji(ctx: Context, reference: str) -> Union[str, Emoji]:
     """ID/emoji string to either Emoji or str if unicode emoji"""
@@ -21,4 +24,4 @@ def to_string(emoji: Emoji | PartialEmoji | str) -> str:
 def is_emoji(codepoint: str):
     if len(codepoint) == 1:
         if 0x1F1E6 <= ord(codepoint) <= 0x1F1FF: return True
-    return emoji.is_emoji(codepoint)
+    return emoji_lib.is_emoji(codepoint)
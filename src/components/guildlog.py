@@ -0,0 +1,154 @@
+import asyncio, time
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from Hornet import HornetBot
+
+from discord import Embed, Forbidden, Guild, HTTPException, NotFound
+from discord.abc import Messageable
+
+from components import outbound
+from components.embeds import EmbedContext
+
+FLUSH_WINDOW = 2  # seconds lines are collected for before each channel's batch is sent
+DEDUPE_SECONDS = 10 * 60  # identical lines are sent at most once per this period; repeats are counted & sent when it expires
+MAX_PENDING = 100  # unique lines queued per channel per window; further lines are dropped & counted
+MESSAGE_CHARS = 6000  # Discord's limit on the total size of a message's embeds
+MESSAGE_EMBEDS = 10
+
+class GuildLogger():
+    """Delivers guild log lines in batches: lines for each log channel are collected for `FLUSH_WINDOW` seconds,
+    de-duplicated with a counter, and sent as one message of multi-field embeds. Resolved channels are cached until a send fails or the channel is deleted."""
+    def __init__(self, bot: 'HornetBot'):
+        self.bot = bot
+        self._log = bot._log.getChild("GuildLog")
+        self._pending: dict[int, dict[tuple[str, str], int]] = {}  # channel id : {(source, msg): count}, in arrival order
+        self._dropped: dict[int, int] = {}
+        self._guilds: dict[int, Guild] = {}  # channel id : guild, to resolve the channel
+        self._channels: dict[int, Messageable] = {}
+        self._sent: dict[tuple[int, str, str], float] = {}  # (channel id, source, msg) : when last sent
+        self._repeats: dict[tuple[int, str, str], int] = {}  # Occurrences suppressed since last sent
+        self._flush_task: asyncio.Task | None = None
+        self._repeat_task: asyncio.Task | None = None  # Flushes when the earliest dedupe window holding repeats expires
+        self._repeat_due = 0.0
+
+    def log(self, guild: Guild, channel_id: int, msg: str, source: str):
+        lines = self._pending.setdefault(channel_id, {})
+        key = (source, msg)
+        if key in lines:
+            lines[key] += 1
+        elif len(lines) < MAX_PENDING:
+            lines[key] = 1
+        else:
+            self._dropped[channel_id] = self._dropped.get(channel_id, 0) + 1
+        self._guilds[channel_id] = guild
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    def invalidate(self, channel_id: int):
+        self._channels.pop(channel_id, None)
+
+    async def resolve(self, guild: Guild, channel_id: int) -> Messageable | None:
+        if (channel := self._channels.get(channel_id)) is not None: return channel
+        channel = guild.get_channel_or_thread(channel_id)
+        if channel is None:
+            try:
+                channel = await guild.fetch_channel(channel_id)
+            except (NotFound, Forbidden):
+                return None
+        if not isinstance(channel, Messageable): return None
+        self._channels[channel_id] = channel
+        return channel
+
+    async def _flush_later(self):
+        await asyncio.sleep(FLUSH_WINDOW)
+        await self.flush()
+
+    async def _flush_repeats_later(self, delay: float):
+        await asyncio.sleep(delay)
+        self._repeat_task = None
+        await self.flush()
+
+    async def flush(self, final: bool = False):
+        """Send all queued lines now. If `final`, also send the counts of repeats still inside their dedupe window."""
+        pending, self._pending = self._pending, {}
+        dropped, self._dropped = self._dropped, {}
+        if final and self._repeat_task is not None:
+            self._repeat_task.cancel()
+            self._repeat_task = None
+        self._prune(pending, float("inf") if final else time.monotonic() - DEDUPE_SECONDS)
+        await asyncio.gather(*(self._send(channel_id, lines, dropped.get(channel_id, 0)) for channel_id, lines in pending.items()))
+        if not final: self._schedule_repeats()
+
+    def _schedule_repeats(self):
+        """Flush when the earliest window holding suppressed repeats expires, so their count is sent even if the line stops"""
+        if not (sent := [self._sent[key] for key in self._repeats if key in self._sent]): return
+        due = min(sent) + DEDUPE_SECONDS
+        if self._repeat_task is not None and not self._repeat_task.done():
+            if self._repeat_due <= due: return
+            self._repeat_task.cancel()
+        self._repeat_due = due
+        self._repeat_task = asyncio.create_task(self._flush_repeats_later(max(0, due - time.monotonic())))
+
+    def _prune(self, pending: dict[int, dict[tuple[str, str], int]], cutoff: float):
+        """Forget lines sent before `cutoff`. Those repeated since are queued, so `_fields` sends their count now."""
+        for key in [k for k, sent in self._sent.items() if sent <= cutoff]:
+            del self._sent[key]
+            if key in self._repeats:
+                channel_id, source, msg = key
+                pending.setdefault(channel_id, {}).setdefault((source, msg), 0)
+
+    def _fields(self, channel_id: int, lines: dict[tuple[str, str], int]) -> list[tuple[str, str]]:
+        now = time.monotonic()
+        fields = []
+        for (source, msg), count in lines.items():
+            key = (channel_id, source, msg)
+            if key in self._sent:
+                self._repeats[key] = self._repeats.get(key, 0) + count
+                continue
+            total = count + self._repeats.pop(key, 0)
+            self._sent[key] = now
+            fields.append((f"Log: {source}" if source else "Log", msg + (f"\n*(×{total})*" if total > 1 else "")))
+        return fields
+
+    @staticmethod
+    def _embeds(fields: list[tuple[str, str]]) -> list[Embed]:
+        embeds = []
+        current = None
+        for name, value in fields:
+            if len(value) > 1024:  # Too long for a field
+                embeds.append(EmbedContext.get_embed(value, title=name))
+                current = None
+                continue
+            if current is None or len(current.fields) >= 25 or len(current) + len(name) + len(value) > MESSAGE_CHARS // 2:
+                current = EmbedContext.get_embed()
+                embeds.append(current)
+            current.add_field(name=name[:256], value=value, inline=False)
+        return embeds
+
+    async def _send(self, channel_id: int, lines: dict[tuple[str, str], int], dropped: int):
+        guild = self._guilds[channel_id]
+        fields = self._fields(channel_id, lines)
+        if dropped: fields.append(("Log", f"*{dropped} more lines dropped*"))
+        if not fields: return
+        if (channel := await self.resolve(guild, channel_id)) is None:
+            self._log.warning(f"Guild {guild} does not have an accessible logging channel! Skipping {len(fields)} guild log lines...")
+            return
+
+        batch: list[Embed] = []
+        for embed in self._embeds(fields):
+            if batch and (len(batch) >= MESSAGE_EMBEDS or sum(len(e) for e in batch) + len(embed) > MESSAGE_CHARS):
+                if not await self._post(channel_id, channel, batch): return
+                batch = []
+            batch.append(embed)
+        await self._post(channel_id, channel, batch)
+
+    async def _post(self, channel_id: int, channel: Messageable, embeds: list[Embed]) -> bool:
+        try:
+            await self.bot.outbound.submit(lambda: channel.send(embeds=embeds), ("channel", channel_id), outbound.NORMAL, name="guild log")
+            return True
+        except (NotFound, Forbidden) as e:
+            self.invalidate(channel_id)
+            self._log.warning(f"Could not send to log channel {channel_id}, dropping batch: {e}")
+        except HTTPException as e:
+            self._log.error(f"Failed to send guild log batch to {channel_id}", exc_info=e)
+        return False
@@ -0,0 +1,60 @@
+import ast, logging, os
+
+from discord import Intents, MemberCacheFlags
+
+from components.reloader import SRC_PATH
+
+_log = logging.getLogger("Hornet")
+
+# Needed by the bot itself to read prefix commands, including in DMs
+BASE_INTENTS = ["guilds", "guild_messages", "dm_messages", "message_content"]
+DECLARATIONS = {"INTENTS": [], "MEMBER_CACHE": [], "MESSAGE_CACHE": False}  # Module-level literals & their defaults
+
+def module_names(disabled: list[str]) -> list[str]:
+    """Modules in /modules/, minus `disabled`"""
+    names = []
+    for file in sorted(os.listdir(os.path.join(SRC_PATH, "modules"))):
+        if not file.endswith(".py"): continue
+        if file[:-3] in disabled: continue
+        names.append(file[:-3])
+    return names
+
+def declarations(module_name: str) -> dict:
+    """A module's `INTENTS`, `MEMBER_CACHE` & `MESSAGE_CACHE`. Read from its source, as intents are needed before modules are imported."""
+    result = {key: default for key, default in DECLARATIONS.items()}
+    with open(os.path.join(SRC_PATH, "modules", f"{module_name}.py"), "rb") as f:
+        try:
+            tree = ast.parse(f.read())
+        except SyntaxError:
+            return result  # Reported when the module is loaded
+    for node in tree.body:
+        if not isinstance(node, ast.Assign) or len(node.targets) != 1: continue
+        target = node.targets[0]
+        if not isinstance(target, ast.Name) or target.id not in DECLARATIONS: continue
+        try:
+            result[target.id] = ast.literal_eval(node.value)
+        except ValueError:
+            _log.error(f"Module {module_name} {target.id} must be a literal; ignoring")
+    return result
+
+def compute(module_names: list[str]) -> tuple[Intents, MemberCacheFlags, bool]:
+    """The union of what `module_names` declare: (gateway intents, member cache flags, whether to cache messages)"""
+    intents = Intents.none()
+    member_cache = MemberCacheFlags.none()
+    message_cache = False
+    for name in BASE_INTENTS:
+        setattr(intents, name, True)
+    for module_name in module_names:
+        needs = declarations(module_name)
+        for name in needs["INTENTS"]:
+            if not hasattr(Intents, name):
+                _log.error(f"Module {module_name} declares unknown intent {name}; ignoring")
+                continue
+            setattr(intents, name, True)
+        for name in needs["MEMBER_CACHE"]:
+            if not hasattr(MemberCacheFlags, name):
+                _log.error(f"Module {module_name} declares unknown member cache flag {name}; ignoring")
+                continue
+            setattr(member_cache, name, True)
+        message_cache = message_cache or bool(needs["MESSAGE_CACHE"])
+    return intents, member_cache, message_cache
@@ -0,0 +1,16 @@
+import importlib.util, sys
+from types import ModuleType
+
+def lazy_import(name: str) -> ModuleType:
+    """Import a module that is only executed when one of its attributes is first used, to keep heavy dependencies off the startup path.
+
+    Parent packages are still imported immediately. Use `TYPE_CHECKING` imports for names only needed in annotations."""
+    if name in sys.modules: return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.loader is None: raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
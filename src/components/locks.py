@@ -0,0 +1,46 @@
+import logging, os
+try:
+    import fcntl
+except ImportError:  # Windows; only single process operation is supported
+    fcntl = None
+
+LOCK_PATH = "locks"
+
+_log = logging.getLogger("Hornet")
+
+class FileLock():
+    """Exclusive lock on `LOCK_PATH`/`name`.lock, shared by every Hornet process in this directory.
+
+    Held until released or the process exits (the OS drops it, even on a crash), so another process can take over."""
+    def __init__(self, name: str):
+        self.name = name
+        self.path = os.path.join(LOCK_PATH, f"{name}.lock")
+        self._file = None
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None
+
+    def acquire(self) -> bool:
+        """Take the lock if it is free, without blocking. Returns whether this process holds it."""
+        if self._file is not None: return True
+        if fcntl is None: return True
+        os.makedirs(LOCK_PATH, exist_ok=True)
+        f = open(self.path, "a+")
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        f.truncate(0)
+        f.write(str(os.getpid()))
+        f.flush()
+        self._file = f
+        _log.info(f"Took lock {self.name}")
+        return True
+
+    def release(self):
+        if self._file is None: return
+        if fcntl is not None: fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
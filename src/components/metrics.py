@@ -0,0 +1,114 @@
+import functools, json, os, time
+from bisect import bisect_left
+
+METRICS_PATH = "metrics.json"
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+class Histogram():
+    """Latency histogram with fixed millisecond buckets. The final bucket counts everything slower than `BUCKETS_MS[-1]`."""
+    __slots__ = ("counts", "total", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        ms = seconds * 1000
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.total += 1
+        self.sum += ms
+        if ms > self.max: self.max = ms
+
+    def quantile(self, q: float) -> float:
+        """Upper bound in ms of the bucket holding the `q` quantile (the max, for the final bucket)"""
+        if self.total == 0: return 0.0
+        rank = q * self.total
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank: return min(BUCKETS_MS[i], self.max) if i < len(BUCKETS_MS) else self.max
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {"count": self.total, "mean_ms": self.sum / self.total if self.total else 0.0, "max_ms": self.max,
+                "buckets": {f"le_{b}": c for b, c in zip(BUCKETS_MS + ("inf",), self.counts)}}
+
+class Stat():
+    """Latency & outcome counts of one command or listener"""
+    __slots__ = ("latency", "outcomes")
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.outcomes: dict[str, int] = {}
+
+class Registry():
+    """Stats of a kind of handler (commands or listeners), by name"""
+    def __init__(self):
+        self.stats: dict[str, Stat] = {}
+
+    def _get(self, name: str) -> Stat:
+        stat = self.stats.get(name)
+        if stat is None: stat = self.stats[name] = Stat()
+        return stat
+
+    def record(self, name: str, seconds: float, outcome: str = "ok"):
+        stat = self._get(name)
+        stat.latency.observe(seconds)
+        stat.outcomes[outcome] = stat.outcomes.get(outcome, 0) + 1
+
+    def count(self, name: str, outcome: str):
+        """Count an outcome without a latency, eg. a cooldown rejection"""
+        stat = self._get(name)
+        stat.outcomes[outcome] = stat.outcomes.get(outcome, 0) + 1
+
+    def to_dict(self) -> dict:
+        return {name: {"latency": s.latency.to_dict(), "outcomes": dict(s.outcomes)} for name, s in self.stats.items()}
+
+    def table(self, top: int = 15) -> str:
+        """Slowest handlers by p95 latency, as a fixed-width table"""
+        rows = sorted(self.stats.items(), key=lambda item: -item[1].latency.quantile(0.95))[:top]
+        width = max([4] + [len(name) for name, _ in rows])
+        lines = [f"{'name':<{width}} {'n':>6} {'p50':>6} {'p95':>6} {'p99':>6} {'max':>7}  other"]
+        for name, s in rows:
+            h = s.latency
+            other = ", ".join(f"{k} {v}" for k, v in sorted(s.outcomes.items()) if k != "ok")
+            lines.append(f"{name:<{width}} {h.total:>6} {h.quantile(0.5):>6.0f} {h.quantile(0.95):>6.0f} {h.quantile(0.99):>6.0f} {h.max:>7.0f}  {other}")
+        return "\n".join(lines)
+
+commands = Registry()
+listeners = Registry()
+tasks = Registry()  # Iterations of background loops
+requests = Registry()  # Calls to external APIs (speedrun.com, Twitch)
+loop = Registry()  # Event loop health, eg. scheduling lag
+outbound = Registry()  # Queued Discord REST calls: "wait <priority>" for time queued, "<priority> <name>" for the calls
+events: dict[str, int] = {}  # Dispatched events by name
+started = time.time()
+
+def timed(registry: Registry, name: str):
+    """Decorator recording the duration & outcome of each call of a coroutine function in `registry`. Goes beneath `@loop`."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = await func(*args, **kwargs)
+            except Exception:
+                registry.record(name, time.perf_counter() - start, "error")
+                raise
+            registry.record(name, time.perf_counter() - start)
+            return result
+        return wrapper
+    return decorator
+
+def to_dict() -> dict:
+    return {"since": started, "at": time.time(), "commands": commands.to_dict(), "listeners": listeners.to_dict(),
+            "tasks": tasks.to_dict(), "requests": requests.to_dict(), "loop": loop.to_dict(), "outbound": outbound.to_dict(), "events": dict(events)}
+
+def dump(path: str = METRICS_PATH):
+    """Atomically write all metrics to `path` as JSON"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(to_dict(), f, indent=4)
+    os.replace(tmp_path, path)
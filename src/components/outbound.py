@@ -0,0 +1,141 @@
+import asyncio, heapq, itertools, time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Hashable
+if TYPE_CHECKING:
+    from Hornet import HornetBot
+
+from components import metrics
+
+# Priorities, most urgent first
+MODERATION = 0  # Unmutes, role grants & removals
+NORMAL = 1  # Posts & deletes that keep a channel correct, logs
+COSMETIC = 2  # Claim reactions, changelog embeds
+PRIORITY_NAMES = {MODERATION: "moderation", NORMAL: "normal", COSMETIC: "cosmetic"}
+
+MAX_IN_FLIGHT = 8  # Requests running at once, across all routes; well inside Discord's global limit of 50/s
+ROUTE_IN_FLIGHT = 1  # Requests running at once per route. discord.py waits out a route's rate limit inside the request, so more would only queue there, unordered
+
+class Job():
+    __slots__ = ("action", "route", "priority", "key", "name", "queued", "futures", "started")
+
+    def __init__(self, action: Callable[[], Awaitable], route: Hashable, priority: int, key: Hashable | None, name: str):
+        self.action = action
+        self.route = route
+        self.priority = priority
+        self.key = key
+        self.name = name
+        self.queued = time.perf_counter()
+        self.futures: list[asyncio.Future] = []
+        self.started = False
+
+class Outbound():
+    """Shared queue for Discord REST calls made in bulk by background loops & listeners.
+
+    Calls are started most urgent first, at most `ROUTE_IN_FLIGHT` per route (eg. `("channel", id)` or `("guild", id)`, matching Discord's rate limit buckets)
+    and `MAX_IN_FLIGHT` in total, so a backlog of cosmetic work on one route can't hold up moderation on another.
+    A call submitted with the `key` of a queued call replaces it, eg. a role removal replaces a pending grant of the same role."""
+    def __init__(self, bot: 'HornetBot'):
+        self.bot = bot
+        self._log = bot._log.getChild("Outbound")
+        self._routes: dict[Hashable, list[tuple[int, int, Job]]] = {}  # Route : heap of its queued jobs
+        self._ready: list[tuple[int, int, Hashable]] = []  # Heap of routes able to start their most urgent job, by that job's place in line
+        self._seq = itertools.count()
+        self._keyed: dict[Hashable, Job] = {}  # Queued (not yet started) jobs by key
+        self._route_in_flight: dict[Hashable, int] = {}
+        self._in_flight = 0
+        self._tasks: set[asyncio.Task] = set()  # Running calls; the loop only keeps weak references to tasks
+        self._queued: dict[int, int] = {p: 0 for p in PRIORITY_NAMES}
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def submit(self, action: Callable[[], Awaitable[Any]], route: Hashable, priority: int = NORMAL, key: Hashable | None = None, name: str = "call") -> asyncio.Future:
+        """Queue `action` (eg. `lambda: member.add_roles(role)`). Returns a future for its result; await it to wait for the call."""
+        future = asyncio.get_running_loop().create_future()
+        job = self._keyed.get(key) if key is not None else None
+        if job is not None:  # Coalesce: keep the queued job's place in line, run the newest action
+            job.action = action
+            job.name = name or job.name
+            if priority < job.priority:
+                self._queued[job.priority] -= 1
+                self._queued[priority] += 1
+                job.priority = priority
+                heapq.heappush(self._routes[job.route], (priority, next(self._seq), job))  # The old entry is skipped once this one starts the job
+                self._mark_ready(job.route)
+            metrics.outbound.count(f"{PRIORITY_NAMES[job.priority]} {job.name}", "coalesced")
+        else:
+            job = Job(action, route, priority, key, name)
+            if key is not None: self._keyed[key] = job
+            heapq.heappush(self._routes.setdefault(route, []), (priority, next(self._seq), job))
+            self._queued[priority] += 1
+            self._mark_ready(route)
+        job.futures.append(future)
+        self._idle.clear()
+        self._schedule()
+        return future
+
+    def depth(self) -> dict[str, int]:
+        """Queued calls by priority name"""
+        return {PRIORITY_NAMES[p]: count for p, count in self._queued.items()}
+
+    async def drain(self, timeout: float):
+        """Wait up to `timeout` seconds for queued & running calls to finish"""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            self._log.warning(f"Gave up waiting for outbound queue: {self.depth()} queued, {self._in_flight} running")
+
+    def _mark_ready(self, route: Hashable):
+        """Offer `route`'s most urgent job to `_schedule`, if it has one & a free slot. Call whenever either changes."""
+        queue = self._routes.get(route)
+        if queue is None: return
+        while queue and queue[0][2].started:  # Superseded entries of jobs whose priority was raised
+            heapq.heappop(queue)
+        if not queue:
+            del self._routes[route]
+        elif self._route_in_flight.get(route, 0) < ROUTE_IN_FLIGHT:
+            heapq.heappush(self._ready, (queue[0][0], queue[0][1], route))
+
+    def _schedule(self):
+        while self._ready and self._in_flight < MAX_IN_FLIGHT:
+            priority, seq, route = heapq.heappop(self._ready)
+            queue = self._routes.get(route)
+            # Stale if the route's head has changed or it's busy since; whatever changed it offered the route again
+            if queue is None or queue[0][:2] != (priority, seq) or self._route_in_flight.get(route, 0) >= ROUTE_IN_FLIGHT: continue
+            self._start(heapq.heappop(queue)[2])
+            self._mark_ready(route)
+        if self._in_flight == 0 and not self._routes: self._idle.set()
+
+    def _start(self, job: Job):
+        job.started = True
+        if job.key is not None: self._keyed.pop(job.key, None)
+        self._queued[job.priority] -= 1
+        self._route_in_flight[job.route] = self._route_in_flight.get(job.route, 0) + 1
+        self._in_flight += 1
+        metrics.outbound.record(f"wait {PRIORITY_NAMES[job.priority]}", time.perf_counter() - job.queued)
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job: Job):
+        name = f"{PRIORITY_NAMES[job.priority]} {job.name}"
+        start = time.perf_counter()
+        try:
+            result = await job.action()
+        except asyncio.CancelledError:
+            for future in job.futures: future.cancel()
+            raise
+        except Exception as e:
+            metrics.outbound.record(name, time.perf_counter() - start, "error")
+            for future in job.futures:
+                if not future.done(): future.set_exception(e)
+        else:
+            metrics.outbound.record(name, time.perf_counter() - start)
+            for future in job.futures:
+                if not future.done(): future.set_result(result)
+        finally:
+            self._in_flight -= 1
+            if (count := self._route_in_flight[job.route] - 1) > 0:
+                self._route_in_flight[job.route] = count
+            else:
+                del self._route_in_flight[job.route]
+            self._mark_ready(job.route)
+            self._schedule()
@@ -0,0 +1,85 @@
+import math
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from Hornet import HornetBot
+
+from aiohttp import web
+
+from components import metrics
+
+HOST = "127.0.0.1"  # Never exposed beyond the local machine
+
+# (registry, metric name, label) for each histogram registry
+HISTOGRAMS = [
+    (metrics.commands, "hornet_command", "command"),
+    (metrics.listeners, "hornet_listener", "listener"),
+    (metrics.tasks, "hornet_task", "task"),
+    (metrics.requests, "hornet_request", "request"),
+    (metrics.loop, "hornet_event_loop", "sample"),
+    (metrics.outbound, "hornet_outbound", "operation"),
+]
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _header(lines: list[str], name: str, kind: str, help: str):
+    lines.append(f"# HELP {name} {help}")
+    lines.append(f"# TYPE {name} {kind}")
+
+def render(bot: 'HornetBot') -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines: list[str] = []
+    if math.isfinite(bot.latency):
+        _header(lines, "hornet_gateway_latency_seconds", "gauge", "Latency between a gateway heartbeat and its ack")
+        lines.append(f"hornet_gateway_latency_seconds {bot.latency}")
+    _header(lines, "hornet_message_cache_size", "gauge", "Messages in the message cache")
+    lines.append(f"hornet_message_cache_size {len(bot.cached_messages)}")
+    _header(lines, "hornet_guilds", "gauge", "Guilds the bot is in")
+    lines.append(f"hornet_guilds {len(bot.guilds)}")
+
+    _header(lines, "hornet_outbound_queue_depth", "gauge", "Discord REST calls waiting in the outbound queue, by priority")
+    for priority, count in bot.outbound.depth().items():
+        lines.append(f'hornet_outbound_queue_depth{{priority="{priority}"}} {count}')
+
+    _header(lines, "hornet_events_total", "counter", "Events dispatched, by event name")
+    for event, count in metrics.events.items():
+        lines.append(f'hornet_events_total{{event="{_escape(event)}"}} {count}')
+
+    for registry, base, label in HISTOGRAMS:
+        _header(lines, f"{base}_duration_seconds", "histogram", f"Duration by {label}")
+        for name, stat in registry.stats.items():
+            h = stat.latency
+            labels = f'{label}="{_escape(name)}"'
+            cumulative = 0
+            for bound, count in zip(metrics.BUCKETS_MS, h.counts):
+                cumulative += count
+                lines.append(f'{base}_duration_seconds_bucket{{{labels},le="{bound / 1000}"}} {cumulative}')
+            lines.append(f'{base}_duration_seconds_bucket{{{labels},le="+Inf"}} {h.total}')
+            lines.append(f"{base}_duration_seconds_sum{{{labels}}} {h.sum / 1000}")
+            lines.append(f"{base}_duration_seconds_count{{{labels}}} {h.total}")
+        _header(lines, f"{base}_outcomes_total", "counter", f"Outcomes by {label}, eg. ok, error, cooldown")
+        for name, stat in registry.stats.items():
+            for outcome, count in stat.outcomes.items():
+                lines.append(f'{base}_outcomes_total{{{label}="{_escape(name)}",outcome="{_escape(outcome)}"}} {count}')
+    return "\n".join(lines) + "\n"
+
+class MetricsServer():
+    """Serves `render` at http://127.0.0.1:`port`/metrics for Prometheus to scrape"""
+    def __init__(self, bot: 'HornetBot', port: int):
+        self.bot = bot
+        self.port = port
+        self._runner: web.AppRunner | None = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        return web.Response(body=render(self.bot).encode(), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, HOST, self.port).start()
+
+    async def stop(self):
+        if self._runner is not None: await self._runner.cleanup()
+        self._runner = None
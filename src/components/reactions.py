@@ -0,0 +1,67 @@
+from typing import TYPE_CHECKING, Any, Callable, Coroutine
+if TYPE_CHECKING:
+    from discord import RawReactionActionEvent
+    from Hornet import HornetBot
+
+ROUTED_EVENTS = ("raw_reaction_add", "raw_reaction_remove")
+
+Handler = Callable[['RawReactionActionEvent'], Coroutine[Any, Any, None]]  # Scheduled like listeners, so must be a coroutine function
+
+class ReactionRouter():
+    """Dispatches raw reaction events only to the owners (cogs) watching the reacted message or its channel.
+
+    Most reactions concern no module, so they're rejected with two dict lookups instead of running every cog's listener.
+    Owners `register` their handlers, then `watch_message`/`watch_channel` as their save data or state changes.
+    Reactions by the bot itself are never routed."""
+    def __init__(self, bot: 'HornetBot'):
+        self.bot = bot
+        self._handlers: dict[str, dict[str, Handler]] = {event: {} for event in ROUTED_EVENTS}  # event : owner : handler
+        self._messages: dict[int, set[str]] = {}  # message id : watching owners
+        self._channels: dict[int, set[str]] = {}  # channel id : watching owners
+
+    def register(self, owner: str, on_add: Handler | None = None, on_remove: Handler | None = None):
+        for event, handler in zip(ROUTED_EVENTS, (on_add, on_remove)):
+            if handler is not None: self._handlers[event][owner] = handler
+
+    def unregister(self, owner: str):
+        """Drop an owner's handlers & everything it watches"""
+        for handlers in self._handlers.values():
+            handlers.pop(owner, None)
+        for index in (self._messages, self._channels):
+            for key in [k for k, owners in index.items() if owner in owners]:
+                self._unwatch(index, owner, key)
+
+    def watch_message(self, owner: str, message_id: int):
+        self._messages.setdefault(message_id, set()).add(owner)
+
+    def unwatch_message(self, owner: str, message_id: int):
+        self._unwatch(self._messages, owner, message_id)
+
+    def watch_channel(self, owner: str, channel_id: int):
+        self._channels.setdefault(channel_id, set()).add(owner)
+
+    def unwatch_channel(self, owner: str, channel_id: int):
+        self._unwatch(self._channels, owner, channel_id)
+
+    @staticmethod
+    def _unwatch(index: dict[int, set[str]], owner: str, key: int):
+        owners = index.get(key)
+        if owners is None: return
+        owners.discard(owner)
+        if not owners: del index[key]
+
+    def route(self, event_name: str, payload: 'RawReactionActionEvent'):
+        message_owners = self._messages.get(payload.message_id)
+        channel_owners = self._channels.get(payload.channel_id)
+        if message_owners is None and channel_owners is None: return
+        if payload.user_id == self.bot.user_id: return
+        handlers = self._handlers[event_name]
+        if message_owners is not None:
+            for owner in message_owners:
+                if (handler := handlers.get(owner)) is not None:
+                    self.bot._schedule_event(handler, "on_" + event_name, payload)
+        if channel_owners is not None:
+            for owner in channel_owners:
+                if message_owners is not None and owner in message_owners: continue  # Already routed by message
+                if (handler := handlers.get(owner)) is not None:
+                    self.bot._schedule_event(handler, "on_" + event_name, payload)
@@ -0,0 +1,55 @@
+import gzip, json, time
+from typing import Iterator
+
+FORMAT = "hornet-gateway"
+VERSION = 1
+
+# Dispatches worth replaying through cogs. READY & GUILD_CREATE seed the bot user & guild cache on replay.
+RECORDED_EVENTS = {"READY", "GUILD_CREATE", "MESSAGE_REACTION_ADD", "MESSAGE_REACTION_REMOVE", "MESSAGE_UPDATE", "MESSAGE_DELETE", "GUILD_MEMBER_UPDATE"}
+TRIMMED_GUILD_KEYS = ("members", "presences")  # Large & not needed to replay the events above
+
+class Recorder():
+    """Appends raw gateway dispatches to a gzipped JSON lines file: a header line, then `[seconds since start, event, data]` per dispatch.
+
+    Fed from `on_socket_raw_receive`, which discord.py only dispatches with `enable_debug_events`."""
+    def __init__(self, path: str, events: set[str] = RECORDED_EVENTS):
+        self.path = path
+        self.events = events
+        self.count = 0
+        self._start = time.monotonic()
+        self._file = gzip.open(path, "at", encoding="utf-8")
+        self._write({"format": FORMAT, "version": VERSION, "started": time.time()})
+
+    def _write(self, obj):
+        self._file.write(json.dumps(obj, separators=(",", ":"), ensure_ascii=False))
+        self._file.write("\n")
+
+    def record(self, raw: str):
+        msg = json.loads(raw)
+        event = msg.get("t")
+        if msg.get("op") != 0 or event not in self.events: return
+        data = msg["d"]
+        if event == "READY":
+            data = {"user": data["user"]}  # The rest is session state
+        elif event == "GUILD_CREATE":
+            data = {k: v for k, v in data.items() if k not in TRIMMED_GUILD_KEYS}
+        self._write([round(time.monotonic() - self._start, 3), event, data])
+        self.count += 1
+
+    def close(self):
+        self._file.close()
+
+def read(path: str) -> Iterator[tuple[float, str, dict]]:
+    """Dispatches in a recording, as (seconds since recording started, event, data). A file may hold several appended recordings."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        offset = 0.0
+        last = 0.0
+        for line in f:
+            entry = json.loads(line)
+            if isinstance(entry, dict):  # Header of an appended recording; keep offsets increasing
+                if entry.get("format") != FORMAT or entry.get("version") != VERSION:
+                    raise ValueError(f"{path} is not a version {VERSION} gateway recording")
+                offset = last
+                continue
+            last = offset + entry[0]
+            yield last, entry[1], entry[2]
@@ -0,0 +1,76 @@
+import ast, hashlib, os
+
+SRC_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGES = ("components", "modules")
+
+# Components holding state that must outlive a reload (registries, api clients, running servers) or referenced by the bot itself;
+# changes to these are reported as needing a restart instead of being reloaded
+PINNED = {"components.metrics", "components.twitch", "components.lazy", "components.guildlog",
+          "components.watchdog", "components.prometheus", "components.helpcmd", "components.reloader"}
+
+class Source():
+    """A module's source hash & the local modules it imports"""
+    __slots__ = ("name", "digest", "deps")
+
+    def __init__(self, name: str, digest: str, deps: set[str]):
+        self.name = name
+        self.digest = digest
+        self.deps = deps
+
+def _imports(tree: ast.AST, names: set[str]) -> set[str]:
+    """Local modules (`components.x` & `modules.x`) imported anywhere in `tree`"""
+    deps = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            deps.update(alias.name for alias in node.names if alias.name in names)
+        elif isinstance(node, ast.ImportFrom) and node.module is not None and node.level == 0:
+            if node.module in names:
+                deps.add(node.module)
+            elif node.module in PACKAGES:  # `from components import auth, embeds`
+                deps.update(f"{node.module}.{alias.name}" for alias in node.names if f"{node.module}.{alias.name}" in names)
+    return deps
+
+def scan() -> dict[str, Source]:
+    """Hash every module in `PACKAGES` & find its local imports"""
+    raw: dict[str, bytes] = {}
+    for package in PACKAGES:
+        for file in sorted(os.listdir(os.path.join(SRC_PATH, package))):
+            if not file.endswith(".py"): continue
+            with open(os.path.join(SRC_PATH, package, file), "rb") as f:
+                raw[f"{package}.{file[:-3]}"] = f.read()
+    names = set(raw)
+    sources = {}
+    for name, code in raw.items():
+        try:
+            deps = _imports(ast.parse(code), names) - {name}
+        except SyntaxError:
+            deps = set()  # Still hashed, so the reload reports the error
+        sources[name] = Source(name, hashlib.sha256(code).hexdigest(), deps)
+    return sources
+
+def digests(sources: dict[str, Source]) -> dict[str, str]:
+    """Digest of each module's source combined with those of everything it imports, transitively"""
+    result: dict[str, str] = {}
+    def visit(name: str, stack: frozenset[str]) -> str:
+        if name in result: return result[name]
+        source = sources[name]
+        h = hashlib.sha256(source.digest.encode())
+        for dep in sorted(source.deps):
+            if dep not in stack: h.update(visit(dep, stack | {name}).encode())  # Import cycles are cut where they close
+        result[name] = h.hexdigest()
+        return result[name]
+    for name in sources: visit(name, frozenset())
+    return result
+
+def order(names: set[str], sources: dict[str, Source]) -> list[str]:
+    """`names` sorted so that each comes after the others it imports"""
+    ordered: list[str] = []
+    seen: set[str] = set()
+    def visit(name: str):
+        if name in seen: return
+        seen.add(name)
+        for dep in sorted(sources[name].deps):
+            visit(dep)
+        if name in names: ordered.append(name)
+    for name in sorted(names): visit(name)
+    return ordered
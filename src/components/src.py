@@ -1,35 +1,64 @@
-from speedruncompy import GetUserPopoverData, GetSearch
-from speedruncompy import NetworkId, Game, User
-from speedruncompy.exceptions import APIException
+import time
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from speedruncompy import Game, SpeedrunClient, User
 
-from speedruncompy import SpeedrunClient
+from components import metrics
+from components.lazy import lazy_import
 
-CLIENT = SpeedrunClient("Hornet_Bot")
+speedruncompy = lazy_import("speedruncompy")
+
+CLIENT: 'SpeedrunClient'  # Created on first use (see `get_client`), so importing this module doesn't import speedruncompy
+
+def get_client() -> 'SpeedrunClient':
+    global CLIENT
+    if "CLIENT" not in globals():
+        import config
+        CLIENT = speedruncompy.SpeedrunClient("Hornet_Bot")
+        if config.src_phpsessid is not None:
+            CLIENT.PHPSESSID = config.src_phpsessid
+    return CLIENT
+
+def __getattr__(name: str):
+    if name == "CLIENT": return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+async def perform(request, all_pages: bool = False, **kwargs):
+    """Perform a speedruncompy request (every page of it if `all_pages`), recording its latency & outcome in `metrics.requests`."""
+    name = f"src {type(request).__name__}"
+    start = time.perf_counter()
+    try:
+        result = await (request.perform_all_async(**kwargs) if all_pages else request.perform_async(**kwargs))
+    except Exception:
+        metrics.requests.record(name, time.perf_counter() - start, "error")
+        raise
+    metrics.requests.record(name, time.perf_counter() - start)
+    return result
 
 class NotFoundException(Exception): pass
 
 class UserNotFound(Exception): pass
 class NoDiscordUsername(Exception): pass
 
-async def find_game(name: str) -> Game:
+async def find_game(name: str) -> 'Game':
     try:
-        search_results = await GetSearch(name, includeGames=True, limit=1).perform_async()
+        search_results = await perform(speedruncompy.GetSearch(name, includeGames=True, limit=1))
         return search_results.gameList[0]
     except IndexError:
         raise NotFoundException
 
-async def find_src_user(username: str) -> User:
+async def find_src_user(username: str) -> 'User':
     try:
-        results = await GetSearch(username, favorExactMatches=True, includeUsers=True, _api=CLIENT).perform_async()
+        results = await perform(speedruncompy.GetSearch(username, favorExactMatches=True, includeUsers=True, _api=get_client()))
         return results.userList[0]
     except IndexError:
         raise NotFoundException
     
-async def get_src_user_discord(username: str) -> tuple[User, str]:
+async def get_src_user_discord(username: str) -> tuple['User', str]:
     """Gets the discord username of a speedrun.com User."""
     try:
-        userSearch = await GetSearch(username, favorExactMatches=True, includeUsers=True, limit=1, _api=CLIENT).perform_async()
-    except APIException as e:
+        userSearch = await perform(speedruncompy.GetSearch(username, favorExactMatches=True, includeUsers=True, limit=1, _api=get_client()))
+    except speedruncompy.exceptions.APIException as e:
         raise e
     
     if len(userSearch.userList) < 1:
@@ -37,12 +66,12 @@ async def get_src_user_discord(username: str) -> tuple[User, str]:
     user = userSearch.userList[0]
     
     try:
-        userPopover = await GetUserPopoverData(user.id).perform_async(autovary=True)
-    except APIException as e:
+        userPopover = await perform(speedruncompy.GetUserPopoverData(user.id), autovary=True)
+    except speedruncompy.exceptions.APIException as e:
         raise e
     
     try:
-        discord_username = next(x.value for x in userPopover.userSocialConnectionList if x.networkId == NetworkId.DISCORD)
+        discord_username = next(x.value for x in userPopover.userSocialConnectionList if x.networkId == speedruncompy.NetworkId.DISCORD)
     except StopIteration:
         raise NoDiscordUsername(user.name)
     
@@ -1,13 +1,21 @@
-from typing import Optional
-import config, logging, re
-from twitchAPI.twitch import Twitch
-from twitchAPI.object import Video
-from twitchAPI.helper import first
-from twitchAPI.types import AuthScope, VideoType
+from typing import TYPE_CHECKING, Optional
+import asyncio, config, logging, re
+if TYPE_CHECKING:
+    from twitchAPI.twitch import Twitch
+    from twitchAPI.object import Video
+
+from components import metrics
+from components.lazy import lazy_import
+
+# twitchAPI pulls in aiohttp & friends; only import it once the api is used
+twitch_api = lazy_import("twitchAPI.twitch")
+helper = lazy_import("twitchAPI.helper")
+twitch_types = lazy_import("twitchAPI.types")
 
 _log = logging.getLogger("twitch")
 
-api: Twitch | None = None
+api: 'Twitch | None' = None
+_setup_lock = asyncio.Lock()  # Modules using twitch may be set up concurrently; only the first sets up the api
 
 TWITCH_URL_MATCH: re.Pattern = re.compile(r"https?:\/\/(?:www.)?twitch.tv\/videos\/(\d{9,11})")
 
@@ -19,27 +27,30 @@ if not config.twitch_api_secret:
 class NotFoundException(Exception):
     pass
 
+@metrics.timed(metrics.requests, "twitch setup")
 async def setup():
     global api
-    if api is not None:
-        _log.warning("Setup attempted when already set up, ignoring")
-        return
-    if not config.twitch_api_id or not config.twitch_api_secret:
-        _log.warning("Setup attempted when twitch api info not present, ignoring")
-        return
-    try:
-        api = await Twitch(config.twitch_api_id, app_secret=config.twitch_api_secret, target_app_auth_scope=[AuthScope.ANALYTICS_READ_EXTENSION])
-    except Exception as e:
-        _log.error(e, exc_info=True)
+    async with _setup_lock:
+        if api is not None:
+            _log.debug("Setup attempted when already set up, ignoring")
+            return
+        if not config.twitch_api_id or not config.twitch_api_secret:
+            _log.warning("Setup attempted when twitch api info not present, ignoring")
+            return
+        try:
+            api = await twitch_api.Twitch(config.twitch_api_id, app_secret=config.twitch_api_secret, target_app_auth_scope=[twitch_types.AuthScope.ANALYTICS_READ_EXTENSION])
+        except Exception as e:
+            _log.error(e, exc_info=True)
 
+@metrics.timed(metrics.requests, "twitch video_id_is_persistent")
 async def video_id_is_persistent(id: str | int):
     global api
     if api is None: raise Exception("Twitch API not initialised!")
     vid_data = api.get_videos(ids=[str(id)])
-    vid: Video | None = await first(vid_data)
+    vid: 'Video | None' = await helper.first(vid_data)
     if vid is None:
         return True  # If video isn't accessible assume best for manual moderation
-    if vid.type == VideoType.ARCHIVE:
+    if vid.type == twitch_types.VideoType.ARCHIVE:
         return False
     else:
         return True
@@ -52,39 +63,44 @@ def check_for_twitch_id(uri: str) -> Optional[str]:
     else:
         return match.group(0)
 
+@metrics.timed(metrics.requests, "twitch check_channel_live")
 async def check_channel_live(channel_id: str) -> bool:
     """Check if a given channel id is currently live"""
     global api
     if api is None: raise Exception("Twitch API not initialised!")
-    channel = await first(api.get_streams(user_id=[channel_id], stream_type="live"))
+    channel = await helper.first(api.get_streams(user_id=[channel_id], stream_type="live"))
     if channel is not None:
         return True
     else: return False
 
+@metrics.timed(metrics.requests, "twitch get_channel_url")
 async def get_channel_url(channel_id: str) -> str:
     global api
     if api is None: raise Exception("Twitch API not initialised!")
-    channel = await first(api.get_streams(user_id=[channel_id]))
+    channel = await helper.first(api.get_streams(user_id=[channel_id]))
     if channel is None: raise NotFoundException(f"Channel id {channel_id} not found!")
     return f"https://twitch.tv/{channel.user_name.lower()}"
 
+@metrics.timed(metrics.requests, "twitch get_title")
 async def get_title(channel_id: str) -> str:
     global api
     if api is None: raise Exception("Twitch API not initialised!")
-    channel = await first(api.get_streams(user_id=[channel_id]))
+    channel = await helper.first(api.get_streams(user_id=[channel_id]))
     if channel is None: raise NotFoundException(f"Channel id {channel_id} not found!")
     return channel.title
 
+@metrics.timed(metrics.requests, "twitch get_thumbnail")
 async def get_thumbnail(channel_id: str) -> str:
     global api
     if api is None: raise Exception("Twitch API not initialised!")
-    channel = await first(api.get_streams(user_id=[channel_id]))
+    channel = await helper.first(api.get_streams(user_id=[channel_id]))
     if channel is None: raise NotFoundException(f"Channel id {channel_id} not found!")
     return channel.thumbnail_url
 
+@metrics.timed(metrics.requests, "twitch get_username")
 async def get_username(channel_id: str) -> str:
     global api
     if api is None: raise Exception("Twitch API not initialised!")
-    channel = await first(api.get_streams(user_id=[channel_id]))
+    channel = await helper.first(api.get_streams(user_id=[channel_id]))
     if channel is None: raise NotFoundException(f"Channel id {channel_id} not found!")
     return channel.user_name
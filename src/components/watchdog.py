@@ -0,0 +1,74 @@
+import asyncio, sys, threading, time, traceback
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from Hornet import HornetBot
+
+from components import metrics
+import config
+
+LAG_INTERVAL = 0.5  # seconds between lag samples
+STACK_LIMIT = 12  # innermost frames included in stall reports
+REPORT_COOLDOWN = 60  # minimum seconds between stall reports sent to the status guild
+
+class Watchdog():
+    """Samples event loop scheduling lag into `metrics.loop`, and reports the blocking task & stack whenever the loop stalls for over `threshold` seconds.
+
+    Stalls are detected by a thread, as the loop can't observe itself while blocked; the stack is captured while the loop is still stuck,
+    and reported from the loop once it recovers."""
+    def __init__(self, bot: 'HornetBot', threshold: float):
+        self.bot = bot
+        self._log = bot._log.getChild("Watchdog")
+        self.threshold = threshold
+        self._beat = time.monotonic()  # Last time the lag monitor ran
+        self._stalls: list[str] = []  # Captured by the watchdog thread, reported by the monitor task
+        self._stalls_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._task: asyncio.Task | None = None
+        self._last_report = 0.0
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = asyncio.create_task(self._monitor(), name="hornet-lag-monitor")
+        threading.Thread(target=self._watch, name="hornet-watchdog", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        if self._task is not None: self._task.cancel()
+
+    async def _monitor(self):
+        while True:
+            expected = time.monotonic() + LAG_INTERVAL
+            await asyncio.sleep(LAG_INTERVAL)
+            self._beat = now = time.monotonic()
+            lag = max(0.0, now - expected)
+            metrics.loop.record("lag", lag)
+            with self._stalls_lock:
+                stalls, self._stalls = self._stalls, []
+            for stall in stalls:
+                metrics.loop.count("lag", "stall")
+                asyncio.create_task(self._report(f"{stall}\n(loop lag {lag:.2f}s)"))
+
+    def _watch(self):
+        reported_beat = None
+        while not self._stop.wait(self.threshold / 4):
+            beat = self._beat
+            blocked = time.monotonic() - beat - LAG_INTERVAL
+            if blocked < self.threshold or beat == reported_beat: continue
+            reported_beat = beat
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = "".join(traceback.format_stack(frame, limit=STACK_LIMIT)) if frame is not None else "(no stack)"
+            task = asyncio.current_task(self._loop)
+            name = task.get_coro().__qualname__ if task is not None else "a callback"  # type: ignore
+            report = f"Event loop blocked for over {blocked:.2f}s in {name}:\n{stack}"
+            self._log.warning(report)
+            with self._stalls_lock:
+                self._stalls.append(report)
+
+    async def _report(self, report: str):
+        if config.status_guild is None: return
+        if time.monotonic() - self._last_report < REPORT_COOLDOWN: return
+        if (guild := self.bot.get_guild(config.status_guild)) is None: return
+        self._last_report = time.monotonic()
+        await self.bot.guild_log(guild, f"```\n{report[-3900:]}\n```", "Watchdog")
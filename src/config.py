@@ -2,8 +2,6 @@ import json
 
 from discord import Colour
 
-from components import src
-
 JSON_PATH = "config.json"
 LOG_PATH = "hornet.log"
 LOG_FOLDER = "logs"
@@ -18,9 +16,20 @@ cache_size: int = data.get("cache_size", 1000)
 src_phpsessid: str | None = data.get("src_phpsessid")
 twitch_api_id: str | None = data.get("twitch_api_id")
 twitch_api_secret: str | None = data.get("twitch_api_secret")
-
-if src_phpsessid is not None:
-    src.CLIENT.PHPSESSID = src_phpsessid
+save_backend: str = data.get("save_backend", "json")
+save_codec: str = data.get("save_codec", "json")
+snapshot_interval: float = data.get("snapshot_interval", 60)
+snapshot_keep: int = data.get("snapshot_keep", 48)
+snapshot_max_age: float = data.get("snapshot_max_age", 14)
+snapshot_max_mb: float = data.get("snapshot_max_mb", 0)
+metrics_interval: float = data.get("metrics_interval", 5)
+stall_threshold: float = data.get("stall_threshold", 1)
+status_guild: int | None = data.get("status_guild")
+metrics_port: int | None = data.get("metrics_port")
+disabled_modules: list[str] = data.get("disabled_modules", [])
+shard_count: int | None = data.get("shard_count")
+shard_processes: int = data.get("shard_processes", 1)
+gateway_record: str | None = data.get("gateway_record")
 
 """
 Example config.json:
@@ -30,10 +39,24 @@ Example config.json:
         1234567890,
         2345678901
     ],
-    "cache_size": 1000000,
+    "cache_size": 1000000, // Messages to cache, if a loaded module needs a message cache (eg. changelog)
+    "shard_count": null, // Gateway shards to run: null for none, 0 for Discord's recommendation, or a fixed count (needed by launcher.py)
+    "shard_processes": 1, // Processes launcher.py splits the shards across. More than 1 needs the "sqlite" or "shards" save backend
+    "gateway_record": null, // Path to record reaction, message edit/delete & member update dispatches to (gzipped), for `benchmarks/replay.py`. Off by default
+    "disabled_modules": [], // Modules not to load, eg. ["hkcListener"]. Gateway intents & caches are only requested for the modules that are loaded
     "src_api_key": "", // Required for srroles & gameTracking using srcomapi
     "src_phpsessid": "", // Required for srcManagement using speedruncompy
-    
+    "save_backend": "json", // "json" (single save.json), "sqlite" (save.db, one row per guild/module) "journal" (save.json snapshot + append-only journal) or "shards" (save/ directory, one lazily loaded file per guild)
+    "save_codec": "json", // File format for the json, journal & shards backends: "json" (indented), "json-compact", "orjson" (compact, needs orjson installed) or "msgpack" (binary save.msgpack, needs msgpack installed). View any save with `python -m storage.inspect`
+    "snapshot_interval": 60, // Minutes between compressed save snapshots in snapshots/ (0 to disable). The newest readable snapshot is loaded if the save is missing or unreadable
+    "snapshot_keep": 48, // Snapshots to keep
+    "snapshot_max_age": 14, // Days to keep snapshots for
+    "snapshot_max_mb": 0, // Total size of snapshots to keep in MiB (0 for no limit)
+    "metrics_interval": 5, // Minutes between dumps of command & listener latencies to metrics.json (0 to disable). View live with ;stats
+    "stall_threshold": 1, // Seconds the event loop can be blocked before the blocking stack is logged (0 to disable)
+    "status_guild": 1234567890, // Guild whose log channel receives bot health reports, eg. event loop stalls
+    "metrics_port": 9101, // Serve Prometheus metrics on http://127.0.0.1:<port>/metrics (omit to disable); use a different port per bot on a host
+
 }
 "admins" are GLOBAL admins - this is unlikely to be used outside of alpha, and will likely be removed.
 """
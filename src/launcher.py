@@ -0,0 +1,73 @@
+"""Runs Hornet's shards across several processes, restarting any that crash.
+
+Usage: python launcher.py [processes]   (default: the config's shard_processes)
+
+Each process runs `Hornet.py --shard-count N --shard-ids a-b --process i`. Processes share the save through the "sqlite" or
+"shards" backend, and global loops (eg. HKCListen, checkRuns) are run by whichever process holds the global lock in locks/,
+which is also the only one to write global save data."""
+import logging, subprocess, sys, time
+
+import config
+
+STAGGER_SECONDS = 5  # Discord allows one shard to identify every 5 seconds (per max_concurrency bucket)
+RESTART_DELAY = 10
+NO_RESTART_CODES = {0, 11}  # Clean exit; save data newer than this version of Hornet
+SHARED_BACKENDS = {"sqlite", "shards"}  # Backends that write guilds individually, so processes don't overwrite each other
+
+_log = logging.getLogger("launcher")
+
+def shard_ranges(shard_count: int, processes: int) -> list[range]:
+    """Split `shard_count` shards into `processes` contiguous ranges, as evenly as possible"""
+    processes = min(processes, shard_count)
+    size, extra = divmod(shard_count, processes)
+    ranges = []
+    start = 0
+    for i in range(processes):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append(range(start, end))
+        start = end
+    return ranges
+
+def spawn(index: int, shards: range) -> subprocess.Popen:
+    _log.info(f"Starting process {index} with shards {shards.start}-{shards.stop - 1}")
+    return subprocess.Popen([sys.executable, "Hornet.py", "--shard-count", str(config.shard_count),
+                             "--shard-ids", f"{shards.start}-{shards.stop - 1}", "--process", str(index)])
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="[{asctime}] [{levelname:<8}] {name}: {message}", style="{")
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else config.shard_processes
+    if not config.shard_count:
+        _log.error("Set shard_count in config.json to the total number of shards to run")
+        exit(1)
+    if processes > 1 and config.save_backend not in SHARED_BACKENDS:
+        _log.error(f"The {config.save_backend} save backend can't be shared between processes; use one of {', '.join(sorted(SHARED_BACKENDS))}")
+        exit(1)
+
+    ranges = shard_ranges(config.shard_count, processes)
+    running: dict[int, subprocess.Popen] = {}
+    for index, shards in enumerate(ranges):
+        running[index] = spawn(index, shards)
+        if index < len(ranges) - 1: time.sleep(STAGGER_SECONDS * len(shards))  # Let this process identify before the next starts
+
+    try:
+        while running:
+            time.sleep(1)
+            for index, process in list(running.items()):
+                if (code := process.poll()) is None: continue
+                if code in NO_RESTART_CODES:
+                    _log.info(f"Process {index} exited with {code}")
+                    running.pop(index)
+                    if code == 11: raise KeyboardInterrupt  # Every process would fail the same way
+                    continue
+                _log.error(f"Process {index} exited with {code}, restarting in {RESTART_DELAY}s")
+                time.sleep(RESTART_DELAY)
+                running[index] = spawn(index, ranges[index])
+    except KeyboardInterrupt:
+        for process in running.values():
+            process.terminate()
+        for process in running.values():
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Save data migrations, applied in version order when save data is loaded.
+
+Global migrations upgrade everything outside `data["guilds"]` once. Guild migrations upgrade one guild at a time and record
+the version reached in the guild itself, so an interrupted upgrade resumes where it stopped & lazily loaded guilds are only
+upgraded when first read. Migrations work on raw save dicts and must not depend on module code, which may not be loaded yet."""
+import logging
+from typing import Callable
+
+BASE_VERSION = 0.1  # Guilds saved before per-guild versions were recorded
+
+_global_migrations: dict[float, list[Callable[[dict], None]]] = {}
+_guild_migrations: dict[float, list[Callable[[str, dict], None]]] = {}
+
+def global_migration(version: float):
+    """Register a function upgrading global save data (`data`) to `version`."""
+    def decorator(func: Callable[[dict], None]):
+        _global_migrations.setdefault(version, []).append(func)
+        return func
+    return decorator
+
+def guild_migration(version: float):
+    """Register a function upgrading a guild's save data (`guild_id`, `guild`) to `version`."""
+    def decorator(func: Callable[[str, dict], None]):
+        _guild_migrations.setdefault(version, []).append(func)
+        return func
+    return decorator
+
+def migrate_global(data: dict, target: float) -> bool:
+    """Apply global migrations newer than `data["version"]`, up to `target`. Returns whether anything changed."""
+    current = data["version"]
+    for version in sorted(v for v in _global_migrations if current < v <= target):
+        logging.info(f"Migrating global save data to {version}")
+        for migration in _global_migrations[version]:
+            migration(data)
+    data["version"] = target
+    return current != target
+
+def migrate_guild(guild_id: str, guild: dict, target: float) -> bool:
+    """Apply guild migrations newer than the guild's version, up to `target`. Returns whether anything changed."""
+    current = guild.get("version", BASE_VERSION)
+    if current >= target: return False
+    for version in sorted(v for v in _guild_migrations if current < v <= target):
+        for migration in _guild_migrations[version]:
+            migration(guild_id, guild)
+        guild["version"] = version
+    guild["version"] = target
+    return True
+
+
+@guild_migration(0.2)
+def _nest_reactroles(guild_id: str, guild: dict):
+    """reactroles: `"{channel}_{message}_{emoji}": role` -> `{channel: {message: {emoji: role}}}`"""
+    old = guild.get("modules", {}).get("reactroles")
+    if old is None: return
+    nested = {}
+    for key, role_id in old.items():
+        channel_id, _, rest = key.partition("_")
+        message_id, _, emoji = rest.partition("_")
+        nested.setdefault(channel_id, {}).setdefault(message_id, {})[emoji] = role_id
+    guild["modules"]["reactroles"] = nested
+
+@guild_migration(0.2)
+def _record_tracked_channels(guild_id: str, guild: dict):
+    """gameTracking: `trackedChannels: {channel: [game ids]}` -> `{channel: {"games": [game ids]}}`"""
+    tracked = guild.get("modules", {}).get("gameTracking", {}).get("trackedChannels")
+    if tracked is None: return
+    for channel_id, games in tracked.items():
+        if isinstance(games, list):
+            tracked[channel_id] = {"games": games}
@@ -1,13 +1,28 @@
 from discord import CategoryChannel, ForumChannel, RawMessageDeleteEvent, RawMessageUpdateEvent, TextChannel
 from discord.ext.commands import Cog, command
-from typing import TYPE_CHECKING
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Self
 if TYPE_CHECKING:
     from Hornet import HornetBot, HornetContext
 
-from components import auth, embeds
+from components import auth, embeds, outbound
 import save
 
 MODULE_NAME = __name__.split(".")[-1]
+INTENTS = ["guild_messages", "message_content"]  # Edits & deletes, with their content
+MESSAGE_CACHE = True  # To show messages as they were before an edit or delete
+
+@dataclass(slots=True, frozen=True)
+class ChangelogData():
+    log_channel: int
+    exclude_channels: frozenset[int]
+
+    @classmethod
+    def from_dict(cls, data) -> Self:
+        return cls(data["logChannel"], frozenset(data["excludeChannels"]))
+
+    def to_dict(self) -> dict:
+        return {"logChannel": self.log_channel, "excludeChannels": sorted(self.exclude_channels)}
 
 async def setup(bot: 'HornetBot'):
     save.add_module_template(MODULE_NAME, {"logChannel": 0, "excludeChannels": []})
@@ -31,7 +46,7 @@ class ChangelogCog(Cog, name="Changelog", description="Tracks message edits and
         if context.guild is None: return
         save.get_module_data(context.guild.id, MODULE_NAME)["logChannel"] = channel.id
         save.get_module_data(context.guild.id, MODULE_NAME)["excludeChannels"].append(channel.id)
-        save.save()
+        save.save(context.guild.id)
         await context.message.delete()
 
     @command(help="Exclude a channel from this server's changelog")
@@ -43,7 +58,7 @@ class ChangelogCog(Cog, name="Changelog", description="Tracks message edits and
             await context.embed_reply("This channel is already excluded!")
             return
         excludes.append(channel.id)
-        save.save()
+        save.save(context.guild.id)
         await context.message.delete()
 
     @command(help="Remove a changelog channel exclusion")
@@ -51,7 +66,7 @@ class ChangelogCog(Cog, name="Changelog", description="Tracks message edits and
     async def includeChannel(self, context: 'HornetContext', channel: TextChannel):
         if context.guild is None: return
         save.get_module_data(context.guild.id, MODULE_NAME)["excludeChannels"].remove(channel.id)
-        save.save()
+        save.save(context.guild.id)
         await context.message.delete()
 
     @command(help="List excluded channels")
@@ -64,13 +79,13 @@ class ChangelogCog(Cog, name="Changelog", description="Tracks message edits and
     @Cog.listener()
     async def on_raw_message_edit(self, payload: RawMessageUpdateEvent):
         if payload.guild_id is None: return
-        mod_data = save.get_module_data(payload.guild_id, MODULE_NAME)
-        if payload.channel_id in mod_data["excludeChannels"]: return
+        mod_data = save.get_module_model(payload.guild_id, MODULE_NAME, ChangelogData)
+        if payload.channel_id in mod_data.exclude_channels: return
         cached = payload.cached_message
 
         guild = self.bot.get_guild(payload.guild_id)
         if guild is None: return
-        target = guild.get_channel_or_thread(mod_data["logChannel"])
+        target = guild.get_channel_or_thread(mod_data.log_channel)
         if target is None or isinstance(target, (CategoryChannel, ForumChannel)): return
 
         data = payload.data
@@ -93,17 +108,18 @@ class ChangelogCog(Cog, name="Changelog", description="Tracks message edits and
             fields.append(("Old Attachments", "\r\n".join([a.url for a in cached.attachments]), False))
         if "attachments" in data.keys() and len(data["attachments"]) > 0:
             fields.append(("New Attachments", "\r\n".join([a["url"] for a in data["attachments"]]), False))
-        await embeds.embed_message(target, title="Message Edited", fields=fields, message=embed_message)
+        await self.bot.outbound.submit(lambda: embeds.embed_message(target, title="Message Edited", fields=fields, message=embed_message),
+                                       ("channel", target.id), outbound.COSMETIC, name="changelog edit")
 
     @Cog.listener()
     async def on_raw_message_delete(self, payload: RawMessageDeleteEvent):
         if payload.guild_id is None: return
-        mod_data = save.get_module_data(payload.guild_id, MODULE_NAME)
-        if payload.channel_id in mod_data["excludeChannels"]: return
+        mod_data = save.get_module_model(payload.guild_id, MODULE_NAME, ChangelogData)
+        if payload.channel_id in mod_data.exclude_channels: return
 
         guild = self.bot.get_guild(payload.guild_id)
         if guild is None: return
-        target = guild.get_channel_or_thread(mod_data["logChannel"])
+        target = guild.get_channel_or_thread(mod_data.log_channel)
         if target is None or isinstance(target, (CategoryChannel, ForumChannel)): return
 
         fields: list[tuple[str, str] | tuple[str, str, bool]] = [("Channel", f"<#{payload.channel_id}>", True)]
@@ -119,4 +135,5 @@ class ChangelogCog(Cog, name="Changelog", description="Tracks message edits and
         else:
             embed_message = "Message was not found in cache!"
             fields.append(("Message ID", f"{payload.message_id}"))
-        await embeds.embed_message(target, title="Message Deleted", fields=fields, message=embed_message)
+        await self.bot.outbound.submit(lambda: embeds.embed_message(target, title="Message Deleted", fields=fields, message=embed_message),
+                                       ("channel", target.id), outbound.COSMETIC, name="changelog delete")
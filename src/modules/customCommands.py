@@ -1,5 +1,6 @@
 from discord.ext.commands import Cog, command
-from typing import TYPE_CHECKING
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Self
 if TYPE_CHECKING:
     from Hornet import HornetBot, HornetContext
 
@@ -16,6 +17,19 @@ MODULE_NAME = __name__.split(".")[-1]
 
 # TODO: Custom commands in DM's? Probably not
 
+@dataclass(slots=True, frozen=True)
+class CustomCommandsData():
+    commands: dict[str, str]
+    by_lower: dict[str, str]
+    """lowercased command name : response, for case-insensitive lookup"""
+
+    @classmethod
+    def from_dict(cls, data) -> Self:
+        return cls(dict(data), {k.lower(): v for k, v in data.items()})
+
+    def to_dict(self) -> dict:
+        return dict(self.commands)
+
 async def setup(bot: 'HornetBot'):
     save.add_module_template(MODULE_NAME, {})
     await bot.add_cog(CustomCommandsCog(bot))
@@ -34,9 +48,8 @@ class CustomCommandsCog(Cog, name="CustomCommands", description="Handles adding
 
     async def try_custom_cmd(self, ctx: 'HornetContext', command_name: str) -> bool:
         if ctx.guild is None: return False
-        mod_data = save.get_module_data(ctx.guild.id, MODULE_NAME)
-        try_dict = {k.lower(): v for k, v in mod_data.items()}
-        content = try_dict.get(command_name.lower(), None)
+        mod_data = save.get_module_model(ctx.guild.id, MODULE_NAME, CustomCommandsData)
+        content = mod_data.by_lower.get(command_name.lower(), None)
         if content is not None:
             await ctx.reply(content, mention_author=False)
             return True
@@ -53,7 +66,7 @@ class CustomCommandsCog(Cog, name="CustomCommands", description="Handles adding
             return
 
         mod_data[command_name] = response
-        save.save()
+        save.save(context.guild.id)
         await context.embed_reply(title=f"Added custom command {command_name}", message=response)
 
     @command(help="Removes a custom command")
@@ -65,7 +78,7 @@ class CustomCommandsCog(Cog, name="CustomCommands", description="Handles adding
             await context.embed_reply(message=f"Command {command_name} doesn't exist")
             return
         exit_val = mod_data.pop(command_name)
-        save.save()
+        save.save(context.guild.id)
         await context.embed_reply(title=f"Removed command {command_name}", message=exit_val)
 
     @command(help="Edits a custom command")
@@ -78,7 +91,7 @@ class CustomCommandsCog(Cog, name="CustomCommands", description="Handles adding
             return
 
         mod_data[command_name] = response
-        save.save()
+        save.save(context.guild.id)
         await context.embed_reply(
             title=f"Edited custom command {command_name}", message=response
         )
@@ -1,24 +1,27 @@
 import json
-from discord import Emoji, Guild, Message, TextChannel, RawReactionActionEvent
+from discord import Emoji, Guild, Message, Reaction, TextChannel, RawReactionActionEvent
 from discord.ext.commands import Cog, command
 from discord.abc import Messageable
 from discord.ext.tasks import loop
 from discord.utils import escape_markdown
+from dataclasses import dataclass
 from datetime import timedelta
-import time
-from typing import TYPE_CHECKING, AsyncIterator
+import asyncio, functools, time
+from typing import TYPE_CHECKING, AsyncIterator, Self
 if TYPE_CHECKING:
     from Hornet import HornetBot, HornetContext
+    from speedruncompy import Run, Game, Variable, Value, Category, Level, Player
 
 import re
 
-import speedruncompy
-from speedruncompy import Run, Game, Variable, Value, Category, Level, Player, Verified
-
-from components import auth, emojiUtil, src
+from components import auth, emojiUtil, metrics, outbound, src
+from components.lazy import lazy_import
 import save
 
 MODULE_NAME = __name__.split(".")[-1]
+INTENTS = ["guild_reactions"]
+
+speedruncompy = lazy_import("speedruncompy")
 
 MODULE_TEMPLATE = {
     "trackedChannels": {},
@@ -28,6 +31,28 @@ MODULE_TEMPLATE = {
 
 RE_RUN_MSG_PATTERN = re.compile(r"\`(?P<category_name>.*)\` in (?P<run_time>.*) by .*\n<https:\/\/www.speedrun.com\/(?P<game_url>.*)\/run\/(?P<run_id>[\w\d]*)>(?:\n\*\*Claimed by (?P<claimant_name>.*) <t:(?P<claim_time>\d*):R>\*\*)?")
 
+@dataclass(slots=True, frozen=True)
+class GameTrackingData():
+    tracked_channels: dict[int, tuple[str, ...]]
+    """channel_id : game ids tracked in the channel"""
+    claim_emoji: str
+    unclaim_emoji: str
+
+    @classmethod
+    def from_dict(cls, data) -> Self:
+        return cls({int(c): tuple(r["games"]) for c, r in data["trackedChannels"].items()}, data["claimEmoji"], data["unclaimEmoji"])
+
+    def to_dict(self) -> dict:
+        return {"trackedChannels": {str(c): {"games": list(g)} for c, g in self.tracked_channels.items()},
+                "claimEmoji": self.claim_emoji, "unclaimEmoji": self.unclaim_emoji}
+
+def tracked_summary(mod_data: dict) -> dict | None:
+    """Index summary: what update_games needs of a guild with tracked channels"""
+    channels = {c: list(r.get("games", [])) for c, r in mod_data.get("trackedChannels", {}).items() if r.get("games")}
+    if not channels: return None
+    return {"channels": channels, "claimEmoji": mod_data.get("claimEmoji", MODULE_TEMPLATE["claimEmoji"]),
+            "unclaimEmoji": mod_data.get("unclaimEmoji", MODULE_TEMPLATE["unclaimEmoji"])}
+
 async def setup(bot: 'HornetBot'):
     save.add_module_template(MODULE_NAME, MODULE_TEMPLATE)
     await bot.add_cog(GameTrackerCog(bot))
@@ -39,10 +64,26 @@ class GameTrackerCog(Cog, name="GameTracking", description="Module tracking veri
     def __init__(self, bot: 'HornetBot'):
         self.bot = bot
         self._log = bot._log.getChild("GameTracker")
+
+    async def cog_load(self):
+        await save.add_index(MODULE_NAME, tracked_summary)
+        self.bot.reactions.register(self.qualified_name, on_add=self.on_raw_reaction_add)
+        for guild in self.bot.guilds:  # Empty at startup; guilds are watched as they become available
+            self.watch_guild(guild.id)
         self.update_games.start()
 
     async def cog_unload(self):
         self.update_games.cancel()
+        self.bot.reactions.unregister(self.qualified_name)
+
+    def watch_guild(self, guild_id: int):
+        summary = save.get_index(MODULE_NAME).get(str(guild_id))  # Doesn't load the guild
+        for channel_id in summary["channels"] if summary is not None else ():
+            self.bot.reactions.watch_channel(self.qualified_name, int(channel_id))
+
+    @Cog.listener()
+    async def on_guild_available(self, guild: Guild):
+        self.watch_guild(guild.id)
 
     @command(help="Register a channel to track unverified runs for a game.")
     @auth.check_admin
@@ -56,10 +97,12 @@ class GameTrackerCog(Cog, name="GameTracking", description="Module tracking veri
         
         mod_data = save.get_module_data(context.guild.id, MODULE_NAME)
         if str(channel.id) in mod_data["trackedChannels"]:
-            mod_data["trackedChannels"][str(channel.id)].append(game.id)
+            mod_data["trackedChannels"][str(channel.id)]["games"].append(game.id)
         else:
-            mod_data["trackedChannels"][str(channel.id)] = [game.id]
-        save.save()
+            mod_data["trackedChannels"][str(channel.id)] = {"games": [game.id]}
+            self.bot.reactions.watch_channel(self.qualified_name, channel.id)
+        save.save(context.guild.id)
+        save.reindex(MODULE_NAME, context.guild.id)
         await context.message.reply(f"Added game `{game.id}: {game.name}` to <#{channel.id}>", mention_author=False)
 
     @command(help="Unregister a channel from tracking unverified runs for this game.")
@@ -72,11 +115,16 @@ class GameTrackerCog(Cog, name="GameTracking", description="Module tracking veri
             return
         
         mod_data = save.get_module_data(context.guild.id, MODULE_NAME)
-        if str(channel.id) in mod_data["trackedChannels"]:
-            mod_data["trackedChannels"][str(channel.id)].remove(game.id)
-        else:
+        tracked = mod_data["trackedChannels"].get(str(channel.id))
+        if tracked is None or game.id not in tracked["games"]:
             await context.message.reply(f"Could not find game `{game.id}: {game.name}` in  <#{channel.id}>", mention_author=False)
-        save.save()
+            return
+        tracked["games"].remove(game.id)
+        if not tracked["games"]:  # Last game; stop routing this channel's reactions here
+            del mod_data["trackedChannels"][str(channel.id)]
+            self.bot.reactions.unwatch_channel(self.qualified_name, channel.id)
+        save.save(context.guild.id)
+        save.reindex(MODULE_NAME, context.guild.id)
         await context.message.reply(f"Removed game `{game.id}: {game.name}` from <#{channel.id}>", mention_author=False)
 
     @command(help="Sets emoji used for claims (will not clear old reacts!)")
@@ -86,7 +134,8 @@ class GameTrackerCog(Cog, name="GameTracking", description="Module tracking veri
         emoji_clean: str | Emoji = await emojiUtil.to_emoji(context, emoji)
         emoji_ref = emojiUtil.to_string(emoji_clean)
         save.get_module_data(context.guild.id, MODULE_NAME)["claimEmoji"] = emoji_ref
-        save.save()
+        save.save(context.guild.id)
+        save.reindex(MODULE_NAME, context.guild.id)
         await context.message.delete()
 
     @command(help="Sets emoji used for unclaims (will not clear old reacts!)")
@@ -96,47 +145,53 @@ class GameTrackerCog(Cog, name="GameTracking", description="Module tracking veri
         emoji_clean: str | Emoji = await emojiUtil.to_emoji(context, emoji)
         emoji_ref = emojiUtil.to_string(emoji_clean)
         save.get_module_data(context.guild.id, MODULE_NAME)["unclaimEmoji"] = emoji_ref
-        save.save()
+        save.save(context.guild.id)
+        save.reindex(MODULE_NAME, context.guild.id)
         await context.message.delete()
 
-    @Cog.listener()
     async def on_raw_reaction_add(self, payload: RawReactionActionEvent):
         """Handler on adding reacts in tracked verifier channels"""
         if payload.guild_id is None: return
-        mod_data = save.get_module_data(payload.guild_id, MODULE_NAME)
-        if str(payload.channel_id) not in mod_data["trackedChannels"]: return
-        if payload.user_id == self.bot.user_id: return
+        mod_data = save.get_module_model(payload.guild_id, MODULE_NAME, GameTrackingData)
+        if payload.channel_id not in mod_data.tracked_channels: return
 
         channel = self.bot.get_channel(payload.channel_id)
         if not isinstance(channel, (Messageable)): return
         message = await channel.fetch_message(payload.message_id)
         refstring = emojiUtil.to_string(payload.emoji)
         reactions = list(filter(lambda x: emojiUtil.to_string(x.emoji) == refstring, message.reactions))
+        if not reactions: return  # Removed or cleared (eg. by a concurrent claim) before the message was fetched
         reaction = reactions[0]
         reacters = []
         async for user in reaction.users():
             if user.id != self.bot.user_id: reacters.append(user)
 
         if len(reacters) == 0: return
-        user = self.bot.get_user(payload.user_id)
+        user = payload.member  # Sent with guild reactions, so this works without the members intent
         if user is None: return
 
-        if refstring == mod_data["claimEmoji"]:
+        route = ("channel", payload.channel_id)
+        if refstring == mod_data.claim_emoji:
             if message.content.endswith("**"): return  # don't claim if run already claimed
             
-            await message.edit(content=f"{reaction.message.content}\r\n**Claimed by {escape_markdown(user.name)} <t:{int(time.time())}:R>**")
-            await message.add_reaction(mod_data["unclaimEmoji"])
-            await reaction.clear()
-        elif refstring == mod_data["unclaimEmoji"]:
+            content = f"{reaction.message.content}\r\n**Claimed by {escape_markdown(user.name)} <t:{int(time.time())}:R>**"
+            await self.bot.outbound.submit(lambda: message.edit(content=content), route, outbound.NORMAL, key=("edit", message.id), name="claim")
+            await self._swap_reaction(message, reaction, mod_data.unclaim_emoji)
+        elif refstring == mod_data.unclaim_emoji:
             if not message.content.endswith("**"): return  # don't unclaim if run is already unclaimed
             name = message.content.splitlines()[-1].split(" ")[-2]
             if name != user.name: return
 
-            await message.edit(content="\r\n".join(message.content.splitlines()[:-1]))  # Cut off verifier line
-            await message.add_reaction(mod_data["claimEmoji"])
-            await reaction.clear()
+            content = "\r\n".join(message.content.splitlines()[:-1])  # Cut off verifier line
+            await self.bot.outbound.submit(lambda: message.edit(content=content), route, outbound.NORMAL, key=("edit", message.id), name="unclaim")
+            await self._swap_reaction(message, reaction, mod_data.claim_emoji)
     
-    async def get_message_run_dict(self, messages: AsyncIterator[Message], game: Game):
+    async def _swap_reaction(self, message: Message, reaction: Reaction, emoji: str):
+        route = ("channel", message.channel.id)
+        await asyncio.gather(self.bot.outbound.submit(lambda: message.add_reaction(emoji), route, outbound.COSMETIC, key=("react", message.id, emoji), name="claim reaction"),
+                             self.bot.outbound.submit(lambda: reaction.clear(), route, outbound.COSMETIC, name="claim reaction"))
+
+    async def get_message_run_dict(self, messages: AsyncIterator[Message], game: 'Game'):
         message_runs: dict[Message, str] = {}
         async for m in messages:
             if m.author.id != self.bot.user_id: continue  # skip non-bot messages
@@ -145,11 +200,12 @@ class GameTrackerCog(Cog, name="GameTracking", description="Module tracking veri
         return message_runs
     
     @loop(minutes=1)
+    @metrics.timed(metrics.tasks, "update_games")
     async def update_games(self):
         """"""
         try:
             # First, get the games we can moderate
-            moderation_games = await speedruncompy.GetModerationGames(_api=src.CLIENT).perform_async()
+            moderation_games = await src.perform(speedruncompy.GetModerationGames(_api=src.CLIENT))
             if moderation_games.games is None:
                 if src.CLIENT.PHPSESSID is None:
                     raise Exception("Client not logged in - updateGames cancelled")
@@ -158,28 +214,28 @@ class GameTrackerCog(Cog, name="GameTracking", description="Module tracking veri
 
             moderated_games = {game["id"]: game for game in moderation_games.games}
             
-            for guild_id in save.get_guild_ids():
-                mod_data = save.get_module_data(guild_id, MODULE_NAME)
+            for guild_id, summary in list(save.get_index(MODULE_NAME).items()):  # Only guilds with tracked channels, without loading them
+                if not self.bot.owns_guild(int(guild_id)): continue  # Another process' shard
                 guild: Guild = self.bot.get_guild(int(guild_id))  # type:ignore
-                claim_emoji = mod_data["claimEmoji"]
-                unclaim_emoji = mod_data["unclaimEmoji"]
+                claim_emoji = summary["claimEmoji"]
+                unclaim_emoji = summary["unclaimEmoji"]
                 
-                tracked_channels: dict[str, list[str]] = mod_data["trackedChannels"]
-                for channel_id, game_ids in tracked_channels.items():
+                tracked_channels: dict[str, list[str]] = summary["channels"]
+                for channel_id, games in tracked_channels.items():
                     channel = self.bot.get_channel_typed(int(channel_id), TextChannel)
                     if channel is None:
                         self._log.error("Log channel inaccessible, skipping...")
                         continue
                     
-                    for game_id in game_ids:
+                    for game_id in games:
                         if game_id not in moderated_games:
                             self._log.error(f"Hornet does not moderate {game_id}, skipping iteration...")
                             await self.bot.guild_log(guild, f"Hornet does not moderate {game_id}, skipping iteration...", "GameTracker")
                             continue
                         game = moderated_games[game_id]
                         
-                        moderation_runs_endpoint = speedruncompy.GetModerationRuns(game_id, limit=100, verified=Verified.PENDING, _api=src.CLIENT)
-                        moderation_runs = await moderation_runs_endpoint.perform_all_async(autovary=True)  # type: ignore # This is always str
+                        moderation_runs_endpoint = speedruncompy.GetModerationRuns(game_id, limit=100, verified=speedruncompy.Verified.PENDING, _api=src.CLIENT)
+                        moderation_runs = await src.perform(moderation_runs_endpoint, all_pages=True, autovary=True)  # type: ignore # This is always str
                         # TODO: downstream types of this should be updated once speedruncompy either fixes #8 or switches to pydantic
                         
                         # Extract associated values for lookup (nb: these will probably be moved to speedruncompy)
@@ -196,18 +252,21 @@ class GameTrackerCog(Cog, name="GameTracking", description="Module tracking veri
                         messages = channel.history(limit=200, oldest_first=True)
                         message_runIDs = await self.get_message_run_dict(messages, game)
                         
-                        # Post new runs
+                        # Post new runs & remove stale ones, in the order submitted
+                        route = ("channel", channel.id)
+                        pending = []
                         for run in moderation_runs.runs:
                             if run.id not in message_runIDs.values():
-                                await channel.send(get_run_string(run, channel.guild.id, game, categories, variables, values, levels, players))
-                        
-                        # Remove stale runs
+                                content = get_run_string(run, channel.guild.id, game, categories, variables, values, levels, players)
+                                pending.append(self.bot.outbound.submit(functools.partial(channel.send, content), route, outbound.NORMAL, name="post run"))
                         for m, run_id in message_runIDs.items():
                             if run_id not in runs:
-                                await m.delete()  # TODO: Shouldn't be mass deleting individually but idc
+                                pending.append(self.bot.outbound.submit(m.delete, route, outbound.NORMAL, key=("delete", m.id), name="remove run"))  # TODO: Shouldn't be mass deleting individually but idc
+                        await asyncio.gather(*pending)
                         
                         # Ensure runs are reacted to; we need to do this _after_ ensuring the messages exist
                         messages = channel.history(limit=200, oldest_first=True)
+                        pending = []
                         async for m in messages:
                             if m.author.id != self.bot.user_id: continue  # skip non-bot messages
                             match = RE_RUN_MSG_PATTERN.match(m.content)
@@ -217,10 +276,13 @@ class GameTrackerCog(Cog, name="GameTracking", description="Module tracking veri
                             claimant_name = match.group("claimant_name")
                             if claimant_name is None:
                                 if claim_emoji not in [r.emoji for r in m.reactions]:
-                                    await m.add_reaction(claim_emoji)
+                                    pending.append(self.bot.outbound.submit(functools.partial(m.add_reaction, claim_emoji), route, outbound.COSMETIC,
+                                                                            key=("react", m.id, claim_emoji), name="claim reaction"))
                             else:  # run is claimed, ensure it has remove react
                                 if unclaim_emoji not in [r.emoji for r in m.reactions]:
-                                    await m.add_reaction(unclaim_emoji)
+                                    pending.append(self.bot.outbound.submit(functools.partial(m.add_reaction, unclaim_emoji), route, outbound.COSMETIC,
+                                                                            key=("react", m.id, unclaim_emoji), name="claim reaction"))
+                        await asyncio.gather(*pending)
         except speedruncompy.exceptions.ServerException as e:
             self._log.error("GameTracking.updateGames task failed due to SRC error, ignoring...")
             self._log.error(e, exc_info=True)
@@ -232,9 +294,9 @@ class GameTrackerCog(Cog, name="GameTracking", description="Module tracking veri
             self._log.error(e, exc_info=True)
 
 def get_player_formatted(guild_id: int, name: str) -> str:
-    return f"||{escape_markdown(name)}||" if name in save.get_guild_data(guild_id)["spoileredPlayers"] else escape_markdown(name)
+    return f"||{escape_markdown(name)}||" if name in save.get_guild_model(guild_id).spoilered_players else escape_markdown(name)
 
-def get_run_string(run: Run, guild_id: int, game: Game, categories: dict[str, Category], variables: dict[str, Variable], values: dict[str, Value], levels: dict[str, Level], players: dict[str, Player]):
+def get_run_string(run: 'Run', guild_id: int, game: 'Game', categories: dict[str, 'Category'], variables: dict[str, 'Variable'], values: dict[str, 'Value'], levels: dict[str, 'Level'], players: dict[str, 'Player']):
     category = categories[run.categoryId]
     
     subcatname = ""
@@ -1,4 +1,4 @@
-from discord import Forbidden, Member, Role, Streaming, Game
+from discord import Forbidden, NotFound, Role, Streaming, Game
 from discord.ext.commands import Cog, command
 from discord.ext.tasks import loop
 import time
@@ -6,7 +6,7 @@ from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from Hornet import HornetBot, HornetContext
 
-from components import twitch, auth
+from components import twitch, auth, metrics, outbound
 import save
 
 MODULE_NAME = __name__.split(".")[-1]
@@ -17,7 +17,7 @@ async def setup(bot: 'HornetBot'):
     await bot.add_cog(HKCListenerCog(bot))
 
 async def teardown(bot: 'HornetBot'):
-    await bot.remove_cog("ReactRoles")
+    await bot.remove_cog("HKCListener")
 
 class HKCListenerCog(Cog, name="HKCListener", description="Manages Hornet's Live status"):
     def __init__(self, bot: 'HornetBot'):
@@ -31,8 +31,15 @@ class HKCListenerCog(Cog, name="HKCListener", description="Manages Hornet's Live
     async def cog_unload(self) -> None:
         self.HKCListen.stop()
 
+    def save_reload_state(self) -> dict:
+        return {"live": self.live}
+
+    def restore_reload_state(self, state: dict):
+        self.live = state["live"]
+
     @command()
     @auth.check_global_admin
+    @auth.check_writes_global
     async def set_hkc_channel(self, ctx: 'HornetContext', channel_id: int):
         save.get_global_module(MODULE_NAME)["channel"] = channel_id
         save.save()
@@ -40,6 +47,7 @@ class HKCListenerCog(Cog, name="HKCListener", description="Manages Hornet's Live
     
     @command()
     @auth.check_global_admin
+    @auth.check_writes_global
     async def set_hkc_role(self, ctx: 'HornetContext', role: Role):
         if ctx.guild is None: return
         mod_data = save.get_global_module(MODULE_NAME)
@@ -52,7 +60,9 @@ class HKCListenerCog(Cog, name="HKCListener", description="Manages Hornet's Live
         await ctx.embed_reply(f"Set role to {role.id}, set guild to {ctx.guild.id}")
 
     @loop(minutes=1)
+    @metrics.timed(metrics.tasks, "HKCListen")
     async def HKCListen(self):
+        if not self.bot.owns_global(): return
         try:
             channel_id = save.get_global_module(MODULE_NAME)["channel"]
             guild_id = save.get_global_module(MODULE_NAME)["guild"]
@@ -61,16 +71,21 @@ class HKCListenerCog(Cog, name="HKCListener", description="Manages Hornet's Live
                 self._log.info("No channel specified for HKCListen, ignoring")
                 return
             
-            role = None
             guild = self.bot.get_guild(guild_id)
+            if guild is None and guild_id != 0:
+                try:
+                    guild = await self.bot.fetch_guild(guild_id)  # Its shards may be on another process
+                except (NotFound, Forbidden):
+                    pass
+            role, bot_user = None, None
             if guild is None:
                 self._log.warning("Guild could not be found! Ignoring role...")
+            elif (role := guild.get_role(role_id)) is None:
+                self._log.warning("Role could not be found! Ignoring role...")
             else:
-                role = guild.get_role(role_id)
-                if role is None:
-                    self._log.warning("Role could not be found! Ignoring role...")
-            
-            bot_user: Member = guild.get_member(self.bot.user_id)  # type: ignore
+                bot_user = guild.me
+                if bot_user is None and self.bot.user is not None:
+                    bot_user = await guild.fetch_member(self.bot.user.id)  # Not cached by this process
             
             if await twitch.check_channel_live(channel_id):
                 title = await twitch.get_title(channel_id)
@@ -81,9 +96,10 @@ class HKCListenerCog(Cog, name="HKCListener", description="Manages Hornet's Live
                 await self.bot.change_presence(activity=activity)
                 if self.live is False:
                     self._log.info(f"Updated live w/ title {title}")
-                if role is not None and role not in bot_user.roles:
+                if role is not None and bot_user is not None and role not in bot_user.roles:
                     try:
-                        await bot_user.add_roles(role, reason="Hornet: Going live...")
+                        await self.bot.outbound.submit(lambda m=bot_user, r=role: m.add_roles(r, reason="Hornet: Going live..."), ("guild", role.guild.id),
+                                                       outbound.NORMAL, key=("roles", role.guild.id, bot_user.id, role.id), name="live role")
                         self._log.info("Live role given")
                     except Forbidden:
                         self._log.error("Hornet isn't allowed to add this role! Ensure her role is higher than the role to be removed.")
@@ -95,9 +111,10 @@ class HKCListenerCog(Cog, name="HKCListener", description="Manages Hornet's Live
                 if self.live is True:
                     self._log.info("Went offline.")
 
-                if role in bot_user.roles:
+                if role is not None and bot_user is not None and role in bot_user.roles:
                     try:
-                        await bot_user.remove_roles(role, reason="Hornet: Going offline...")
+                        await self.bot.outbound.submit(lambda m=bot_user, r=role: m.remove_roles(r, reason="Hornet: Going offline..."), ("guild", role.guild.id),
+                                                       outbound.NORMAL, key=("roles", role.guild.id, bot_user.id, role.id), name="live role")
                         self._log.info("Live role removed")
                     except Forbidden:
                         self._log.error("Hornet isn't allowed to remove this role! Ensure her role is higher than the role to be removed.")
@@ -1,16 +1,21 @@
 from discord import Member, Message, Role, TextChannel, Thread
 from discord.ext.commands import Cog, command
 from discord.ext.tasks import loop
-from pytimeparse.timeparse import timeparse
 import time
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from Hornet import HornetBot, HornetContext
 
-from components import auth, embeds, emojiUtil
+from components import auth, embeds, emojiUtil, metrics, outbound
 import save
 
 MODULE_NAME = __name__.split(".")[-1]
+INTENTS = ["members"]
+MEMBER_CACHE = ["joined"]  # To find muted members when their mute expires
+
+def next_unmute(mod_data: dict) -> int | None:
+    """Index summary: when the guild's first timed mute expires"""
+    return min((int(mute[1]) for mute in mod_data.get("mutes", {}).values() if int(mute[1]) != -1), default=None)
 
 async def setup(bot: 'HornetBot'):
     save.add_module_template(MODULE_NAME, {"mutes": {}, "muteRoles": {}, "defaultMute": ""})
@@ -23,6 +28,9 @@ class ModerationCog(Cog, name="Moderation", description="Commands used for serve
     def __init__(self, bot: 'HornetBot'):
         self.bot = bot
         self._log = bot._log.getChild("Moderation")
+
+    async def cog_load(self):
+        await save.add_index(MODULE_NAME, next_unmute)
         self.checkMutes.start()
 
     async def cog_unload(self):
@@ -41,6 +49,7 @@ class ModerationCog(Cog, name="Moderation", description="Commands used for serve
         if level == -1:
             unmute_time = -1
         else:
+            from pytimeparse.timeparse import timeparse  # Imported on first use to keep it off startup
             if (unmute_time := timeparse(duration)) is None:
                 return
             else:
@@ -58,9 +67,11 @@ class ModerationCog(Cog, name="Moderation", description="Commands used for serve
             await context.embed_reply(message=f"Mute role id {mute_role_id} not found! Was it deleted?")
             return
 
-        await target.add_roles(mute_role)
+        await self.bot.outbound.submit(lambda: target.add_roles(mute_role), ("guild", context.guild.id), outbound.MODERATION,
+                                       key=("roles", context.guild.id, target.id, mute_role.id), name="mute")
         mod_data["mutes"][str(target.id)] = [level, unmute_time]
-        save.save()
+        save.save(context.guild.id)
+        save.reindex(MODULE_NAME, context.guild.id)
         await context.embed_reply(f"User muted until <t:{unmute_time}>")
         await embeds.embed_message(
             target,
@@ -85,7 +96,8 @@ class ModerationCog(Cog, name="Moderation", description="Commands used for serve
             return
 
         exitmute = mutes.pop(target.id)
-        save.save()
+        save.save(context.guild.id)
+        save.reindex(MODULE_NAME, context.guild.id)
         await context.embed_reply(f"{target.name} was unmuted from level {exitmute[0]} lasting until <t:{exitmute[1]}>")
 
     @command(help="Lists active mutes")
@@ -110,7 +122,7 @@ class ModerationCog(Cog, name="Moderation", description="Commands used for serve
             return
 
         levels[level] = role.id
-        save.save()
+        save.save(context.guild.id)
         await context.embed_reply(f"Added mute level {level} on role {role.name}")
 
     @command(help="Remove a mute level")
@@ -123,7 +135,7 @@ class ModerationCog(Cog, name="Moderation", description="Commands used for serve
             return
 
         exit_level = levels[level].pop()
-        save.save()
+        save.save(context.guild.id)
         role = context.guild.get_role(exit_level[1])
         role_name = role.name if role is not None else "(Deleted Role)"
         await context.embed_reply(f"Removed mute level {level} on role {role_name}")
@@ -139,6 +151,7 @@ class ModerationCog(Cog, name="Moderation", description="Commands used for serve
             return
 
         mod_data["defaultMute"] = level
+        save.save(context.guild.id)
         await context.embed_reply(f"Set default mute level to {level}")
 
     @command(help="Show a list of mute levels")
@@ -194,8 +207,12 @@ class ModerationCog(Cog, name="Moderation", description="Commands used for serve
         await context.embed_reply(title=f"{reaction.count} reactions on {emojiUtil.to_string(parsed_emoji)} to {message.jump_url}", message=desc)
 
     @loop(minutes=1)
+    @metrics.timed(metrics.tasks, "checkMutes")
     async def checkMutes(self):
-        for guild_id in save.get_guild_ids():
+        now = time.time()
+        for guild_id, next_unmute_time in list(save.get_index(MODULE_NAME).items()):  # Only guilds with a mute due, so idle guilds stay unloaded
+            if next_unmute_time >= now: continue
+            if not self.bot.owns_guild(int(guild_id)): continue  # Another process' shard
             guild = self.bot.get_guild(int(guild_id))
             if guild is None: continue
             roles = save.get_module_data(guild_id, MODULE_NAME)["muteRoles"]
@@ -209,7 +226,9 @@ class ModerationCog(Cog, name="Moderation", description="Commands used for serve
                 if role is None:
                     continue
                 if member is not None:
-                    await member.remove_roles(role, reason="Timed unmute")
+                    await self.bot.outbound.submit(lambda m=member, r=role: m.remove_roles(r, reason="Timed unmute"), ("guild", guild.id), outbound.MODERATION,
+                                                   key=("roles", guild.id, member.id, role.id), name="unmute")
                 exit_mute = mutes.pop(user)
-                print(exit_mute)
-                save.save()
+                self._log.info(f"Timed unmute of {user} in {guild_id} from {exit_mute}")
+                save.save(guild_id)
+            save.reindex(MODULE_NAME, guild_id)
@@ -1,9 +1,9 @@
 from discord import AllowedMentions, VoiceChannel, RawReactionActionEvent
 from discord.ext.commands import Cog, command, cooldown, BucketType
 from discord.abc import Messageable
-from pytimeparse.timeparse import timeparse
+from dataclasses import dataclass
 import asyncio, time
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Self
 if TYPE_CHECKING:
     from Hornet import HornetBot, HornetContext
 
@@ -12,6 +12,20 @@ from components import auth, emojiUtil
 import save
 
 MODULE_NAME = __name__.split(".")[-1]
+INTENTS = ["guild_reactions", "voice_states"]
+MEMBER_CACHE = ["voice"]  # To ping racers in race VCs
+
+@dataclass(slots=True, frozen=True)
+class RaceUtilData():
+    race_vcs: frozenset[int]
+    ready_emote: str
+
+    @classmethod
+    def from_dict(cls, data) -> Self:
+        return cls(frozenset(data["raceVCs"]), data["readyEmote"])
+
+    def to_dict(self) -> dict:
+        return {"raceVCs": sorted(self.race_vcs), "readyEmote": self.ready_emote}
 
 async def setup(bot: 'HornetBot'):
     save.add_module_template(MODULE_NAME, {"raceVCs": [], "readyEmote": "\uD83C\uDDF7"})
@@ -26,14 +40,26 @@ class RaceUtilCog(Cog, name="RaceUtil", description="Commands for configuring ra
         self._log = bot._log.getChild("RaceUtil")
         self.readies = {}  # Message ID : count
 
+    async def cog_load(self):
+        self.bot.reactions.register(self.qualified_name, on_add=self.on_raw_reaction_add)
+        for message_id in self.readies:  # Restored after a reload
+            self.bot.reactions.watch_message(self.qualified_name, message_id)
+
     async def cog_unload(self):
-        pass
+        self.bot.reactions.unregister(self.qualified_name)
+
+    def save_reload_state(self) -> dict:
+        return {"readies": self.readies}
+
+    def restore_reload_state(self, state: dict):
+        self.readies = state["readies"]
 
     @command(help="Start a countdown (default 15s)",
              aliases=["c", "cd", "countdown"])
     @cooldown(rate=1, per=5, type=BucketType.channel)
     async def count(self, context: 'HornetContext', duration: str = "15s"):
         if duration.isnumeric(): duration += "s"  # For unformatted times, we expect seconds by default
+        from pytimeparse.timeparse import timeparse  # Imported on first use to keep it off startup
         length = timeparse(duration)
         if length is None:
             await context.embed_reply(message="Could not parse time string! Enter in format `60s`")
@@ -48,9 +74,9 @@ class RaceUtilCog(Cog, name="RaceUtil", description="Commands for configuring ra
     @cooldown(rate=1, per=300, type=BucketType.guild)
     async def pause(self, context: 'HornetContext'):
         if context.guild is None: return
-        mod_data = save.get_module_data(context.guild.id, MODULE_NAME)
+        mod_data = save.get_module_model(context.guild.id, MODULE_NAME, RaceUtilData)
         racers = []
-        for vc_id in mod_data["raceVCs"]:
+        for vc_id in mod_data.race_vcs:
             vc: VoiceChannel | None = self.bot.get_channel_typed(vc_id, VoiceChannel)
             if vc is None: return
             racers += vc.members
@@ -61,23 +87,22 @@ class RaceUtilCog(Cog, name="RaceUtil", description="Commands for configuring ra
     @cooldown(rate=1, per=10, type=BucketType.channel)
     async def ready(self, context: 'HornetContext', count: int = 0):
         if context.guild is None: return
-        mod_data = save.get_module_data(context.guild.id, MODULE_NAME)
-        emoji = mod_data["readyEmote"]
+        emoji = save.get_module_model(context.guild.id, MODULE_NAME, RaceUtilData).ready_emote
         message = await context.reply(f"{emoji}")
         if count > 0:
             self.readies[message.id] = count
+            self.bot.reactions.watch_message(self.qualified_name, message.id)
         await message.add_reaction(emoji)
 
     @command(help="Add a race VC")
     @auth.check_admin
     async def addRaceVC(self, ctx: 'HornetContext', channel: VoiceChannel):
         if ctx.guild is None: return
-        mod_data = save.get_module_data(ctx.guild.id, MODULE_NAME)
-        if channel.id in mod_data["raceVCs"]:
+        if channel.id in save.get_module_model(ctx.guild.id, MODULE_NAME, RaceUtilData).race_vcs:
             await ctx.embed_reply(message="Voice channel is already set as a race VC!")
             return
-        mod_data["raceVCs"].append(channel.id)
-        save.save()
+        save.get_module_data(ctx.guild.id, MODULE_NAME)["raceVCs"].append(channel.id)
+        save.save(ctx.guild.id)
         await ctx.embed_reply(message=f"Voice channel {channel.jump_url} set as a race VC")
 
     @command(help="Remove a race vc")
@@ -86,7 +111,7 @@ class RaceUtilCog(Cog, name="RaceUtil", description="Commands for configuring ra
         if ctx.guild is None: return
         mod_data = save.get_module_data(ctx.guild.id, MODULE_NAME)
         mod_data["raceVCs"].remove(channel.id)
-        save.save()
+        save.save(ctx.guild.id)
         await ctx.embed_reply(message=f"Race channel {channel.jump_url} removed")
 
     @command(help="Sets the emote for ;ready")
@@ -98,13 +123,11 @@ class RaceUtilCog(Cog, name="RaceUtil", description="Commands for configuring ra
         emoji_str = emojiUtil.to_string(emoji)
         mod_data = save.get_module_data(ctx.guild.id, MODULE_NAME)
         mod_data["readyEmote"] = emoji_str
-        save.save()
+        save.save(ctx.guild.id)
         await ctx.embed_reply(message=f"Ready emote set to {emoji_str}")
 
-    @Cog.listener()
     async def on_raw_reaction_add(self, payload: RawReactionActionEvent):
         if payload.message_id not in self.readies: return
-        if payload.user_id == self.bot.user_id: return
 
         channel = self.bot.get_channel_typed(payload.channel_id, Messageable)
         if channel is None: return
@@ -115,6 +138,7 @@ class RaceUtilCog(Cog, name="RaceUtil", description="Commands for configuring ra
 
         if reaction.count > self.readies[payload.message_id]:
             self.readies.pop(payload.message_id)
+            self.bot.reactions.unwatch_message(self.qualified_name, payload.message_id)
             exit_time = int(time.time() + 15)
             send_time = time.time()
             msg = await message.reply(f"<t:{exit_time}:R>", mention_author=False)
@@ -1,20 +1,45 @@
-from discord import Message, RawReactionActionEvent, Role
+from discord import Guild, Message, RawReactionActionEvent, Role
 from discord.ext.commands import Cog, command
-from typing import TYPE_CHECKING
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Self
 if TYPE_CHECKING:
     from Hornet import HornetBot, HornetContext
 
-from components import auth, emojiUtil
+from components import auth, emojiUtil, outbound
 import save
 
 MODULE_NAME = __name__.split(".")[-1]
+INTENTS = ["guild_reactions", "members"]
+MEMBER_CACHE = ["joined"]  # Reaction removals only carry the user id
 
-"""This is a weird schema, but it works and doesnt require storing 80 billion things
+"""Schema (since save version 0.2; older composite "`channelid`_`messageid`_`emoji`" keys are migrated by `migrations`)
 {
-    "`channelid`_`messageid`<:`emojiname`:`emojiid`>" : `roleid`
+    "`channelid`": {"`messageid`": {"`emoji`": `roleid`}}
 }
 """
 
+@dataclass(slots=True, frozen=True)
+class ReactRolesData():
+    roles: dict[tuple[int, int, str], int]
+    """(channel_id, message_id, emoji) : role_id"""
+
+    @classmethod
+    def from_dict(cls, data) -> Self:
+        return cls({(int(channel_id), int(message_id), emoji): role_id
+                    for channel_id, messages in data.items()
+                    for message_id, emojis in messages.items()
+                    for emoji, role_id in emojis.items()})
+
+    def to_dict(self) -> dict:
+        data = {}
+        for (channel_id, message_id, emoji), role_id in self.roles.items():
+            data.setdefault(str(channel_id), {}).setdefault(str(message_id), {})[emoji] = role_id
+        return data
+
+def message_ids(mod_data: dict) -> list[int] | None:
+    """Index summary: the reaction role messages of a guild"""
+    return [int(message_id) for messages in mod_data.values() for message_id in messages] or None
+
 async def setup(bot: 'HornetBot'):
     save.add_module_template(MODULE_NAME, {})
     await bot.add_cog(ReactRolesCog(bot))
@@ -27,8 +52,22 @@ class ReactRolesCog(Cog, name="ReactRoles", description="Handles reaction roles"
         self.bot = bot
         self._log = bot._log.getChild("ReactRoles")
 
+    async def cog_load(self):
+        await save.add_index(MODULE_NAME, message_ids)
+        self.bot.reactions.register(self.qualified_name, on_add=self.on_raw_reaction_add, on_remove=self.on_raw_reaction_remove)
+        for guild in self.bot.guilds:  # Empty at startup; guilds are watched as they become available
+            self.watch_guild(guild.id)
+
     async def cog_unload(self):
-        pass
+        self.bot.reactions.unregister(self.qualified_name)
+
+    def watch_guild(self, guild_id: int):
+        for message_id in save.get_index(MODULE_NAME).get(str(guild_id), ()):  # Doesn't load the guild
+            self.bot.reactions.watch_message(self.qualified_name, message_id)
+
+    @Cog.listener()
+    async def on_guild_available(self, guild: Guild):
+        self.watch_guild(guild.id)
 
     @command(help="Adds a react role to given message")
     @auth.check_admin
@@ -36,8 +75,11 @@ class ReactRolesCog(Cog, name="ReactRoles", description="Handles reaction roles"
         if context.guild is None: return
         emoji_ref = await emojiUtil.to_emoji(context, emoji)
         mod_data = save.get_module_data(context.guild.id, MODULE_NAME)
-        mod_data[f"{message.channel.id}_{message.id}_{emoji_ref}"] = role.id
-        save.save()
+        messages = mod_data.setdefault(str(message.channel.id), {})
+        messages.setdefault(str(message.id), {})[str(emoji_ref)] = role.id
+        save.save(context.guild.id)
+        save.reindex(MODULE_NAME, context.guild.id)
+        self.bot.reactions.watch_message(self.qualified_name, message.id)
         await message.add_reaction(emoji)
         await context.embed_reply(message=f"Added reaction role <@&{role.id}> for {emojiUtil.to_string(emoji_ref)} on {message.jump_url}")
 
@@ -47,8 +89,14 @@ class ReactRolesCog(Cog, name="ReactRoles", description="Handles reaction roles"
         if context.guild is None: return
         emoji_ref = await emojiUtil.to_emoji(context, emoji)
         mod_data = save.get_module_data(context.guild.id, MODULE_NAME)
-        exit_role = mod_data.pop(f"{message.channel.id}_{message.id}_{emoji_ref}")
-        save.save()
+        messages = mod_data[str(message.channel.id)]
+        exit_role = messages[str(message.id)].pop(str(emoji_ref))
+        if not messages[str(message.id)]:
+            del messages[str(message.id)]
+            self.bot.reactions.unwatch_message(self.qualified_name, message.id)
+        if not messages: del mod_data[str(message.channel.id)]
+        save.save(context.guild.id)
+        save.reindex(MODULE_NAME, context.guild.id)
         await message.clear_reaction(emoji_ref)
         await context.embed_reply(message=f"Removed reaction role <@&{exit_role}> for {emojiUtil.to_string(emoji_ref)} on {message.jump_url}")
 
@@ -58,42 +106,39 @@ class ReactRolesCog(Cog, name="ReactRoles", description="Handles reaction roles"
         if context.guild is None: return
         mod_data = save.get_module_data(context.guild.id, MODULE_NAME)
         message = ""
-        for react_str, role_id in mod_data.items():
-            channel_id, _, react_str = str(react_str).partition("_")
-            msg_id, _, emoji = react_str.partition("_")
-            message += f"https://discord.com/channels/{context.guild.id}/{channel_id}/{msg_id} | {emoji} | <@&{role_id}>\r\n"
-        save.save()
+        for channel_id, messages in mod_data.items():
+            for msg_id, emojis in messages.items():
+                for emoji, role_id in emojis.items():
+                    message += f"https://discord.com/channels/{context.guild.id}/{channel_id}/{msg_id} | {emoji} | <@&{role_id}>\r\n"
         await context.embed_reply(title="React Roles", message=message)
 
-    @Cog.listener()
     async def on_raw_reaction_add(self, payload: RawReactionActionEvent):
         if payload.guild_id is None or (guild := self.bot.get_guild(payload.guild_id)) is None:
             return
         emoji_id = payload.emoji.name if payload.emoji.is_unicode_emoji() else emojiUtil.to_string(payload.emoji)
-        key = f"{payload.channel_id}_{payload.message_id}_{emoji_id}"
-        mod_data = save.get_module_data(payload.guild_id, MODULE_NAME)
-        if key not in mod_data: return
-        if payload.user_id == self.bot.user_id: return
+        key = (payload.channel_id, payload.message_id, emoji_id)
+        mod_data = save.get_module_model(payload.guild_id, MODULE_NAME, ReactRolesData)
+        if (role_id := mod_data.roles.get(key)) is None: return
         
-        if (role := guild.get_role(mod_data[key])) is None:
+        if (role := guild.get_role(role_id)) is None:
             self._log.error(f"React role could not find role: {key}")
             return
         
         if (user := guild.get_member(payload.user_id)) is not None:
-            await user.add_roles(role, reason="Reactrole add")
+            await self.bot.outbound.submit(lambda: user.add_roles(role, reason="Reactrole add"), ("guild", guild.id), outbound.MODERATION,
+                                           key=("roles", guild.id, user.id, role.id), name="reactrole add")
 
-    @Cog.listener()
     async def on_raw_reaction_remove(self, payload: RawReactionActionEvent):
         if payload.guild_id is None or (guild := self.bot.get_guild(payload.guild_id)) is None:
             return
         emoji_id = payload.emoji.name if payload.emoji.is_unicode_emoji() else emojiUtil.to_string(payload.emoji)
-        key = f"{payload.channel_id}_{payload.message_id}_{emoji_id}"
-        mod_data = save.get_module_data(payload.guild_id, MODULE_NAME)
-        if key not in mod_data: return
-        if payload.user_id == self.bot.user_id: return
+        key = (payload.channel_id, payload.message_id, emoji_id)
+        mod_data = save.get_module_model(payload.guild_id, MODULE_NAME, ReactRolesData)
+        if (role_id := mod_data.roles.get(key)) is None: return
         
-        if (role := guild.get_role(mod_data[key])) is None:
+        if (role := guild.get_role(role_id)) is None:
             self._log.error(f"React role could not find role: {key}")
             return
         if (user := guild.get_member(payload.user_id)) is not None:
-            await user.remove_roles(role, reason="Reactrole remove")
+            await self.bot.outbound.submit(lambda: user.remove_roles(role, reason="Reactrole remove"), ("guild", guild.id), outbound.MODERATION,
+                                           key=("roles", guild.id, user.id, role.id), name="reactrole remove")
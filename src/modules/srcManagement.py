@@ -1,5 +1,3 @@
-import speedruncompy
-from speedruncompy.datatypes.enums import Verified
 from discord.ext.commands import Cog, command
 from discord.ext.tasks import loop
 from collections import deque
@@ -8,10 +6,13 @@ if TYPE_CHECKING:
     from Hornet import HornetBot, HornetContext
 
 import config, save
-from components import src, auth, twitch
+from components import src, auth, metrics, twitch
+from components.lazy import lazy_import
 
 MODULE_NAME = __name__.split(".")[-1]
 
+speedruncompy = lazy_import("speedruncompy")  # Not imported at all if the module refuses to load without credentials
+
 """
 module schema:
 games {
@@ -134,7 +135,7 @@ class SRCManagementCog(Cog, name="SRCManagement", description="Allows Hornet to
             self._log.error("SRC PHPSESSID not provided; exiting")
             raise Exception("SRC PHPSESSID not provided")
         
-        session = (await speedruncompy.GetSession(_api=src.CLIENT).perform_async()).session
+        session = (await src.perform(speedruncompy.GetSession(_api=src.CLIENT))).session
         if not session.signedIn:
             self._log.error("Could not log in - cancelling load")
             raise Exception("Could not log in!")
@@ -147,14 +148,14 @@ class SRCManagementCog(Cog, name="SRCManagement", description="Allows Hornet to
     
     async def checkGameModerated(self, game_id):
         """Check if Hornet can moderate a game"""
-        modGames = await speedruncompy.GetModerationGames(_api=src.CLIENT).perform_async()
+        modGames = await src.perform(speedruncompy.GetModerationGames(_api=src.CLIENT))
         if game_id not in [g.get("id") for g in modGames.games]:  # type:ignore  # GetModerationGames returns None when not logged in. We are logged in.
             return False
         return True
 
     async def checkModerators(self, username, game):
         """Checks a game's moderators for a specific discord username (NOT verifiers)"""
-        game_data = await speedruncompy.GetGameData(_api=src.CLIENT, gameId=game).perform_async()
+        game_data = await src.perform(speedruncompy.GetGameData(_api=src.CLIENT, gameId=game))
         mods = [moderator.userId for moderator in game_data.moderators if moderator.level >= 0]
         modNames = [str(u.name) for u in game_data.users if u.id in mods]
         for name in modNames:
@@ -164,6 +165,7 @@ class SRCManagementCog(Cog, name="SRCManagement", description="Allows Hornet to
 
     @command(help="Add a game to be managed by Hornet")
     @auth.check_admin
+    @auth.check_writes_global
     async def addModeratedGame(self, ctx: 'HornetContext', *, game: str):
         if ctx.guild is None: return
         game_o = await src.find_game(game)
@@ -186,6 +188,7 @@ class SRCManagementCog(Cog, name="SRCManagement", description="Allows Hornet to
     
     @command(help="Stop Hornet managing a game")
     @auth.check_admin
+    @auth.check_writes_global
     async def removeModeratedGame(self, ctx: 'HornetContext', *, game):
         game = await src.find_game(game)
         game_id = game.id
@@ -206,6 +209,7 @@ class SRCManagementCog(Cog, name="SRCManagement", description="Allows Hornet to
     
     @command(help="Add a moderation check to a game")
     @auth.check_admin
+    @auth.check_writes_global
     async def addCheck(self, ctx: 'HornetContext', check: str, *, game):
         game = await src.find_game(game)
         if not await self.checkModerators(ctx.author.name, game.id):
@@ -232,6 +236,7 @@ class SRCManagementCog(Cog, name="SRCManagement", description="Allows Hornet to
 
     @command(help="Remove a moderation check from a game")
     @auth.check_admin
+    @auth.check_writes_global
     async def removeCheck(self, ctx: 'HornetContext', check: str, *, game):
         game = await src.find_game(game)
         if not await self.checkModerators(ctx.author.name, game.id):
@@ -278,6 +283,7 @@ class SRCManagementCog(Cog, name="SRCManagement", description="Allows Hornet to
 
     @command(help="Clear cache of checked runs")
     @auth.check_admin
+    @auth.check_writes_global
     async def clearChecked(self, ctx: 'HornetContext', *, game: str):
         game_o = await src.find_game(game)
         if not await self.checkModerators(ctx.author.name, game_o.id):
@@ -288,7 +294,7 @@ class SRCManagementCog(Cog, name="SRCManagement", description="Allows Hornet to
         await ctx.embed_reply(f"Cleared cache for game `{game_o.name}` with id `{game_o.id}`")
 
     async def doChecks(self, game_data: dict, run: dict, unverified: dict):
-        run_settings = (await speedruncompy.GetRunSettings(run["id"], _api=src.CLIENT).perform_async()).settings
+        run_settings = (await src.perform(speedruncompy.GetRunSettings(run["id"], _api=src.CLIENT))).settings
         comments = []
         reject_reasons = []
         all_checks = [method for method in Checks.__dict__.items() if isinstance(method[1], staticmethod)]
@@ -304,17 +310,19 @@ class SRCManagementCog(Cog, name="SRCManagement", description="Allows Hornet to
             run_settings.comment = run_settings.get("comment", "") + "\r\n\r\n// Hornet Comments: " + " & ".join(comments)
             self._log.info(f"Run {run['id']} given comments {comments}")
             await self.bot.guild_log(guild, f"Run {run['id']} edited w/ comments:\r\n```{comments}```", source="SRCManagement")
-            await speedruncompy.PutRunSettings(autoverify=False, csrfToken=self.csrf, settings=run_settings, _api=src.CLIENT).perform_async()
+            await src.perform(speedruncompy.PutRunSettings(autoverify=False, csrfToken=self.csrf, settings=run_settings, _api=src.CLIENT))
 
         if len(reject_reasons) != 0:
             self._log.debug(run)
             self._log.info(f"Run {run['id']} rejected with reasons {reject_reasons}")
             await self.bot.guild_log(guild, f"Run {run['id']} rejected w/ reasons:\r\n```{reject_reasons}```", source="SRCManagement")
             reason = "Hornet Auto-Reject: Your run was rejected automatically for the following reason(s): " + " & ".join(reject_reasons) + ". | If you believe this is in error, please contact a moderator."
-            await speedruncompy.PutRunVerification(run["id"], Verified.REJECTED, reason=reason, _api=src.CLIENT).perform_async()
+            await src.perform(speedruncompy.PutRunVerification(run["id"], speedruncompy.Verified.REJECTED, reason=reason, _api=src.CLIENT))
 
     @loop(minutes=15)
+    @metrics.timed(metrics.tasks, "checkRuns")
     async def checkRuns(self):
+        if not self.bot.owns_global(): return
         self._log.debug("checkRuns running...")
         mod_data = save.get_global_module(MODULE_NAME)
         for game_id in mod_data["games"]:
@@ -327,7 +335,7 @@ class SRCManagementCog(Cog, name="SRCManagement", description="Allows Hornet to
                 if not await self.checkGameModerated(game_id):
                     await self.bot.guild_log(guild, f"Hornet cannot moderate game w/ ID `{game_id}`, skipping", source="SRCManagement")
                     continue
-                unverified = await speedruncompy.GetModerationRuns(game_id, 100, 1, verified=0, _api=src.CLIENT).perform_async()
+                unverified = await src.perform(speedruncompy.GetModerationRuns(game_id, 100, 1, verified=0, _api=src.CLIENT))
                 for run in unverified.get("runs", []):
                     if run["id"] in game_queue: continue
                     await self.doChecks(game_data, run, unverified)
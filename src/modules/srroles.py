@@ -4,14 +4,16 @@ from discord.ext.commands import Cog, command
 from typing import TYPE_CHECKING, TypedDict
 if TYPE_CHECKING:
     from Hornet import HornetBot, HornetContext
+    from speedruncompy import Game
 
-from speedruncompy import Game, GetUserLeaderboard, Verified
-
-from components import auth, src
+from components import auth, outbound, src
+from components.lazy import lazy_import
 import save
 
 MODULE_NAME = __name__.split(".")[-1]
 
+speedruncompy = lazy_import("speedruncompy")
+
 class SRRolesModuleDict(TypedDict):
     roles: dict[str, list[str]]
     """role_id : list[game_id]"""
@@ -52,10 +54,10 @@ class SrRolesCog(Cog, name="SrcRoles", description="Commands to verify runners f
         if src_discord.lower() != discord_name.lower():
             return await context.embed_reply(f"Your Discord username doesn't match SRC! Update the Discord username on your SRC profile to `{discord_name}` (currently `{src_discord}`)")
 
-        user_leaderboard = await GetUserLeaderboard(user.id, _api=src.CLIENT).perform_async()
+        user_leaderboard = await src.perform(speedruncompy.GetUserLeaderboard(user.id, _api=src.CLIENT))
         user_verified_games = set()
         for run in user_leaderboard.runs:
-            if run.verified == Verified.VERIFIED:
+            if run.verified == speedruncompy.Verified.VERIFIED:
                 user_verified_games.add(run.gameId)
         
         assign_roles: set[Role] = set()
@@ -72,14 +74,15 @@ class SrRolesCog(Cog, name="SrcRoles", description="Commands to verify runners f
         if len(assign_roles) == 0:
             return await context.embed_reply("You need to have a verified run on Speedrun.com!")
         
-        await context.author.add_roles(*assign_roles, reason="Grant SR Roles")
+        await self.bot.outbound.submit(lambda m=context.author, r=assign_roles: m.add_roles(*r, reason="Grant SR Roles"), ("guild", context.guild.id),
+                                       outbound.MODERATION, name="sr roles")
         await context.embed_reply(f"Runner {src_username} given roles {', '.join(r.name for r in assign_roles)}")
 
     @command(help="Sets up games for runner role. Supply game names in quotes.")
     @auth.check_admin
     async def setupsrrole(self, context: 'HornetContext', role: Role, *game_names: str):
         if context.guild is None or not isinstance(context.author, Member): return
-        games: list[Game] = []
+        games: list['Game'] = []
         not_found = []
         for game_name in game_names:
             try:
@@ -89,7 +92,7 @@ class SrRolesCog(Cog, name="SrcRoles", description="Commands to verify runners f
         
         roles = save.get_module_data(context.guild.id, MODULE_NAME)["roles"]
         roles[str(role.id)] = [game.id for game in games]
-        save.save()
+        save.save(context.guild.id)
 
         found_game_names: list[str] = [g.name for g in games]
         await context.embed_reply(message=("Verified:\r\n" + '\r\n'.join(found_game_names)
@@ -99,4 +102,4 @@ class SrRolesCog(Cog, name="SrcRoles", description="Commands to verify runners f
     async def listsrgames(self, context: 'HornetContext'):
         if context.guild is None: return
         roles = save.get_module_data(context.guild.id, MODULE_NAME)["roles"]
-        await context.embed_reply(title="Verified Games:", message=json.dumps(roles))
+        await context.embed_reply(title="Verified Games:", message=json.dumps({role_id: list(games) for role_id, games in roles.items()}))
@@ -1,8 +1,41 @@
-import json, os, shutil, copy, logging
+import asyncio, marshal, os, copy, logging, threading, time
+from collections.abc import MutableMapping
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable
+
+import config, migrations
+from storage.codecs import get_codec
+from storage.jsonfile import JsonBackend
+from storage.models import GuildModel, M
+from storage.snapshots import Snapshotter
+from storage.views import DefaultDictView, _DefaultView
 
 JSON_PATH = "save.json"
+SQLITE_PATH = "save.db"
+SHARD_PATH = "save"
+SNAPSHOT_PATH = "snapshots"
 data: dict = {}  # Do not access directly - use getGuildData or getModuleData instead.
-VERSION = 0.1
+VERSION = 0.2
+FLUSH_INTERVAL = 5  # seconds between write-behind flushes
+GUILD_IDLE_SECONDS = 30 * 60  # lazily loaded guilds unused for this long are evicted from memory
+MAX_CACHED_MODELS = 10000  # guild models kept; the oldest is dropped beyond this
+MIGRATION_CHECKPOINT = 1000  # guilds migrated between flushes during load, on backends that write guilds individually
+
+_dirty_all = False
+_dirty_guilds: set[str] = set()
+_write_lock = threading.Lock()  # Serialises writers from the event loop and the flush worker thread
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="save-writer")
+_flush_task: asyncio.Task | None = None
+_worker_write: Future | None = None  # The flush worker's write in progress on `_writer`
+_generation = 0  # Bumped each time save data is captured for a write
+_committed = 0  # Generation of the newest write on disk; a write captured before it is stale and skipped
+_enforcers: dict[str, Callable[[dict], None]] = {}  # Compiled module templates, applied to a guild's "modules" dict
+_default_guild: dict | None = None  # Shared defaults read through views for guilds with no data; never mutated
+_models: dict[int, GuildModel] = {}  # Typed guild models by guild id, invalidated by `save`
+_default_model: GuildModel | None = None  # Shared by guilds with no data, like `_default_guild`
+writes_global = True  # With several processes, only the holder of the global lock writes global data (see `HornetBot.owns_global`)
+_indexes: dict[str, dict[str, Any]] = {}  # Module name : guild id : summary of the module's data in that guild
+_summarizers: dict[str, Callable[[dict], Any]] = {}
 
 FULL_TEMPLATE = {
     "version": VERSION,
@@ -22,15 +55,203 @@ FULL_TEMPLATE = {
 class TemplateEnforcementError(Exception):
     """Raised when enforcing a module's template"""
 
-def save():
-    shutil.copy2(JSON_PATH, JSON_PATH + ".bak")
-    # For write-time safety - if we error mid-write then contents of the file won't be completed!
+def make_backend(name: str, codec_name: str | None = None):
+    """Storage backend from its `save_backend` config name, writing files with the `save_codec` codec (sqlite always stores json)."""
+    codec = get_codec(config.save_codec if codec_name is None else codec_name)
+    file_path = os.path.splitext(JSON_PATH)[0] + codec.extension
+    if name == "json":
+        return JsonBackend(file_path, codec)
+    if name == "sqlite":
+        from storage.sqlite import SqliteBackend
+        return SqliteBackend(SQLITE_PATH)
+    if name == "journal":
+        from storage.journal import JournalBackend
+        return JournalBackend(file_path, codec, FULL_TEMPLATE)
+    if name == "shards":
+        from storage.shards import ShardBackend
+        backend = ShardBackend(SHARD_PATH, codec)
+        backend.on_load = _on_guild_load
+        return backend
+    raise ValueError(f"Unknown save backend {name}")
+
+def save(guild_id: int | str | None = None):
+    """Mark save data as changed. Changes are written to disk by the next `flush()`, so many mutations coalesce into one write.
+
+    Pass `guild_id` if only that guild's data changed; backends that support it will then only rewrite that guild.
+    Without it, global data (global modules & templates) changed. The journal backend persists either immediately."""
+    global _dirty_all
+    if guild_id is None: _models.clear()
+    else: _models.pop(int(guild_id), None)
+    if _backend.record(data, None if guild_id is None else str(guild_id)): return
+    if guild_id is None:
+        if not writes_global: logging.warning("Global data changed in a process without the global lock; it will not be written")
+        _dirty_all = True
+    else:
+        _dirty_guilds.add(str(guild_id))
+
+def _save_all():
+    """Mark everything changed, guilds included, for a full write; for changes across many guilds, which `save()` doesn't journal."""
+    global _dirty_all
+    _models.clear()
+    _dirty_all = True
+
+def is_dirty() -> bool:
+    return _dirty_all or len(_dirty_guilds) > 0
+
+def _take_dirty() -> set[str] | None:
+    """Clear dirty state, returning the guilds to write or None to write everything."""
+    global _dirty_all
+    if not _backend.partial_writes:
+        guilds = None
+    elif _dirty_all:
+        guilds = None if writes_global else set(_loaded_guilds()) | _dirty_guilds  # Global data is the global lock holder's to write
+    else:
+        guilds = set(_dirty_guilds)
+    _dirty_all = False
+    _dirty_guilds.clear()
+    return guilds
+
+def _restore_dirty(guilds: set[str] | None):
+    global _dirty_all
+    if guilds is None: _dirty_all = True
+    else: _dirty_guilds.update(guilds)
+
+def _next_generation() -> int:
+    global _generation
+    _generation += 1
+    return _generation
+
+def flush():
+    """Write save data to disk if it has changed since the last flush.
+
+    Waits for a write the flush worker has already started, so that older data never lands on top of this write."""
+    if _worker_write is not None: wait([_worker_write])
+    if not is_dirty(): return
+    guilds = _take_dirty()
+    try:
+        if not _write_current(_writable(), guilds, _backend.begin_write(data), _next_generation()):
+            _restore_dirty(guilds)
+    except Exception:
+        _restore_dirty(guilds)  # Retry on the next flush
+        raise
+
+async def flush_async():
+    """Write save data to disk off the event loop if it has changed.
+
+    Takes a snapshot of `data` on the loop, then serialises & writes it in a worker thread.
+    Concurrent calls collapse into the in-flight write, which repeats once if data changed while it was writing."""
+    global _flush_task
+    if _flush_task is None or _flush_task.done():
+        _flush_task = asyncio.create_task(_flush_worker())
+    await asyncio.shield(_flush_task)
+
+async def _flush_worker():
+    global _worker_write
+    while is_dirty():
+        guilds = _take_dirty()
+        try:
+            if guilds is None:
+                frozen = snapshot(_writable())
+            else:
+                frozen = snapshot({"guilds": {g: data["guilds"][g] for g in guilds if g in data["guilds"]}})
+            marker = _backend.begin_write(data)
+            _worker_write = _writer.submit(_write_frozen, frozen, guilds, marker, _next_generation())
+            if not await asyncio.wrap_future(_worker_write):
+                _restore_dirty(guilds)  # Superseded by a newer write, which may not have covered these guilds
+        except Exception:
+            _restore_dirty(guilds)
+            raise
+        finally:
+            _worker_write = None
+
+def _write_frozen(frozen: bytes, guilds: set[str] | None, marker, generation: int) -> bool:
+    return _write_current(marshal.loads(frozen), guilds, marker, generation)
+
+def _write_current(obj: dict, guilds: set[str] | None, marker, generation: int) -> bool:
+    """Write `obj`, captured at `generation`, unless a newer capture is already on disk. Returns whether it was written."""
+    global _committed
+    with _write_lock:
+        if generation < _committed: return False
+        _backend.write(obj, guilds, marker)
+        _committed = generation
+    return True
+
+async def snapshot_async() -> str:
+    """Write a compressed, timestamped snapshot of all save data to `SNAPSHOT_PATH` off the event loop, pruning old snapshots. Returns its path.
+
+    Guilds that are not loaded are read from their shards in the worker thread."""
+    frozen = snapshot(_writable())
+    guilds = data["guilds"]
+    unloaded = [g for g in guilds if g not in guilds.loaded] if hasattr(guilds, "loaded") else []
+    return await asyncio.to_thread(_take_snapshot, frozen, unloaded)
+
+async def snapshot_store_async() -> str:
+    """Like `snapshot_async`, but snapshots the save as stored rather than as held in memory, for when other processes write parts of it.
+    Falls back to `snapshot_async` on backends that can't be read back."""
+    read_all = getattr(_backend, "read_all", None)
+    if read_all is None: return await snapshot_async()
+    await flush_async()
+    def take() -> str:
+        obj = read_all()
+        if obj is None: raise FileNotFoundError("No save to snapshot")
+        return _snapshotter.take(obj)
+    return await asyncio.to_thread(take)
+
+def take_global():
+    """Make this process the writer of global data, once it holds the global lock. Global module data is first re-read from the store,
+    as the previous holder may have changed it; global changes made here without the lock were never written, and are replaced."""
+    global writes_global
+    load_global = getattr(_backend, "load_global", None)
+    if load_global is not None:
+        with _write_lock:
+            modules = load_global()
+        data["modules"].update(modules)
+    writes_global = True
+
+def _take_snapshot(frozen: bytes, unloaded: list[str]) -> str:
+    obj = marshal.loads(frozen)
+    for guild_id in unloaded:
+        obj["guilds"][guild_id] = data["guilds"].read(guild_id)
+    return _snapshotter.take(obj)
+
+def restore_snapshot() -> dict | None:
+    """Newest snapshot that can be read, or None if there are none.
+
+    `load` falls back to this when the save can't be read or doesn't exist. To roll back to a snapshot by hand,
+    stop Hornet, move the save (save.json/save.db/save/) aside, and start it again."""
+    return _snapshotter.restore()
+
+def _loaded_guilds() -> dict[str, dict]:
+    """Guilds currently in memory. With the shard backend unloaded guilds are excluded, as they are unchanged on disk."""
+    guilds = data["guilds"]
+    return guilds.loaded if hasattr(guilds, "loaded") else guilds
+
+def _writable() -> dict:
+    return data | {"guilds": _loaded_guilds()}
+
+def evict_idle(idle_seconds: float = GUILD_IDLE_SECONDS) -> int:
+    """Evict guilds that have not been accessed recently & have no unflushed changes (shard backend only). Returns the number evicted."""
+    guilds = data["guilds"]
+    if _dirty_all or not hasattr(guilds, "evict"): return 0
+    evicted = guilds.evict(idle_seconds, _dirty_guilds)
+    if evicted:
+        for guild_id in [g for g in _models if str(g) not in guilds.loaded]:
+            _models.pop(guild_id)
+    return evicted
+
+def snapshot(obj) -> bytes:
+    """Freeze JSON-like save data into an immutable, consistent copy.
 
-    with open(JSON_PATH, "w") as f:
-        json.dump(data, f, indent=4)
+    `marshal` runs entirely in C, so this is several times cheaper on the event loop than `copy.deepcopy` or a recursive copy."""
+    return marshal.dumps(obj)
 
 def add_module_template(module_name: str, init_data: dict):
+    global _default_guild, _default_model
     data["module_templates"][module_name] = copy.deepcopy(init_data)
+    _enforcers.pop(module_name, None)
+    _default_guild = None
+    _default_model = None
+    _models.clear()
     save()
 
 def add_global_module_template(module_name: str, init_data: dict):
@@ -46,9 +267,41 @@ def enforce_template_dict(target: dict, template: dict):
         if target_value is None:
             target[k] = template_value
             continue
-        if not isinstance(target_value, type(template_value)): raise TemplateEnforcementError(k)
+        expected_type = MutableMapping if isinstance(template_value, dict) else type(template_value)  # Allows lazily loaded mappings
+        if not isinstance(target_value, expected_type): raise TemplateEnforcementError(k)
         if isinstance(target_value, dict): enforce_template_dict(target_value, template_value)
 
+def compile_template(template: dict) -> Callable[[dict], None]:
+    """Compile a template into a function enforcing it; equivalent to `enforce_template_dict`, but the template is only inspected once.
+
+    Missing keys are filled with copies of template values, and a `None` template value accepts any type."""
+    checks = []
+    for key, default in template.items():
+        if default is None: expected_type = object
+        elif isinstance(default, dict): expected_type = MutableMapping
+        else: expected_type = type(default)
+        nested = compile_template(default) if isinstance(default, dict) and default else None
+        mutable = isinstance(default, (dict, list))
+        checks.append((key, default, expected_type, nested, mutable))
+
+    def enforce(target: dict):
+        for key, default, expected_type, nested, mutable in checks:
+            value = target.get(key)
+            if value is None:
+                target[key] = copy.deepcopy(default) if mutable else default
+            elif not isinstance(value, expected_type):
+                raise TemplateEnforcementError(key)
+            elif nested is not None and isinstance(value, dict):
+                nested(value)
+    return enforce
+
+def get_enforcer(module_name: str) -> Callable[[dict], None]:
+    """Compiled enforcer for a module's template, cached until the template is replaced. Takes a guild's "modules" dict."""
+    enforcer = _enforcers.get(module_name)
+    if enforcer is None:
+        enforcer = _enforcers[module_name] = compile_template({module_name: data["module_templates"][module_name]})
+    return enforcer
+
 def get_guild_ids() -> list[str]:
     return data["guilds"].keys()
 
@@ -59,16 +312,97 @@ def get_global_module(module_name) -> dict:
     return data["modules"][module_name]
 
 def get_guild_data(guild_id: str | int) -> dict:
-    if str(guild_id) not in data["guilds"]:
-        logging.warn("Guild not found: instantiating")
-        init_guild_data(str(guild_id))
-    return data["guilds"][str(guild_id)]
+    """Get a guild's save data. Guilds with no data get a read-only view of the defaults, which instantiates the guild on first write."""
+    guild_id = str(guild_id)
+    guilds = data["guilds"]
+    if guild_id in guilds:
+        return guilds[guild_id]
+    return DefaultDictView(get_default_guild(), guild_id, ())  # type: ignore
+
+def get_guild_model(guild_id: int) -> GuildModel:
+    """Typed, read-only model of a guild's save data, cached until the guild is next marked dirty with `save`.
+    Guilds with no data share one model of the defaults, so events from unconfigured guilds cache nothing."""
+    global _default_model
+    model = _models.get(guild_id)
+    if model is not None: return model
+    guilds = data["guilds"]
+    if str(guild_id) not in guilds:
+        model = _default_model
+        if model is None: model = _default_model = GuildModel.from_dict(get_default_guild())
+        return model
+    if len(_models) >= MAX_CACHED_MODELS: del _models[next(iter(_models))]
+    model = _models[guild_id] = GuildModel.from_dict(guilds[str(guild_id)])
+    return model
+
+def get_module_model(guild_id: int, module_name: str, model_type: type[M]) -> M:
+    """Typed, read-only model of a module's guild data, built with `model_type.from_dict` & cached like `get_guild_model`."""
+    modules = get_guild_model(guild_id).modules
+    model = modules.get(module_name)
+    if not isinstance(model, model_type):  # Not built yet, or built by the module's class before a reload
+        model = modules[module_name] = model_type.from_dict(get_module_data(guild_id, module_name))
+    return model
+
+async def add_index(module_name: str, summarize: Callable[[dict], Any]):
+    """Index a module's guilds by a small summary of their data, so background loops & startup can visit only the guilds that matter
+    without loading each one (shard backend). Guilds not loaded are read from disk in a worker thread, without loading them.
+
+    `summarize` takes the module's data in a guild, which may lack its template's defaults, & returns the summary, or None to leave the guild out.
+    Built once, and kept across module reloads; call `reindex` after changing a guild's data."""
+    _summarizers[module_name] = summarize
+    if module_name in _indexes: return
+    index = _indexes[module_name] = {}
+    guilds = data["guilds"]
+    loaded = _loaded_guilds()
+    for guild_id, guild in loaded.items():
+        _summarize(index, module_name, guild_id, guild)
+    unloaded = [g for g in guilds if g not in loaded]
+    if not unloaded: return
+    def scan() -> dict[str, dict]:
+        found = {}
+        for guild_id in unloaded:
+            guild = guilds.read(guild_id)
+            migrations.migrate_guild(guild_id, guild, VERSION)  # A throwaway copy; the guild is migrated for real when loaded
+            found[guild_id] = guild
+        return found
+    for guild_id, guild in (await asyncio.to_thread(scan)).items():
+        # Guilds loaded during the scan may have changed since they were read
+        _summarize(index, module_name, guild_id, guild if guild_id not in guilds.loaded else guilds[guild_id])
+
+def reindex(module_name: str, guild_id: int | str):
+    """Update a guild's entry in a module's index (see `add_index`), after changing its data"""
+    if (index := _indexes.get(module_name)) is not None:
+        _summarize(index, module_name, str(guild_id), get_guild_data(guild_id))
+
+def get_index(module_name: str) -> dict[str, Any]:
+    """Guild id : summary, for the guilds indexed by `add_index`"""
+    return _indexes.get(module_name, {})
+
+def _summarize(index: dict[str, Any], module_name: str, guild_id: str, guild: dict):
+    summary = _summarizers[module_name](guild.get("modules", {}).get(module_name, {}))
+    if summary is None: index.pop(guild_id, None)
+    else: index[guild_id] = summary
+
+def get_default_guild() -> dict:
+    """Defaults for a new guild (guild template & module templates). Shared; do not mutate."""
+    global _default_guild
+    guild = _default_guild
+    if guild is None:
+        guild = _default_guild = copy.deepcopy(data["guild_template"]) | {"modules": copy.deepcopy(data["module_templates"])}
+    return guild
+
+def materialize_guild(guild_id: str) -> dict:
+    """Get a guild's save data, instantiating it if it does not exist."""
+    if guild_id not in data["guilds"]:
+        init_guild_data(guild_id)
+    return data["guilds"][guild_id]
 
 def init_guild_data(guild_id: str, guild_name: str = ""):
-    data["guilds"][guild_id] = data["guild_template"]
+    logging.info(f"Instantiating guild {guild_id}")
+    data["guilds"][guild_id] = copy.deepcopy(data["guild_template"])
     data["guilds"][guild_id]["nick"] = guild_name
     data["guilds"][guild_id]["modules"] = copy.deepcopy(data["module_templates"])
-    save()
+    data["guilds"][guild_id]["version"] = VERSION
+    save(guild_id)
 
 def init_module(module_name, init_data=None):
     if init_data is None:
@@ -79,40 +413,112 @@ def init_module(module_name, init_data=None):
             else:
                 return  # No template added by module, ignore it
         init_data = data["module_templates"][module_name]
-    for guild_id in get_guild_ids():
-        modules = get_guild_data(guild_id)["modules"]
-        if module_name in modules:
-            enforce_template_dict(modules[module_name], init_data)
-        else:
-            modules[module_name] = copy.deepcopy(init_data)
-    save()
+    enforce = compile_template({module_name: init_data})
+    for guild in _loaded_guilds().values():  # Lazily loaded guilds are enforced by `_on_guild_load` instead
+        enforce(guild["modules"])
+    _save_all()
+
+def init_modules(module_names: list[str], timings: dict[str, float] | None = None) -> dict[str, TemplateEnforcementError]:
+    """Enforce the templates of several modules in a single pass over loaded guilds. Returns the modules that failed enforcement.
+
+    If `timings` is given, the seconds spent enforcing each module's template are added to it.
+    Data is only marked dirty; callers should `flush()` once they are done."""
+    if timings is None: timings = {}
+    failed: dict[str, TemplateEnforcementError] = {}
+    enforcers = []
+    for module_name in module_names:
+        start = time.perf_counter()
+        if module_name in data["module_templates"]:
+            enforcers.append((module_name, get_enforcer(module_name)))
+        elif module_name in data["global_module_templates"]:
+            try:
+                init_global_module(module_name)
+            except TemplateEnforcementError as e:
+                failed[module_name] = e
+        timings[module_name] = timings.get(module_name, 0) + time.perf_counter() - start
+
+    for guild in _loaded_guilds().values():  # Lazily loaded guilds are enforced by `_on_guild_load` instead
+        modules = guild["modules"]
+        for module_name, enforce in enforcers:
+            if module_name in failed: continue
+            start = time.perf_counter()
+            try:
+                enforce(modules)
+            except TemplateEnforcementError as e:
+                failed[module_name] = e
+            timings[module_name] += time.perf_counter() - start
+    _save_all()
+    return failed
+
+def _on_guild_load(guild_id: str, guild: dict):
+    """Migrate a guild & enforce module templates on it as it is lazily loaded"""
+    if migrations.migrate_guild(guild_id, guild, VERSION):
+        save(guild_id)
+    modules = guild.setdefault("modules", {})
+    for module_name in data["module_templates"]:
+        try:
+            get_enforcer(module_name)(modules)
+        except TemplateEnforcementError as e:
+            logging.error(f"Guild {guild_id} failed to enforce {module_name} template on key {e}")
 
 def init_global_module(module_name, init_data=None):
     if init_data is None:
         if module_name not in data["global_module_templates"]: return  # No template added by module, ignore it
         init_data = data["global_module_templates"][module_name]
-    if module_name in data["modules"]:
-        enforce_template_dict(data["modules"][module_name], init_data)
-    else:
-        data["modules"][module_name] = copy.deepcopy(init_data)
+    compile_template({module_name: init_data})(data["modules"])
     save()
 
 
-if not os.path.exists(JSON_PATH):
-    data = FULL_TEMPLATE
-    save()
-else:
-    with open(JSON_PATH) as f:
-        try:
-            data = json.load(f)
-        except json.JSONDecodeError:
-            logging.warn("Could not deserialise save.json - loading backup")
-            with open(JSON_PATH + ".bak") as f2:
-                data = json.load(f2)
-        if VERSION > data["version"]:
-            logging.error(f"Save json is out of date! Json ver: {data['version']} < Save ver: {VERSION}")
-            exit(11)
-    
-    enforce_template_dict(data, FULL_TEMPLATE)
-    save()
-    pass
+def load():
+    """Load save data from the configured backend. A backend with no save yet is seeded from save.json if present, otherwise from `FULL_TEMPLATE`."""
+    global data
+    try:
+        loaded = _backend.load()
+    except Exception as e:
+        logging.error(f"Could not load {config.save_backend} save, restoring from latest snapshot", exc_info=e)
+        loaded = restore_snapshot()
+        if loaded is None: raise
+    if loaded is None and os.path.exists(JSON_PATH):
+        logging.warning(f"No {config.save_backend} ({config.save_codec}) save found, importing {JSON_PATH}")
+        loaded = JsonBackend(JSON_PATH).load()
+    if loaded is None:
+        loaded = restore_snapshot()
+
+    if loaded is None:
+        data = copy.deepcopy(FULL_TEMPLATE)
+        _save_all()
+        flush()
+        return
+
+    data = loaded
+    if data["version"] > VERSION:
+        logging.error(f"Save data is newer than this version of Hornet! Save ver: {data['version']} > Hornet ver: {VERSION}")
+        exit(11)
+    migrate()
+    compile_template(FULL_TEMPLATE)(data)
+    _save_all()
+
+def migrate():
+    """Upgrade save data to `VERSION` in place. Guilds are migrated one at a time; lazily loaded guilds are migrated as they are loaded.
+
+    Each guild records its own version, so on backends that write guilds individually progress is flushed every
+    `MIGRATION_CHECKPOINT` guilds and an interrupted migration resumes from the last checkpoint."""
+    if migrations.migrate_global(data, VERSION):
+        _save_all()
+    migrated = 0
+    for guild_id, guild in _loaded_guilds().items():
+        if not migrations.migrate_guild(guild_id, guild, VERSION): continue
+        save(guild_id)
+        migrated += 1
+        if _backend.partial_writes and migrated % MIGRATION_CHECKPOINT == 0:
+            flush()
+            logging.info(f"Migrated {migrated} guilds")
+    if migrated: logging.info(f"Migrated {migrated} guilds to {VERSION}")
+
+
+_DefaultView.materialize = materialize_guild
+_DefaultView.lookup = lambda guild_id: data["guilds"].get(guild_id)
+_backend = make_backend(config.save_backend)
+_snapshotter = Snapshotter(SNAPSHOT_PATH, get_codec("msgpack" if config.save_codec == "msgpack" else "orjson"),
+                           config.snapshot_keep, config.snapshot_max_age * 24 * 60 * 60, int(config.snapshot_max_mb * 1024 * 1024))
+load()
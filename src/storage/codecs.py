@@ -0,0 +1,70 @@
+import json, logging
+
+_log = logging.getLogger("save")
+
+class JsonCodec():
+    """stdlib json. Indented by default so save files stay readable; `indent=None` writes compact json."""
+    extension = ".json"
+
+    def __init__(self, indent: int | None = 4):
+        self.indent = indent
+        self.separators = None if indent else (",", ":")
+
+    def dumps(self, obj) -> bytes:
+        return json.dumps(obj, indent=self.indent, separators=self.separators).encode()
+
+    def loads(self, raw: bytes):
+        return json.loads(raw)
+
+class OrjsonCodec():
+    """orjson: compact json, several times faster than stdlib in both directions."""
+    extension = ".json"
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+        self._options = orjson.OPT_NON_STR_KEYS  # Match stdlib, which converts int keys to strings
+
+    def dumps(self, obj) -> bytes:
+        return self._orjson.dumps(obj, option=self._options)
+
+    def loads(self, raw: bytes):
+        return self._orjson.loads(raw)
+
+class MsgpackCodec():
+    """msgpack: compact binary format. Not human-readable; use `python -m storage.inspect` to view saves."""
+    extension = ".msgpack"
+
+    def __init__(self):
+        import msgpack  # type: ignore  # Optional; only needed for the msgpack codec
+        self._msgpack = msgpack
+
+    def dumps(self, obj) -> bytes:
+        return self._msgpack.packb(obj)
+
+    def loads(self, raw: bytes):
+        return self._msgpack.unpackb(raw, strict_map_key=False)
+
+def get_codec(name: str):
+    """Codec from its `save_codec` config name. orjson falls back to stdlib json if it isn't installed, as both read & write the same files."""
+    if name == "json":
+        return JsonCodec()
+    if name == "json-compact":
+        return JsonCodec(indent=None)
+    if name == "orjson":
+        try:
+            return OrjsonCodec()
+        except ImportError:
+            _log.warning("orjson is not installed, falling back to stdlib json")
+            return JsonCodec(indent=None)
+    if name == "msgpack":
+        return MsgpackCodec()  # No fallback: msgpack saves can't be read without it
+    raise ValueError(f"Unknown save codec {name}")
+
+def codec_for_path(path: str):
+    """Codec able to read a save file, going by its extension."""
+    if path.endswith(MsgpackCodec.extension): return MsgpackCodec()
+    try:
+        return OrjsonCodec()
+    except ImportError:
+        return JsonCodec()
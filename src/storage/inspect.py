@@ -0,0 +1,38 @@
+import json, os, sys
+from collections.abc import Mapping
+
+from storage.codecs import codec_for_path
+from storage.jsonfile import JsonBackend
+
+def open_save(path: str) -> dict:
+    """Load a save in any backend & codec: a save.db, a shards directory, or a single (json or msgpack) file."""
+    if os.path.isdir(path):
+        from storage.shards import GLOBAL_FILE, ShardBackend
+        global_name = next(name for name in os.listdir(path) if name.startswith(GLOBAL_FILE + "."))
+        obj = ShardBackend(path, codec_for_path(global_name)).load()
+    elif path.endswith(".db"):
+        from storage.sqlite import SqliteBackend
+        obj = SqliteBackend(path).load()
+    else:
+        obj = JsonBackend(path, codec_for_path(path)).load()
+    if obj is None: raise FileNotFoundError(path)
+    return obj
+
+def select(obj, keys: list[str]):
+    """Walk `keys` into `obj`, so only the requested part of a lazily loaded save is read."""
+    for key in keys:
+        obj = obj[int(key)] if isinstance(obj, list) else obj[key]
+    return obj
+
+def plain(obj):
+    """Plain dicts & lists, for lazily loaded guilds"""
+    if isinstance(obj, Mapping):
+        return {k: plain(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [plain(v) for v in obj]
+    return obj
+
+if __name__ == "__main__":
+    # python -m storage.inspect [save.json|save.msgpack|save.db|save/] [key ...], eg. `python -m storage.inspect save.msgpack guilds 1234 modules`
+    path = sys.argv[1] if len(sys.argv) > 1 else "save.json"
+    print(json.dumps(plain(select(open_save(path), sys.argv[2:])), indent=4, ensure_ascii=False))
@@ -0,0 +1,173 @@
+import copy, glob, json, logging, marshal, os
+
+from storage.jsonfile import JsonBackend
+
+_log = logging.getLogger("save")
+
+COMPACT_BYTES = 1024 * 1024  # Journal size at which a compaction into the snapshot is requested
+
+"""Journal format: one JSON mutation per line, applied in order on top of the snapshot.
+{"op": "set", "path": [...], "value": v}          target[path[-1]] = v
+{"op": "pop", "path": [...]}                      del target[path[-1]]
+{"op": "append", "path": [...], "values": [...]}  list.extend(values)
+{"op": "remove", "path": [...], "value": v}       list.remove(v)
+{"op": "push", "path": [...], "values": [...], "drop": n}  del list[:n]; list.extend(values) (bounded queues, eg. srcManagement "checked")
+Paths start at the root of save data, eg. ["guilds", "1234", "logChannel"]
+"""
+
+def diff(old, new, path: list) -> list[dict]:
+    """Typed mutations that turn `old` into `new`."""
+    if type(old) is not type(new):
+        return [{"op": "set", "path": path, "value": new}]
+    if isinstance(new, dict):
+        ops = []
+        for k, v in new.items():
+            if k not in old:
+                ops.append({"op": "set", "path": path + [k], "value": v})
+            elif old[k] != v:
+                ops += diff(old[k], v, path + [k])
+        for k in old:
+            if k not in new: ops.append({"op": "pop", "path": path + [k]})
+        return ops
+    if isinstance(new, list):
+        return diff_list(old, new, path)
+    if old != new:
+        return [{"op": "set", "path": path, "value": new}]
+    return []
+
+def diff_list(old: list, new: list, path: list) -> list[dict]:
+    if len(new) > len(old) and new[:len(old)] == old:
+        return [{"op": "append", "path": path, "values": new[len(old):]}]
+    if len(new) == len(old) - 1:
+        for i, (a, b) in enumerate(zip(old, new)):
+            if a != b: break
+        else:
+            i = len(new)
+        if old[:i] + old[i + 1:] == new and old.index(old[i]) == i:
+            return [{"op": "remove", "path": path, "value": old[i]}]
+    for drop in range(1, len(old) + 1):
+        # Bounded queue: items dropped from the front and pushed to the back
+        kept = old[drop:]
+        if new[:len(kept)] == kept and len(new) > len(kept):
+            return [{"op": "push", "path": path, "values": new[len(kept):], "drop": drop}]
+    return [{"op": "set", "path": path, "value": new}]
+
+def apply(obj: dict, op: dict):
+    *parents, key = op["path"]
+    target = obj
+    for p in parents:
+        target = target[p]
+    match op["op"]:
+        case "set": target[key] = op["value"]
+        case "pop": target.pop(key, None)
+        case "append": target[key].extend(op["values"])
+        case "remove": target[key].remove(op["value"])
+        case "push":
+            del target[key][:op["drop"]]
+            target[key].extend(op["values"])
+        case _: raise ValueError(f"Unknown journal op {op['op']}")
+
+def _global_part(obj: dict) -> dict:
+    return {k: v for k, v in obj.items() if k != "guilds"}
+
+class JournalBackend():
+    """Persists each change as typed mutations appended to a journal, compacting into a full JSON snapshot in the background.
+
+    Journals are split into numbered segments; a compaction starts a new segment & records its number in the snapshot,
+    so segments are only deleted once a snapshot containing their changes is safely on disk."""
+    partial_writes = False
+
+    def __init__(self, snapshot_path: str, codec=None, template: dict | None = None):
+        self.snapshot = JsonBackend(snapshot_path, codec)
+        self.prefix = snapshot_path + ".journal."
+        self.template = template or {}  # Replayed onto when segments exist without a snapshot
+        self._shadow: dict[str, bytes] = {}  # marshalled state of each guild as of the last journal entry
+        self._global = marshal.dumps({})  # marshalled state of everything outside "guilds" as of the last journal entry
+        self._seq = 0
+        self._file = None
+        self._size = 0
+
+    def _segments(self) -> list[tuple[int, str]]:
+        segments = []
+        for path in glob.glob(glob.escape(self.prefix) + "*"):
+            suffix = path[len(self.prefix):]
+            if suffix.isdigit(): segments.append((int(suffix), path))
+        return sorted(segments)
+
+    def _open_segment(self, seq: int):
+        if self._file is not None: self._file.close()
+        self._seq = seq
+        self._file = open(f"{self.prefix}{seq}", "a", encoding="utf-8")
+        self._size = 0
+
+    def load(self) -> dict | None:
+        obj = self.snapshot.load()
+        segments = self._segments()
+        if obj is None and not segments: return None
+        if obj is None: obj = copy.deepcopy(self.template)  # Died before the first compaction
+        start = obj.pop("_journal", 0)
+
+        replayed = 0
+        for seq, path in segments:
+            if seq < start: continue
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        op = json.loads(line)
+                    except json.JSONDecodeError:
+                        _log.warning(f"Ignoring torn journal entry at end of {path}")  # Process died mid-append
+                        break
+                    apply(obj, op)
+                    replayed += 1
+        if replayed: _log.info(f"Replayed {replayed} journal entries")
+
+        self._reset_shadow(obj)
+        self._open_segment(max([start] + [seq for seq, _ in segments]) + 1)
+        return obj
+
+    def _reset_shadow(self, obj: dict):
+        self._shadow = {guild_id: marshal.dumps(guild) for guild_id, guild in obj.get("guilds", {}).items()}
+        self._global = marshal.dumps(_global_part(obj))
+
+    def record(self, obj: dict, guild_id: str | None) -> bool:
+        """Journal the changes to one guild, or to global data (everything outside "guilds") if `guild_id` is None.
+        Returns True if the change is durable, or False if a full write is needed."""
+        if self._file is None: return False
+        guilds = obj["guilds"]
+        if guild_id is None:
+            current = _global_part(obj)
+            ops = diff(marshal.loads(self._global), current, [])
+            self._global = marshal.dumps(current)
+        elif guild_id not in guilds:
+            ops = [{"op": "pop", "path": ["guilds", guild_id]}] if guild_id in self._shadow else []
+            self._shadow.pop(guild_id, None)
+        elif guild_id not in self._shadow:
+            ops = [{"op": "set", "path": ["guilds", guild_id], "value": guilds[guild_id]}]
+            self._shadow[guild_id] = marshal.dumps(guilds[guild_id])
+        else:
+            ops = diff(marshal.loads(self._shadow[guild_id]), guilds[guild_id], ["guilds", guild_id])
+            self._shadow[guild_id] = marshal.dumps(guilds[guild_id])
+        if ops:
+            text = "".join(json.dumps(op, separators=(",", ":")) + "\n" for op in ops)
+            self._file.write(text)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._size += len(text)
+        return self._size < COMPACT_BYTES
+
+    def begin_write(self, obj: dict) -> int:
+        """Called on the event loop as `obj` is snapshotted: later changes go to a new segment. Returns the segment the snapshot replays from."""
+        self._reset_shadow(obj)
+        self._open_segment(self._seq + 1)
+        return self._seq
+
+    def write(self, obj: dict, guilds: set[str] | None = None, marker: int | None = None):
+        """Compact: write a full snapshot, then drop the journal segments it contains."""
+        if marker is None: marker = self.begin_write(obj)
+        self.snapshot.write(obj | {"_journal": marker})
+        for seq, path in self._segments():
+            if seq < marker: os.remove(path)
+
+    def close(self):
+        if self._file is not None: self._file.close()
+        self._file = None
@@ -0,0 +1,57 @@
+import logging, os, shutil
+
+from storage.codecs import JsonCodec
+
+_log = logging.getLogger("save")
+
+class JsonBackend():
+    """Stores all save data in a single document, JSON unless another codec is given. Every write rewrites the whole file."""
+    partial_writes = False
+
+    def __init__(self, path: str, codec=None):
+        self.path = path
+        self.codec = JsonCodec() if codec is None else codec
+
+    def load(self) -> dict | None:
+        """Load save data, falling back to the `.bak` file if the main file is missing or corrupt. Returns None if neither exist."""
+        if not os.path.exists(self.path):
+            if not os.path.exists(self.path + ".bak"): return None
+            _log.warning(f"{self.path} missing - loading backup")
+            return self.read(self.path + ".bak")
+        try:
+            return self.read(self.path)
+        except ValueError:  # Decode errors of every codec are ValueErrors
+            _log.warning(f"Could not deserialise {self.path} - loading backup")
+            return self.read(self.path + ".bak")
+
+    def read(self, path: str) -> dict:
+        with open(path, "rb") as f:
+            return self.codec.loads(f.read())
+
+    def write(self, obj: dict, guilds: set[str] | None = None, marker=None):
+        """Atomically replace the file with `obj`, keeping the previous file as `.bak`. `guilds` is ignored; the whole document is always written."""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self.codec.dumps(obj))
+            f.flush()
+            os.fsync(f.fileno())
+
+        if os.path.exists(self.path):
+            # Hard link the old file to .bak rather than copying it; fall back to copying where links are unsupported
+            bak_tmp = self.path + ".bak.tmp"
+            if os.path.exists(bak_tmp): os.remove(bak_tmp)
+            try:
+                os.link(self.path, bak_tmp)
+            except OSError:
+                shutil.copy2(self.path, bak_tmp)
+            os.replace(bak_tmp, self.path + ".bak")
+        os.replace(tmp_path, self.path)
+
+    def record(self, obj: dict, guild_id: str | None) -> bool:
+        return False  # Changes are only persisted by `write`
+
+    def begin_write(self, obj: dict):
+        return None
+
+    def close(self):
+        pass
@@ -0,0 +1,40 @@
+from dataclasses import dataclass, field
+from typing import Any, Protocol, Self, TypeVar
+
+class ModuleModel(Protocol):
+    """A module's typed view of its per-guild save data, built by `save.get_module_model`."""
+    @classmethod
+    def from_dict(cls, data) -> Self: ...
+
+    def to_dict(self) -> dict: ...
+
+M = TypeVar("M", bound=ModuleModel)
+
+@dataclass(slots=True, frozen=True)
+class GuildModel():
+    """Typed model of a guild's save data, with int ids & set-backed membership for hot lookups.
+
+    Built from & serialised to the save.json format. Read-only: write to `save.get_guild_data` & call `save.save(guild_id)`, which invalidates the model."""
+    nick: str
+    admin_roles: frozenset[int]
+    spoilered_players: frozenset[str]
+    log_channel: int | None
+    modules: dict[str, Any] = field(default_factory=dict)  # Module models, built on demand by `save.get_module_model`
+
+    @classmethod
+    def from_dict(cls, data) -> Self:
+        return cls(
+            nick=data["nick"],
+            admin_roles=frozenset(int(r) for r in data["adminRoles"]),
+            spoilered_players=frozenset(data["spoileredPlayers"]),
+            log_channel=data["logChannel"]
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "nick": self.nick,
+            "adminRoles": sorted(self.admin_roles),
+            "spoileredPlayers": sorted(self.spoilered_players),
+            "logChannel": self.log_channel,
+            "modules": {name: model.to_dict() for name, model in self.modules.items()}
+        }
@@ -0,0 +1,153 @@
+import hashlib, logging, os, time
+from collections.abc import MutableMapping
+from typing import Callable, Iterator
+
+from storage.codecs import JsonCodec
+
+_log = logging.getLogger("save")
+
+GLOBAL_FILE = "global"  # + codec extension
+GUILD_DIR = "guilds"
+
+def _atomic_write(path: str, raw: bytes):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(raw)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+class LazyGuilds(MutableMapping):
+    """`data["guilds"]` for the shard backend: guild shards are read from disk on first access and can be evicted when idle.
+
+    Membership & iteration use an index of shard files, so neither loads anything."""
+    def __init__(self, guild_dir: str, guild_ids: set[str], codec, on_load: Callable[[str, dict], None] | None = None):
+        self.guild_dir = guild_dir
+        self.codec = codec
+        self.index = guild_ids
+        self.loaded: dict[str, dict] = {}
+        self.last_access: dict[str, float] = {}
+        self.on_load = on_load  # Called with each guild as it's read from disk, eg. to enforce module templates
+
+    def path(self, guild_id: str) -> str:
+        return os.path.join(self.guild_dir, guild_id + self.codec.extension)
+
+    def read(self, guild_id: str) -> dict:
+        """Read a guild's shard from disk, without loading it"""
+        with open(self.path(guild_id), "rb") as f:
+            return self.codec.loads(f.read())
+
+    def __getitem__(self, guild_id: str) -> dict:
+        self.last_access[guild_id] = time.monotonic()
+        guild = self.loaded.get(guild_id)
+        if guild is not None: return guild
+        if guild_id not in self.index: raise KeyError(guild_id)
+        guild = self.read(guild_id)
+        self.loaded[guild_id] = guild
+        if self.on_load is not None: self.on_load(guild_id, guild)
+        return guild
+
+    def __setitem__(self, guild_id: str, guild: dict):
+        self.index.add(guild_id)
+        self.loaded[guild_id] = guild
+        self.last_access[guild_id] = time.monotonic()
+
+    def __delitem__(self, guild_id: str):
+        self.index.remove(guild_id)
+        self.loaded.pop(guild_id, None)
+        self.last_access.pop(guild_id, None)
+
+    def __contains__(self, guild_id: object) -> bool:
+        return guild_id in self.index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.index)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def evict(self, idle_seconds: float, keep: set[str]) -> int:
+        """Drop guilds not accessed for `idle_seconds` from memory, except those in `keep` (ie. unflushed). Returns the number evicted."""
+        cutoff = time.monotonic() - idle_seconds
+        idle = [g for g in self.loaded if g not in keep and self.last_access.get(g, 0) < cutoff]
+        for guild_id in idle:
+            self.loaded.pop(guild_id)
+            self.last_access.pop(guild_id, None)
+        return len(idle)
+
+class ShardBackend():
+    """Stores global data in one file and each guild in its own file under `GUILD_DIR`. Guilds are loaded lazily & written independently."""
+    partial_writes = True
+
+    def __init__(self, path: str, codec=None):
+        self.path = path
+        self.codec = JsonCodec() if codec is None else codec
+        self.guild_dir = os.path.join(path, GUILD_DIR)
+        self.on_load: Callable[[str, dict], None] | None = None
+        self._digests: dict[str, bytes] = {}  # Digest of each file as last written, to skip rewriting unchanged guilds
+
+    def load(self) -> dict | None:
+        global_path = os.path.join(self.path, GLOBAL_FILE + self.codec.extension)
+        if not os.path.exists(global_path): return None
+        with open(global_path, "rb") as f:
+            obj = self.codec.loads(f.read())
+        ext = self.codec.extension
+        guild_ids = {name[:-len(ext)] for name in os.listdir(self.guild_dir) if name.endswith(ext)} if os.path.isdir(self.guild_dir) else set()
+        obj["guilds"] = LazyGuilds(self.guild_dir, guild_ids, self.codec, self.on_load)
+        _log.info(f"Indexed {len(guild_ids)} guild shards")
+        return obj
+
+    def load_global(self) -> dict[str, dict]:
+        """Global module data as stored, eg. after another process wrote it"""
+        path = os.path.join(self.path, GLOBAL_FILE + self.codec.extension)
+        if not os.path.exists(path): return {}
+        with open(path, "rb") as f:
+            raw = f.read()
+        self._digests[path] = hashlib.blake2b(raw, digest_size=16).digest()
+        return self.codec.loads(raw).get("modules", {})
+
+    def read_all(self) -> dict | None:
+        """Full save data as stored, reading every guild shard. Blocking; run in a worker thread."""
+        global_path = os.path.join(self.path, GLOBAL_FILE + self.codec.extension)
+        if not os.path.exists(global_path): return None
+        with open(global_path, "rb") as f:
+            obj = self.codec.loads(f.read())
+        ext = self.codec.extension
+        obj["guilds"] = {}
+        for name in os.listdir(self.guild_dir) if os.path.isdir(self.guild_dir) else []:
+            if not name.endswith(ext): continue
+            with open(os.path.join(self.guild_dir, name), "rb") as f:
+                obj["guilds"][name[:-len(ext)]] = self.codec.loads(f.read())
+        return obj
+
+    def _write_file(self, path: str, value):
+        raw = self.codec.dumps(value)
+        digest = hashlib.blake2b(raw, digest_size=16).digest()
+        if self._digests.get(path) == digest: return
+        _atomic_write(path, raw)
+        self._digests[path] = digest
+
+    def write(self, obj: dict, guilds: set[str] | None = None, marker=None):
+        """Write dirty guild shards, or global data & every guild in `obj` if `guilds` is None.
+
+        `obj["guilds"]` need only hold the guilds being written; a dirty guild missing from it has been removed, and its shard is deleted."""
+        os.makedirs(self.guild_dir, exist_ok=True)
+        if guilds is None:
+            self._write_file(os.path.join(self.path, GLOBAL_FILE + self.codec.extension), {k: v for k, v in obj.items() if k != "guilds"})
+            guilds = set(obj["guilds"])
+        for guild_id in guilds:
+            path = os.path.join(self.guild_dir, guild_id + self.codec.extension)
+            if guild_id in obj["guilds"]:
+                self._write_file(path, obj["guilds"][guild_id])
+            elif os.path.exists(path):
+                os.remove(path)
+                self._digests.pop(path, None)
+
+    def record(self, obj: dict, guild_id: str | None) -> bool:
+        return False
+
+    def begin_write(self, obj: dict):
+        return None
+
+    def close(self):
+        pass
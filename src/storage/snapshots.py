@@ -0,0 +1,68 @@
+import gzip, logging, os, time
+
+from storage.codecs import codec_for_path
+
+_log = logging.getLogger("save")
+
+PREFIX = "save-"
+SUFFIX = ".gz"
+TIME_FORMAT = "%Y%m%d-%H%M%S"
+
+class Snapshotter():
+    """Keeps timestamped, gzipped snapshots of the full save in `path`, pruned to `keep` snapshots, `max_age` seconds & `max_bytes` in total.
+
+    The newest snapshot is never pruned, so there is always one to restore from."""
+    def __init__(self, path: str, codec, keep: int, max_age: float, max_bytes: int):
+        self.path = path
+        self.codec = codec
+        self.keep = keep
+        self.max_age = max_age
+        self.max_bytes = max_bytes  # 0 for no limit
+
+    def snapshots(self) -> list[str]:
+        """Snapshot paths, newest first. Timestamped names sort chronologically."""
+        if not os.path.isdir(self.path): return []
+        names = [n for n in os.listdir(self.path) if n.startswith(PREFIX) and n.endswith(SUFFIX)]
+        return [os.path.join(self.path, n) for n in sorted(names, reverse=True)]
+
+    def take(self, obj: dict) -> str:
+        """Write a snapshot of `obj` & prune old snapshots. Blocking; run in a worker thread. Returns the snapshot's path."""
+        os.makedirs(self.path, exist_ok=True)
+        name = f"{PREFIX}{time.strftime(TIME_FORMAT, time.gmtime())}{self.codec.extension}{SUFFIX}"
+        path = os.path.join(self.path, name)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(gzip.compress(self.codec.dumps(obj), compresslevel=6))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self.prune()
+        return path
+
+    def prune(self):
+        cutoff = time.time() - self.max_age
+        total = 0
+        for i, path in enumerate(self.snapshots()):
+            size = os.path.getsize(path)
+            total += size
+            if i == 0: continue
+            if i >= self.keep or os.path.getmtime(path) < cutoff or (self.max_bytes and total > self.max_bytes):
+                os.remove(path)
+                total -= size
+
+    def restore(self) -> dict | None:
+        """Newest snapshot that decompresses & decodes to save data, or None if there are none."""
+        for path in self.snapshots():
+            try:
+                with open(path, "rb") as f:
+                    raw = gzip.decompress(f.read())
+                obj = codec_for_path(path[:-len(SUFFIX)]).loads(raw)
+            except (OSError, EOFError, ValueError) as e:  # gzip raises BadGzipFile (OSError) or EOFError on truncation
+                _log.warning(f"Skipping unreadable snapshot {path}: {e}")
+                continue
+            if not isinstance(obj, dict) or "version" not in obj or "guilds" not in obj:
+                _log.warning(f"Skipping invalid snapshot {path}")
+                continue
+            _log.warning(f"Restored save data from snapshot {path}")
+            return obj
+        return None
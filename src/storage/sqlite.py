@@ -0,0 +1,166 @@
+import hashlib, json, logging, sqlite3, sys
+
+from storage.jsonfile import JsonBackend
+
+_log = logging.getLogger("save")
+
+ROOT_KEY = "root"
+GLOBAL_PREFIX = "global/"
+GUILD_PREFIX = "guild/"
+
+"""Row layout
+root                     -> everything except "modules" and "guilds" (version, templates)
+global/`module`          -> data["modules"][module]
+guild/`guild_id`         -> data["guilds"][guild_id], without "modules"
+guild/`guild_id`/`module`-> data["guilds"][guild_id]["modules"][module]
+"""
+
+def split_guild(guild_id: str, guild: dict) -> dict[str, dict]:
+    rows = {GUILD_PREFIX + guild_id: {k: v for k, v in guild.items() if k != "modules"}}
+    for module_name, module_data in guild.get("modules", {}).items():
+        rows[f"{GUILD_PREFIX}{guild_id}/{module_name}"] = module_data
+    return rows
+
+def split(obj: dict) -> dict[str, dict]:
+    """Split full save data into rows."""
+    rows = {ROOT_KEY: {k: v for k, v in obj.items() if k not in ("modules", "guilds")}}
+    for module_name, module_data in obj.get("modules", {}).items():
+        rows[GLOBAL_PREFIX + module_name] = module_data
+    for guild_id, guild in obj.get("guilds", {}).items():
+        rows |= split_guild(guild_id, guild)
+    return rows
+
+def assemble(rows: dict[str, dict]) -> dict:
+    """Inverse of `split`."""
+    obj = dict(rows.get(ROOT_KEY, {}))
+    obj["modules"] = {}
+    obj["guilds"] = {}
+    module_rows = []
+    for key, value in rows.items():
+        if key.startswith(GLOBAL_PREFIX):
+            obj["modules"][key[len(GLOBAL_PREFIX):]] = value
+        elif key.startswith(GUILD_PREFIX):
+            guild_id, _, module_name = key[len(GUILD_PREFIX):].partition("/")
+            if module_name: module_rows.append((guild_id, module_name, value))
+            else: obj["guilds"][guild_id] = value | {"modules": {}}
+    for guild_id, module_name, value in module_rows:
+        obj["guilds"][guild_id]["modules"][module_name] = value
+    return obj
+
+def _digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+class SqliteBackend():
+    """Stores each guild/module blob in its own row, so a change to one guild only rewrites that guild's changed rows."""
+    partial_writes = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)  # Writes are serialised by save's write lock
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS blobs (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._digests: dict[str, bytes] = {}  # Digest of each row as last written, to skip unchanged rows
+        self._guild_keys: dict[str, set[str]] = {}  # Row keys belonging to each guild
+
+    def load(self) -> dict | None:
+        rows = {}
+        for key, value in self.conn.execute("SELECT key, value FROM blobs"):
+            rows[key] = json.loads(value)
+            self._track(key, _digest(value))
+        if ROOT_KEY not in rows: return None
+        return assemble(rows)
+
+    def load_global(self) -> dict[str, dict]:
+        """Global module data as stored, eg. after another process wrote it. Returned rows are tracked as written, so they are only rewritten once changed."""
+        modules = {}
+        for key, value in self.conn.execute("SELECT key, value FROM blobs WHERE key LIKE ?", (GLOBAL_PREFIX + "%",)):
+            modules[key[len(GLOBAL_PREFIX):]] = json.loads(value)
+            self._track(key, _digest(value))
+        return modules
+
+    def read_all(self) -> dict | None:
+        """Full save data as stored, without affecting what this process has tracked as written. Safe to call from a worker thread."""
+        conn = sqlite3.connect(self.path)
+        try:
+            rows = {key: json.loads(value) for key, value in conn.execute("SELECT key, value FROM blobs")}
+        finally:
+            conn.close()
+        if ROOT_KEY not in rows: return None
+        return assemble(rows)
+
+    def write(self, obj: dict, guilds: set[str] | None = None, marker=None):
+        """Write changed rows. If `guilds` is given, `obj["guilds"]` need only contain those guilds, and only their rows are considered."""
+        if guilds is None:
+            rows = split(obj)
+            stale = [k for k in self._digests if k not in rows]
+        else:
+            rows = {}
+            stale = []
+            for guild_id in guilds:
+                guild_rows = split_guild(guild_id, obj["guilds"][guild_id]) if guild_id in obj["guilds"] else {}
+                rows |= guild_rows
+                stale += [k for k in self._guild_keys.get(guild_id, ()) if k not in guild_rows]
+
+        changed = []
+        for key, value in rows.items():
+            text = json.dumps(value, separators=(",", ":"))
+            digest = _digest(text)
+            if self._digests.get(key) != digest:
+                changed.append((key, text, digest))
+        if not changed and not stale: return
+
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany("INSERT INTO blobs (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                                  [(key, text) for key, text, _ in changed])
+            self.conn.executemany("DELETE FROM blobs WHERE key = ?", [(key,) for key in stale])
+        for key, _, digest in changed:
+            self._track(key, digest)
+        for key in stale:
+            self._untrack(key)
+
+    @staticmethod
+    def _guild_of(key: str) -> str | None:
+        if not key.startswith(GUILD_PREFIX): return None
+        return key[len(GUILD_PREFIX):].partition("/")[0]
+
+    def _track(self, key: str, digest: bytes):
+        self._digests[key] = digest
+        if (guild_id := self._guild_of(key)) is not None:
+            self._guild_keys.setdefault(guild_id, set()).add(key)
+
+    def _untrack(self, key: str):
+        self._digests.pop(key, None)
+        if (guild_id := self._guild_of(key)) is not None:
+            keys = self._guild_keys.get(guild_id, set())
+            keys.discard(key)
+            if not keys: self._guild_keys.pop(guild_id, None)
+
+    def record(self, obj: dict, guild_id: str | None) -> bool:
+        return False  # Changes are only persisted by `write`
+
+    def begin_write(self, obj: dict):
+        return None
+
+    def close(self):
+        self.conn.close()
+
+def import_json(json_path: str, db_path: str) -> int:
+    """One-shot import of an existing save.json (or its .bak if the main file is corrupt) into a SQLite save. Returns the number of guilds imported."""
+    obj = JsonBackend(json_path).load()
+    if obj is None: raise FileNotFoundError(json_path)
+    backend = SqliteBackend(db_path)
+    try:
+        backend.write(obj)
+    finally:
+        backend.close()
+    return len(obj.get("guilds", {}))
+
+
+if __name__ == "__main__":
+    # python -m storage.sqlite [save.json] [save.db]
+    json_path = sys.argv[1] if len(sys.argv) > 1 else "save.json"
+    db_path = sys.argv[2] if len(sys.argv) > 2 else "save.db"
+    count = import_json(json_path, db_path)
+    print(f"Imported {count} guilds from {json_path} into {db_path}")
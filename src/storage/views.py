@@ -0,0 +1,89 @@
+from collections.abc import MutableMapping, MutableSequence
+from typing import Any, Callable
+
+class _DefaultView():
+    """Base for read-only views of template defaults for a guild with no save data. The first write materialises the guild & is applied to its real data;
+    from then on every view of that guild reads the real data too."""
+    __slots__ = ("_default", "_guild_id", "_path")
+    materialize: Callable[[str], dict]  # Set by `save`; creates a guild's save data & returns it
+    lookup: Callable[[str], dict | None]  # Set by `save`; a guild's save data, or None if it has none
+
+    def __init__(self, default, guild_id: str, path: tuple):
+        self._default = default
+        self._guild_id = guild_id
+        self._path = path
+
+    def _wrap(self, key, value):
+        if isinstance(value, dict): return DefaultDictView(value, self._guild_id, self._path + (key,))
+        if isinstance(value, list): return DefaultListView(value, self._guild_id, self._path + (key,))
+        return value
+
+    def _resolve(self, guild: dict) -> Any:
+        target: Any = guild
+        for key in self._path:
+            target = target[key]
+        return target
+
+    def _real(self) -> Any:
+        return self._resolve(_DefaultView.materialize(self._guild_id))
+
+    def _materialized(self) -> Any:
+        """The real data if the guild has been materialised since the view was made, else None"""
+        guild = _DefaultView.lookup(self._guild_id)
+        return None if guild is None else self._resolve(guild)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._default!r})"
+
+class DefaultDictView(_DefaultView, MutableMapping):
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if (real := self._materialized()) is not None: return real[key]
+        return self._wrap(key, self._default[key])
+
+    def __contains__(self, key) -> bool:
+        real = self._materialized()
+        return key in (self._default if real is None else real)
+
+    def __iter__(self):
+        real = self._materialized()
+        return iter(self._default if real is None else real)
+
+    def __len__(self) -> int:
+        real = self._materialized()
+        return len(self._default if real is None else real)
+
+    def __setitem__(self, key, value):
+        self._real()[key] = value
+
+    def __delitem__(self, key):
+        del self._real()[key]
+
+class DefaultListView(_DefaultView, MutableSequence):
+    __slots__ = ()
+
+    def __getitem__(self, index) -> Any:
+        if (real := self._materialized()) is not None: return real[index]
+        return self._wrap(index, self._default[index])
+
+    def __contains__(self, value) -> bool:
+        real = self._materialized()
+        return value in (self._default if real is None else real)
+
+    def __iter__(self):
+        real = self._materialized()
+        return iter(self._default if real is None else real)
+
+    def __len__(self) -> int:
+        real = self._materialized()
+        return len(self._default if real is None else real)
+
+    def __setitem__(self, index, value):
+        self._real()[index] = value
+
+    def __delitem__(self, index):
+        del self._real()[index]
+
+    def insert(self, index, value):
+        self._real().insert(index, value)
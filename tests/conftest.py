@@ -0,0 +1,10 @@
+import json
+
+import pytest
+
+@pytest.fixture
+def sandbox(tmp_path, monkeypatch):
+    """Run in a temporary directory with a minimal config.json, so importing `config` & `save` never touches a real save"""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "config.json").write_text(json.dumps({"token": "", "admins": []}))
+    return tmp_path
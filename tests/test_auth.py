@@ -0,0 +1,31 @@
+from types import SimpleNamespace
+
+import discord
+import pytest
+
+@pytest.fixture
+def auth(sandbox):
+    from components import auth
+    auth._tiers.clear()
+    return auth
+
+def member(guild, roles: list[str]) -> discord.Member:
+    """A Member built from its own payload, as discord.py does for each message's author"""
+    state = SimpleNamespace()
+    state.store_user = lambda data: discord.User(state=state, data=data)  # type: ignore
+    payload = {"user": {"id": "5", "username": "user", "discriminator": "0", "avatar": None}, "roles": roles, "flags": 0}
+    return discord.Member(data=payload, guild=guild, state=state)  # type: ignore
+
+def test_tier_cached_across_member_objects(auth, monkeypatch):
+    import save
+    guild = SimpleNamespace(id=1, owner_id=99)
+    model = SimpleNamespace(admin_roles=frozenset({20}))
+    resolved = []
+    monkeypatch.setattr(save, "get_guild_model", lambda guild_id: resolved.append(guild_id) or model)
+
+    assert auth.get_tier(member(guild, ["20", "10"])) == auth.ADMIN
+    assert auth.get_tier(member(guild, ["10", "20"])) == auth.ADMIN
+    assert resolved == [1]  # The second member hit the cache
+
+    assert auth.get_tier(member(guild, ["10"])) == auth.MEMBER  # Roles changed
+    assert resolved == [1, 1]
@@ -0,0 +1,48 @@
+import asyncio, logging
+from types import SimpleNamespace
+
+class FakeChannel():
+    def __init__(self):
+        self.sent: list[str] = []
+
+    async def send(self, embeds):
+        self.sent.extend(field.value for embed in embeds for field in embed.fields)
+
+def make_logger(channel: FakeChannel):
+    from components import guildlog
+    async def submit(call, route, priority, name=""):
+        return await call()
+    bot = SimpleNamespace(_log=logging.getLogger("test"), outbound=SimpleNamespace(submit=submit))
+    logger = guildlog.GuildLogger(bot)  # type: ignore
+    logger._channels[1] = channel  # type: ignore
+    return logger
+
+def test_repeat_count_is_sent_when_the_window_expires(sandbox, monkeypatch):
+    from components import guildlog
+    monkeypatch.setattr(guildlog, "FLUSH_WINDOW", 0.01)
+    monkeypatch.setattr(guildlog, "DEDUPE_SECONDS", 0.1)
+    channel = FakeChannel()
+    async def run():
+        logger = make_logger(channel)
+        logger.log(None, 1, "spam", "")  # type: ignore
+        await asyncio.sleep(0.05)
+        logger.log(None, 1, "spam", "")  # type: ignore
+        logger.log(None, 1, "spam", "")  # type: ignore
+        await asyncio.sleep(0.2)  # The line stops; its count must still arrive
+    asyncio.run(run())
+    assert channel.sent == ["spam", "spam\n*(×2)*"]
+
+def test_final_flush_sends_pending_repeats(sandbox, monkeypatch):
+    from components import guildlog
+    monkeypatch.setattr(guildlog, "FLUSH_WINDOW", 0.01)
+    channel = FakeChannel()
+    async def run():
+        logger = make_logger(channel)
+        logger.log(None, 1, "spam", "")  # type: ignore
+        await asyncio.sleep(0.05)
+        logger.log(None, 1, "spam", "")  # type: ignore
+        await asyncio.sleep(0.05)
+        await logger.flush(final=True)
+        assert logger._repeat_task is None
+    asyncio.run(run())
+    assert channel.sent == ["spam", "spam"]
@@ -0,0 +1,31 @@
+import json
+
+from storage.journal import JournalBackend
+
+TEMPLATE = {"version": 0.2, "modules": {}, "guilds": {}}
+
+def test_segments_without_snapshot_replay_onto_template(tmp_path):
+    path = str(tmp_path / "save.json")
+    with open(path + ".journal.1", "w") as f:
+        f.write(json.dumps({"op": "set", "path": ["guilds", "1"], "value": {"logChannel": 5}}) + "\n")
+        f.write(json.dumps({"op": "set", "path": ["modules", "srcManagement"], "value": {"checked": ["a"]}}) + "\n")
+
+    obj = JournalBackend(path, template=TEMPLATE).load()
+
+    assert obj == {"version": 0.2, "modules": {"srcManagement": {"checked": ["a"]}}, "guilds": {"1": {"logChannel": 5}}}
+    assert TEMPLATE["guilds"] == {}  # Replayed onto a copy
+
+def test_global_changes_are_journalled(tmp_path):
+    path = str(tmp_path / "save.json")
+    backend = JournalBackend(path, template=TEMPLATE)
+    backend.load()
+    obj = {"version": 0.2, "modules": {"srcManagement": {"checked": ["a", "b", "c"]}}, "guilds": {}}
+    backend.write(obj)
+
+    obj["modules"]["srcManagement"]["checked"] = ["b", "c", "d"]
+    assert backend.record(obj, None)
+    backend.close()
+
+    ops = [json.loads(line)["op"] for _, segment in backend._segments() for line in open(segment)]
+    assert ops == ["push"]
+    assert JournalBackend(path, template=TEMPLATE).load() == obj
@@ -0,0 +1,24 @@
+import pytest
+
+GUILD = {"nick": "Guild", "adminRoles": [1, 2], "spoileredPlayers": ["a"], "logChannel": 3, "modules": {}}
+
+@pytest.mark.parametrize("module, model, data", [
+    ("changelog", "ChangelogData", {"logChannel": 4, "excludeChannels": [5, 6]}),
+    ("customCommands", "CustomCommandsData", {"Hello": "Hi", "bye": "Bye"}),
+    ("gameTracking", "GameTrackingData", {"trackedChannels": {"7": {"games": ["g1", "g2"]}}, "claimEmoji": "a", "unclaimEmoji": "b"}),
+    ("reactroles", "ReactRolesData", {"8": {"9": {"✅": 10, "❌": 11}}}),
+    ("raceutil", "RaceUtilData", {"raceVCs": [12, 13], "readyEmote": "r"}),
+])
+def test_module_models_round_trip(sandbox, module, model, data):
+    import importlib
+    model_type = getattr(importlib.import_module(f"modules.{module}"), model)
+    assert model_type.from_dict(data).to_dict() == data
+
+def test_guild_model_round_trips(sandbox):
+    from storage.models import GuildModel
+    assert GuildModel.from_dict(GUILD).to_dict() == GUILD
+
+def test_guilds_without_data_share_one_model(sandbox):
+    import save
+    assert save.get_guild_model(100) is save.get_guild_model(101)
+    assert not save._models
@@ -0,0 +1,55 @@
+import asyncio, logging
+from types import SimpleNamespace
+
+def make_outbound():
+    from components import outbound
+    return outbound.Outbound(SimpleNamespace(_log=logging.getLogger("test")))  # type: ignore
+
+def test_urgent_calls_start_first_one_per_route(sandbox):
+    from components import outbound
+    started: list[str] = []
+    async def run():
+        queue = make_outbound()
+        gate = asyncio.Event()
+        async def call(name: str):
+            started.append(name)
+            await gate.wait()
+        futures = [queue.submit(lambda: call("a1"), "a", outbound.COSMETIC),
+                   queue.submit(lambda: call("a2"), "a", outbound.COSMETIC),
+                   queue.submit(lambda: call("a3"), "a", outbound.MODERATION),
+                   queue.submit(lambda: call("b1"), "b", outbound.NORMAL)]
+        await asyncio.sleep(0)
+        assert started == ["a1", "b1"]  # One per route
+        gate.set()
+        await asyncio.gather(*futures)
+        await queue.drain(1)
+    asyncio.run(run())
+    assert started == ["a1", "b1", "a3", "a2"]
+
+def test_keyed_call_replaces_queued_one_and_keeps_its_place(sandbox):
+    from components import outbound
+    ran: list[str] = []
+    async def run():
+        queue = make_outbound()
+        async def call(name: str):
+            ran.append(name)
+        queue.submit(lambda: call("busy"), "a")
+        queue.submit(lambda: call("grant"), "a", outbound.NORMAL, key="role")
+        queue.submit(lambda: call("other"), "a", outbound.NORMAL)
+        queue.submit(lambda: call("remove"), "a", outbound.MODERATION, key="role")
+        await queue.drain(1)
+        assert queue.depth() == {"moderation": 0, "normal": 0, "cosmetic": 0}
+    asyncio.run(run())
+    assert ran == ["busy", "remove", "other"]
+
+def test_draining_many_calls_on_one_route_is_fast(sandbox):
+    import time
+    async def run():
+        queue = make_outbound()
+        async def call(): pass
+        start = time.perf_counter()
+        for i in range(4000):
+            queue.submit(call, "busy" if i % 10 else ("other", i))
+        await queue.drain(30)
+        return time.perf_counter() - start
+    assert asyncio.run(run()) < 2  # Each completion only looks at its own route
@@ -0,0 +1,21 @@
+import copy
+
+from storage.views import DefaultDictView, _DefaultView
+
+DEFAULT = {"nick": "", "adminRoles": [], "modules": {"moderation": {"mutes": {}}}}
+
+def test_reads_follow_writes_through_the_same_view(monkeypatch):
+    guilds: dict[str, dict] = {}
+    monkeypatch.setattr(_DefaultView, "materialize", staticmethod(lambda guild_id: guilds.setdefault(guild_id, copy.deepcopy(DEFAULT))), raising=False)
+    monkeypatch.setattr(_DefaultView, "lookup", staticmethod(lambda guild_id: guilds.get(guild_id)), raising=False)
+    guild = DefaultDictView(DEFAULT, "1", ())
+    mutes = guild["modules"]["moderation"]["mutes"]
+    roles = guild["adminRoles"]
+
+    mutes["5"] = [1, -1]
+    roles.append(7)
+
+    assert mutes["5"] == [1, -1] and "5" in mutes and list(mutes) == ["5"] and len(mutes) == 1
+    assert roles[0] == 7 and 7 in roles and list(roles) == [7] and len(roles) == 1
+    assert guild["modules"]["moderation"]["mutes"] == {"5": [1, -1]}
+    assert DEFAULT["adminRoles"] == [] and DEFAULT["modules"]["moderation"]["mutes"] == {}  # Defaults untouched